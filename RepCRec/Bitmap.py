@@ -0,0 +1,107 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+
+
+class Bitmap:
+    """
+    Bitmap is a set of integers from 0 to size, stored one bit each.
+    Number of members is maintained as they are added and removed, so
+    that it never has to be counted
+
+    Args:
+        size: Largest integer which can be a member
+    """
+    __slots__ = ('bits', 'count')
+
+    def __init__(self, size):
+        self.bits = bytearray((size >> 3) + 1)
+        self.count = 0
+
+    def add(self, member):
+        """
+        Adds a member
+
+        Args:
+            member: Integer to be added
+        Returns:
+            boolean whether it was not a member before
+        """
+        mask = 1 << (member & 7)
+
+        if self.bits[member >> 3] & mask:
+            return False
+
+        self.bits[member >> 3] |= mask
+        self.count += 1
+        return True
+
+    def add_all(self, members):
+        """
+        Adds every member of an iterable
+
+        Args:
+            members: Iterable of integers to be added
+        """
+        bits = self.bits
+        count = self.count
+
+        for member in members:
+            mask = 1 << (member & 7)
+
+            if not bits[member >> 3] & mask:
+                bits[member >> 3] |= mask
+                count += 1
+
+        self.count = count
+
+    def discard(self, member):
+        """
+        Removes a member if present
+
+        Args:
+            member: Integer to be removed
+        Returns:
+            boolean whether it was a member before
+        """
+        mask = 1 << (member & 7)
+
+        if not self.bits[member >> 3] & mask:
+            return False
+
+        self.bits[member >> 3] &= ~mask
+        self.count -= 1
+        return True
+
+    def clear(self):
+        """
+        Removes all of the members
+        """
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+
+    def __contains__(self, member):
+        """
+        Tells whether an integer is a member, integers out of range never
+        are
+
+        Args:
+            member: Integer to be checked
+        Returns:
+            boolean whether member or not
+        """
+        if member < 0 or member >> 3 >= len(self.bits):
+            return False
+
+        return self.bits[member >> 3] & (1 << (member & 7)) != 0
+
+    def __len__(self):
+        """
+        Returns number of members
+
+        Returns:
+            Number of members
+        """
+        return self.count
@@ -0,0 +1,162 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+
+class Checkpoint:
+    """
+    Checkpoint is the file holding values of all of the variables held by
+    a site and their commit times, together with the position in the
+    write ahead log up to which they include the commits, so that only
+    the log after it has to be replayed on restart.
+
+    The file is a header of magic, format version, log position and
+    total number of variables, the columns of values and commit times of
+    the store, one entry for every variable held in order of indices, as
+    64 bit integers and a crc32 of all of these. It is written to a
+    temporary file which replaces the previous checkpoint once synced, so
+    a crash never leaves a partial one. Once it is in the file, the log
+    before its position can be dropped.
+
+    Args:
+        path: Path of the checkpoint file
+    """
+    MAGIC = b'RCKP'
+    VERSION = 3
+    HEADER = struct.Struct('<4sIqq')
+    CHECKSUM = struct.Struct('<I')
+
+    def __init__(self, path):
+        self.path = path
+        # Thread writing the last checkpoint, checkpoints are taken without
+        # waiting for it
+        self.writer = None
+        self.num_checkpoints = 0
+        # Log position of the last checkpoint known to be in the file
+        self.durable_position = None
+
+    def load(self, num_variables, num_values):
+        """
+        Maps the checkpoint file into memory. The values are a copy on
+        write view of the mapping, so pages are only read when touched and
+        modifying them does not modify the file
+
+        Args:
+            num_variables: Number of total variables present, a checkpoint
+                           for another number is not used
+            num_values: Number of variables held by the site
+        Returns:
+            Tuple of (log position, values, commit times) with values and
+            commit times in order of indices, None if there is no usable
+            checkpoint
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        size = self.HEADER.size + 16 * num_values
+
+        with open(self.path, 'rb') as checkpoint_file:
+
+            if os.fstat(checkpoint_file.fileno()).st_size != \
+                    size + self.CHECKSUM.size:
+                return None
+
+            mapping = mmap.mmap(checkpoint_file.fileno(), 0,
+                                access=mmap.ACCESS_COPY)
+
+        magic, version, position, variables = \
+            self.HEADER.unpack_from(mapping)
+
+        if magic != self.MAGIC or version != self.VERSION or \
+                variables != num_variables or \
+                self.CHECKSUM.unpack_from(mapping, size)[0] != \
+                zlib.crc32(memoryview(mapping)[:size]):
+            mapping.close()
+            return None
+
+        self.durable_position = position
+        columns = memoryview(mapping)[self.HEADER.size:size].cast('q')
+
+        return (position, columns[:num_values], columns[num_values:])
+
+    def write(self, position, num_variables, values, commit_times):
+        """
+        Takes a checkpoint of values, which is written to the file by
+        another thread. Does nothing if the previous one is still being
+        written
+
+        Args:
+            position: Position in the write ahead log up to which commits
+                      are included in values
+            num_variables: Number of total variables present
+            values: Values of variables held in order of indices
+            commit_times: Commit times of the values
+        Returns:
+            boolean whether a checkpoint was taken
+        """
+        if self.writer is not None and self.writer.is_alive():
+            return False
+
+        data = self.HEADER.pack(self.MAGIC, self.VERSION, position,
+                                num_variables) + values.tobytes() + \
+            commit_times.tobytes()
+        data += self.CHECKSUM.pack(zlib.crc32(data))
+
+        self.writer = threading.Thread(target=self.write_file,
+                                       args=(position, data))
+        self.writer.start()
+        self.num_checkpoints += 1
+
+        return True
+
+    def write_file(self, position, data):
+        """
+        Writes a checkpoint to a temporary file and replaces the previous
+        checkpoint with it
+
+        Args:
+            position: Log position of the checkpoint
+            data: Bytes of the checkpoint
+        """
+        temporary = self.path + ".tmp"
+
+        with open(temporary, 'wb') as checkpoint_file:
+            checkpoint_file.write(data)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+
+        os.replace(temporary, self.path)
+        self.durable_position = position
+
+    def wait(self):
+        """
+        Waits for the checkpoint being written, if any
+        """
+        if self.writer is not None:
+            self.writer.join()
+
+    def get_durable_position(self):
+        """
+        Getter for durable_position
+
+        Returns:
+            Log position of the last checkpoint known to be in the file,
+            None if there is none
+        """
+        return self.durable_position
+
+    def get_num_checkpoints(self):
+        """
+        Getter for num_checkpoints
+
+        Returns:
+            Number of checkpoints taken
+        """
+        return self.num_checkpoints
@@ -4,9 +4,12 @@ Amanpreet Singh
 Sharan Agrawal
 """
 import logging
+from array import array
 
 from .LockTable import LockTable
 from .Variable import Variable
+from .VariableStore import VariableStore
+from .MerkleTree import MerkleTree
 from .enums.LockType import LockType
 
 log = logging.getLogger(__name__)
@@ -17,56 +20,182 @@ class DataManager:
     DataManager is local to every site and manages the sites
     variables and locks
 
+    Variables are kept in a columnar VariableStore, Variable objects are
+    only made when one is asked for. For comparing values with other
+    sites, there is a MerkleTree over the variables of every replica set
+    the site holds, built when first asked for and updated on every
+    commit after that
+
+    If there is a write ahead log, values it holds are replayed as the
+    initial values and every committed write is appended to it. If there
+    is a checkpoint too, values are loaded from it and only the log after
+    it is replayed, and a new one is taken every checkpoint_interval
+    commits. Once a checkpoint is durable, the log before it is dropped
+
     Args:
         id: Id of the site on which current data manager is
+        placement: Placement of replicas of variables on sites
+        wal: WriteAheadLog of the site or None
+        checkpoint: Checkpoint of the site or None
+        checkpoint_interval: Number of commits between checkpoints, 0 to
+                             never take one
     """
 
-    def __init__(self, id):
+    def __init__(self, id, placement, wal=None, checkpoint=None,
+                 checkpoint_interval=0):
         self.site_id = id
-        self.lock_table = LockTable()
-        self.variable_map = dict()
-
-        for i in range(1, 21):
+        self.placement = placement
+        self.lock_table = LockTable(id)
+        self.store = VariableStore(placement.num_variables,
+                                   placement.get_indices(id))
+        # Number of versions kept over all of the variables
+        self.num_versions = self.store.get_num_variables()
+        # Indices of variables written since versions were last pruned
+        self.written = set()
+        # Maps replica set position to MerkleTree of its variables
+        self.trees = None
+        self.wal = wal
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        # Commits logged since last checkpoint
+        self.commits_since_checkpoint = 0
+        # Latest commit time of the values replayed on start
+        self.last_commit_time = 0
 
-            if i % 2 == 0 or (1 + i % 10) == id:
-                variable = Variable(i, 'x' + str(i), 10 * i, self.site_id)
-                self.variable_map['x' + str(i)] = variable
+        if self.wal is not None:
+            self.replay_log()
 
-    def add_variable(self, name, variable):
+    def replay_log(self):
         """
-        Adds variables to variable map
-
-        Args:
-            name: Name of the variable
-            variable: Variable instance of the variable
+        Rebuilds values of variables from the checkpoint, if any, and the
+        write ahead log after it. Values keep the commit times they were
+        logged with, so that versions of replicas are still ordered by
+        them, and the clock of a restarted system goes on after the latest
+        of them. Variables not present on this site are skipped
         """
-        self.variable_map[name] = variable
+        position = 0
+
+        if self.checkpoint is not None:
+            checkpoint = self.checkpoint.load(
+                self.store.num_variables, self.store.get_num_variables())
+
+            if checkpoint is not None:
+                position, values, commit_times = checkpoint
+                self.store.set_values(values, commit_times)
+                self.last_commit_time = max(commit_times, default=0)
+                log.info("Site " + str(self.site_id) + " loaded its " +
+                         "checkpoint")
+
+        replayed = 0
+
+        for commit_time, writes in self.wal.replay(position):
+
+            for index, value in writes:
+
+                if self.store.has_variable(index):
+                    self.store.set_value(index, value, commit_time)
+                    self.last_commit_time = max(self.last_commit_time,
+                                                commit_time)
+                    replayed += 1
+
+        if replayed != 0:
+            log.info("Site " + str(self.site_id) + " replayed " +
+                     str(replayed) + " writes from its log")
 
-    def get_variable(self, name):
+        self.truncate_log()
+
+    def get_variable(self, index):
         """
-        Returns variable instance given name of the variable
+        Returns a Variable with current value of a variable given its index
 
         Args:
-            name: Name of the variable
+            index: Index of the variable
+        Returns:
+            Variable instance, None if not present on this site
         """
-        if name in self.variable_map:
-            return self.variable_map[name]
+        if self.has_variable(index):
+            return Variable(index, Variable.get_name(index),
+                            self.store.get_value(index), self.site_id)
         else:
             return None
 
-    def has_variable(self, name):
+    def has_variable(self, index):
         """
         Tells whether variable is present on this site
 
         Args:
-            name: Name of the variable to be checked
+            index: Index of the variable to be checked
         Returns:
             boolean whether present or not
         """
-        if name in self.variable_map:
-            return True
-        else:
-            return False
+        return self.store.has_variable(index)
+
+    def get_value(self, index):
+        """
+        Returns latest committed value of a variable present on this site
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Value of the variable
+        """
+        return self.store.get_value(index)
+
+    def get_version(self, index, time):
+        """
+        Returns value of a variable present on this site as committed at
+        or before time
+
+        Args:
+            index: Index of the variable
+            time: Time at which the value is required
+        Returns:
+            Value of the variable at time
+        """
+        return self.store.get_version(index, time)
+
+    def get_timed_version(self, index, time):
+        """
+        Returns the newest version of a variable present on this site
+        committed at or before time, with its commit time
+
+        Args:
+            index: Index of the variable
+            time: Time at which the value is required
+        Returns:
+            Tuple of (commit time, value), None if it had none
+        """
+        return self.store.get_timed_version(index, time)
+
+    def get_commit_time(self, index):
+        """
+        Returns time at which the latest value of a variable present on
+        this site was committed, which orders versions of its replicas
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Commit time of the value
+        """
+        return self.store.get_commit_time(index)
+
+    def get_indices(self):
+        """
+        Returns indices of variables present on this site
+
+        Returns:
+            array of indices in increasing order
+        """
+        return self.store.get_indices()
+
+    def get_num_variables(self):
+        """
+        Returns number of variables present on this site
+
+        Returns:
+            Number of variables
+        """
+        return self.store.get_num_variables()
 
     def clear_lock(self, lock, variable):
         """
@@ -74,7 +203,7 @@ class DataManager:
 
         Args:
             lock: Lock to be cleared
-            variable: Variable for which the lock is to be cleared
+            variable: Index of variable for which the lock is to be cleared
         """
         self.lock_table.clear_lock(lock, variable)
 
@@ -87,6 +216,26 @@ class DataManager:
         """
         return self.lock_table
 
+    def can_get_lock(self, transaction, lock_type, variable):
+        """
+        Tells whether get_lock would grant a lock on variable to a
+        transaction, without setting it
+
+        Args:
+            transaction: Transaction which wants the lock
+            lock_type: Type of the lock required
+            variable: Index of variable on which lock is required
+        Returns:
+            Boolean according to whether lock can be acquired or not
+        """
+        if self.lock_table.is_locked_by_transaction(transaction, variable):
+            return self.lock_table.get_len_locks(variable) == 1
+
+        if lock_type == LockType.WRITE:
+            return not self.lock_table.is_locked(variable)
+        else:
+            return not self.lock_table.is_write_locked(variable)
+
     def get_lock(self, transaction, lock_type, variable):
         """
         Tries to get a lock on variable for a transaction
@@ -94,7 +243,7 @@ class DataManager:
         Args:
             transaction: Transaction which wants the lock
             lock_type: Type of the lock required
-            variable: Variable on which lock is required
+            variable: Index of variable on which lock is required
         Returns:
             Boolean according to whether lock was acquired or not
         """
@@ -123,37 +272,359 @@ class DataManager:
 
             if lock_type == LockType.WRITE:
                 log.debug(transaction.name + " did not get write lock on " +
-                          variable + " site: " + str(self.site_id))
+                          Variable.get_name(variable) + " site: " +
+                          str(self.site_id))
             else:
                 log.debug(transaction.name + " did not get read lock on " +
-                          variable + " site: " + str(self.site_id))
+                          Variable.get_name(variable) + " site: " +
+                          str(self.site_id))
             return False
 
-    def write_variable(self, transaction, variable_name, value):
+    def write_variable(self, transaction, index, value, time):
         """
-        Write a value for a variable for a transaction
+        Write a value for a variable for a transaction, as a new version
+        of the variable
 
         Args:
             transaction: Transaction which wants to write the value
-            variable_name: Variable whose value is to be written
+            index: Index of variable whose value is to be written
             value: Value to be written
+            time: Commit time of the transaction
 
         Returns:
             Boolean whether write was successful or not
         """
         if self.lock_table.is_locked_by_transaction(transaction,
-                                                    variable_name,
+                                                    index,
                                                     LockType.WRITE):
-            self.variable_map[variable_name].set_value(value)
+            self.write_value(index, value, time)
             return True
         else:
             return False
 
+    def write_value(self, index, value, time):
+        """
+        Writes a committed value of a variable as a new version, whatever
+        locks are held on this site
+
+        Args:
+            index: Index of variable whose value is to be written
+            value: Value to be written
+            time: Commit time of the transaction
+        """
+        self.store.add_version(index, time, value)
+        self.num_versions += 1
+        self.written.add(index)
+        self.update_tree(index, value)
+
+        if self.wal is not None:
+            self.wal.append(time, index, value)
+
+    def get_tree(self, set_id):
+        """
+        Returns the MerkleTree over variables of a replica set held by this
+        site, building all of them if not built yet
+
+        Args:
+            set_id: Position of the replica set
+        Returns:
+            MerkleTree of the replica set, None if not held by this site
+        """
+        if self.trees is None:
+            self.build_trees()
+
+        return self.trees.get(set_id)
+
+    def build_trees(self):
+        """
+        Builds a MerkleTree over current values of variables of every
+        replica set held by this site
+        """
+        set_indices = dict()
+        set_values = dict()
+        values = self.store.get_values()
+
+        for position, index in enumerate(self.store.get_indices()):
+            replica_set = self.placement.get_set_id(index)
+
+            if replica_set not in set_indices:
+                set_indices[replica_set] = array('q')
+                set_values[replica_set] = array('q')
+
+            set_indices[replica_set].append(index)
+            set_values[replica_set].append(values[position])
+
+        self.trees = dict()
+
+        for replica_set, indices in set_indices.items():
+            self.trees[replica_set] = MerkleTree(indices,
+                                                 set_values[replica_set])
+
+    def get_replica_sets(self):
+        """
+        Returns positions of replica sets this site holds variables of
+
+        Returns:
+            List of positions of replica sets in increasing order
+        """
+        if self.trees is None:
+            self.build_trees()
+
+        return sorted(self.trees)
+
+    def update_tree(self, index, value):
+        """
+        Updates the MerkleTree holding a variable if trees are built
+
+        Args:
+            index: Index of the variable
+            value: New value of the variable
+        """
+        if self.trees is not None:
+            self.trees[self.placement.get_set_id(index)].update(index, value)
+
+    def export_values(self, indices):
+        """
+        Returns committed values of variables, for a recovering site to
+        catch up with this one in a single transfer
+
+        Args:
+            indices: Indices of the variables
+        Returns:
+            List of (commit time, value) in order of indices
+        """
+        return [(self.store.get_commit_time(index),
+                 self.store.get_value(index)) for index in indices]
+
+    def import_values(self, indices, values):
+        """
+        Commits values transferred from another site as new versions of
+        variables whose value here is older. They are logged as one commit
+        for every commit time among them, so that replay restores the time
+        of each
+
+        Args:
+            indices: Indices of the variables
+            values: List of (commit time, value) in order of indices
+        """
+        imported = dict()
+
+        for index, (time, value) in zip(indices, values):
+
+            if time > self.store.get_commit_time(index):
+                self.store.add_version(index, time, value)
+                self.num_versions += 1
+                self.written.add(index)
+                self.update_tree(index, value)
+
+                if time not in imported:
+                    imported[time] = list()
+
+                imported[time].append((index, value))
+
+        if self.wal is None:
+            return
+
+        for time in sorted(imported):
+
+            for index, value in imported[time]:
+                self.wal.append(time, index, value)
+
+            self.commit_log()
+
+    def prune_versions(self, time, all_variables):
+        """
+        Drops versions of variables which reads at time or later can
+        not see
+
+        Args:
+            time: Oldest time at which a read may happen
+            all_variables: If false, only variables written since last
+                           pruning are pruned, enough when time has not
+                           changed since then
+        Returns:
+            Number of versions dropped
+        """
+        if all_variables:
+            indices = list(self.store.history)
+        else:
+            indices = list(self.written)
+
+        self.written = set()
+        reclaimed = 0
+
+        for index in indices:
+            reclaimed += self.store.prune_versions(index, time)
+
+        self.num_versions -= reclaimed
+
+        return reclaimed
+
+    def commit_log(self):
+        """
+        Ends the commit in progress in the write ahead log, and takes a
+        checkpoint if checkpoint_interval commits were logged since the
+        last one
+
+        Returns:
+            Log position the commit is durable at, None if nothing was
+            logged
+        """
+        if self.wal is None:
+            return None
+
+        end = None
+
+        if self.wal.commit():
+            self.commits_since_checkpoint += 1
+            end = self.wal.get_end()
+
+        self.truncate_log()
+
+        if self.checkpoint is not None and self.checkpoint_interval > 0 \
+                and self.commits_since_checkpoint >= \
+                self.checkpoint_interval:
+            self.take_checkpoint()
+
+        return end
+
+    def take_checkpoint(self, wait=False):
+        """
+        Writes out all of the logged commits and takes a checkpoint of
+        values at the resulting log position, which is written without
+        waiting for it
+
+        Args:
+            wait: Whether to wait for the checkpoint being written, if
+                  any, before taking this one and for this one after
+        """
+        if self.wal is None or self.checkpoint is None:
+            return
+
+        if wait:
+            self.checkpoint.wait()
+
+        self.wal.flush()
+
+        if self.checkpoint.write(self.wal.get_position(),
+                                 self.store.num_variables,
+                                 self.store.get_values(),
+                                 self.store.get_commit_times()):
+            self.commits_since_checkpoint = 0
+
+        if wait:
+            self.checkpoint.wait()
+            self.truncate_log()
+
+    def truncate_log(self):
+        """
+        Drops the part of the write ahead log which the last durable
+        checkpoint includes
+        """
+        if self.wal is None or self.checkpoint is None:
+            return
+
+        position = self.checkpoint.get_durable_position()
+
+        if position is not None and position > self.wal.get_base():
+            self.wal.truncate(position)
+
+    def poll_log(self):
+        """
+        Writes commits which have waited for the group commit latency in
+        the write ahead log
+        """
+        if self.wal is not None:
+            self.wal.poll()
+
+    def flush_log(self):
+        """
+        Writes all of the buffered commits in the write ahead log
+        """
+        if self.wal is not None:
+            self.wal.flush()
+
+    def get_log_position(self):
+        """
+        Returns position up to which the write ahead log is durable
+
+        Returns:
+            Log position, None if there is no log
+        """
+        if self.wal is None:
+            return None
+
+        return self.wal.get_position()
+
+    def get_log_counts(self):
+        """
+        Returns counters of commits logged, fsyncs done and truncations
+        of the write ahead log, and checkpoints taken
+
+        Returns:
+            dict with commits, syncs, truncations and checkpoints counts
+        """
+        counts = {"commits": 0, "syncs": 0, "truncations": 0,
+                  "checkpoints": 0}
+
+        if self.wal is not None:
+            counts.update(self.wal.get_counts())
+
+        if self.checkpoint is not None:
+            counts["checkpoints"] = self.checkpoint.get_num_checkpoints()
+
+        return counts
+
+    def get_last_commit_time(self):
+        """
+        Getter for last_commit_time
+
+        Returns:
+            Latest commit time of the values replayed on start
+        """
+        return self.last_commit_time
+
+    def get_checkpoint(self):
+        """
+        Getter for checkpoint
+
+        Returns:
+            Checkpoint of the site or None
+        """
+        return self.checkpoint
+
+    def get_wal(self):
+        """
+        Getter for wal
+
+        Returns:
+            WriteAheadLog of the site or None
+        """
+        return self.wal
+
+    def get_num_versions(self):
+        """
+        Getter for num_versions
+
+        Returns:
+            Number of versions kept over all of the variables
+        """
+        return self.num_versions
+
     def get_variables(self):
         """
-        Getter for variable_map
+        Returns Variables with current values of all variables present on
+        this site, meant for dumps as one object is made per variable
 
         Returns:
-            variable map of the data manager
+            dict mapping variable name to Variable
         """
-        return self.variable_map
+        variables = dict()
+
+        for index in self.store.get_indices():
+            name = Variable.get_name(index)
+            variables[name] = Variable(index, name,
+                                       self.store.get_value(index),
+                                       self.site_id)
+
+        return variables
@@ -3,11 +3,14 @@ Authors:
 Amanpreet Singh
 Sharan Agrawal
 """
+import logging
 import os
 from .Instruction import Instruction
 from .Variable import Variable
 from .constants import SITE_MANAGER_FUNCS
 
+log = logging.getLogger(__name__)
+
 
 class IO:
 
@@ -46,7 +49,12 @@ class IO:
             if instruction.find("//") == 0:
                 # Remove comments
                 continue
-            instructions.append(Instruction(instruction))
+            try:
+                instructions.append(Instruction(
+                    instruction,
+                    self.transaction_manager.get_transaction_names()))
+            except ValueError as error:
+                log.error(str(error) + ", instruction ignored")
 
         return instructions
 
@@ -64,3 +72,6 @@ class IO:
                     self.transaction_manager.tick(instruction)
 
             instructions = self.get_next_instruction()
+
+        # Commits still waiting for a group commit are written at the end
+        self.transaction_manager.flush_commits()
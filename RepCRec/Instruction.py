@@ -5,24 +5,51 @@ Sharan Agrawal
 """
 import re
 
+from .Variable import Variable
+from .constants import SITE_MANAGER_FUNCS
+
 
 class Instruction:
     """
     This class represents an instruction from the ipput file
 
+    Parameters of transaction manager instructions are resolved once
+    here if transaction_names is passed: transaction name to its id,
+    variable name to its index and value to int. Values are stored as
+    64 bit integers, so larger ones are rejected
+
     Args:
         instruction: Raw string which is to properly processed
+        transaction_names: Interner of transaction names
+    Raises:
+        ValueError if the value does not fit in 64 bits
     """
     PARAM_MATCHER = "\((.*?)\)"
+    MIN_VALUE = -2 ** 63
+    MAX_VALUE = 2 ** 63 - 1
 
-    def __init__(self, instruction):
+    def __init__(self, instruction, transaction_names=None):
 
         self.instruction_type = instruction.split('(')[0]
         self.instruction_type = self.instruction_type.strip(" ")
 
         self.params = re.search(self.PARAM_MATCHER, instruction).group()
         self.params = self.params.strip('()')
-        self.params = map(lambda x: x.strip(), self.params.split(','))
+        self.params = [param.strip() for param in self.params.split(',')]
+
+        if transaction_names is not None and \
+                self.instruction_type not in SITE_MANAGER_FUNCS:
+            self.params[0] = transaction_names.get_id(self.params[0])
+
+            if len(self.params) > 1:
+                self.params[1] = Variable.get_index(self.params[1])
+
+            if len(self.params) > 2:
+                self.params[2] = int(self.params[2])
+
+                if not self.MIN_VALUE <= self.params[2] <= self.MAX_VALUE:
+                    raise ValueError("Value of " + instruction.strip() +
+                                     " does not fit in 64 bits")
 
     def get_params(self):
         """
@@ -0,0 +1,45 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+
+
+class Interner:
+    """
+    Interner gives dense integer ids, starting from 0, to names in order
+    of their first appearance. Tables can then be keyed by ids, names are
+    only needed again for output
+    """
+
+    def __init__(self):
+        # Name to id map
+        self.ids = dict()
+        # Names indexed by their ids
+        self.names = list()
+
+    def get_id(self, name):
+        """
+        Returns id of a name, giving it the next id if it is new
+
+        Args:
+            name: Name to be interned
+        Returns:
+            Id of the name
+        """
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+
+        return self.ids[name]
+
+    def get_name(self, id):
+        """
+        Returns name given its id
+
+        Args:
+            id: Id of the name
+        Returns:
+            Name having the id
+        """
+        return self.names[id]
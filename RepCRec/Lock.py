@@ -15,6 +15,7 @@ class Lock:
         lock_type: Lock type of the lock
         transaction: Transaction which helds the lock
     """
+    __slots__ = ('lock_type', 'transaction')
 
     def __init__(self, lock_type=None, transaction=None):
         # TODO Think if we need an id for a lock
@@ -70,9 +71,17 @@ class Lock:
 
     def __eq__(self, other):
         """
-        Used for comparing this lock to others
+        Used for comparing this lock to others, locks are equal if
+        they are of same type and held by the same transaction
         """
-        if isinstance(self, other.__class__):
-            return self.__dict__ == other.__dict__
+        if isinstance(other, Lock):
+            return self.lock_type == other.lock_type and \
+                self.transaction == other.transaction
         else:
             return False
+
+    def __hash__(self):
+        """
+        Hash of the lock, consistent with equality
+        """
+        return hash((self.lock_type, self.transaction))
@@ -3,21 +3,47 @@ Authors:
 Amanpreet Singh
 Sharan Agrawal
 """
-from .enums.LockType import LockType
+from collections import OrderedDict
+
 from .Lock import Lock
+from .VariableLock import VariableLock
+from .enums.LockType import LockType
 
 
 class LockTable:
     """
     LockTable is an entity which contains information about
     locks present on a variable. Main attribute is lock_map
-    which contains variables a key and list of locks as values
-    It helps in setting, testing and clearing locks
+    which contains variables a key and VariableLock as values
+    It helps in setting, testing and clearing locks.
+    Every lock set or cleared is also recorded in the held lock
+    registry of the transaction owning it
+
+    Transactions which could not get a lock can be put in a FIFO wait
+    queue of the variable. When a lock on the variable is released, the
+    turn is granted to the waiters at the head of the queue which are
+    compatible with the locks still held and with each other, so only
+    they are retried. Acquiring a lock wakes nobody. Every request
+    granted or woken is passed to the on_wake callback
+
+    Args:
+        site_id: Id of the site owning this lock table, None for the
+                 global lock table of transaction manager
     """
 
-    def __init__(self):
-        # Variable Index to lock map
+    def __init__(self, site_id=None):
+        self.site_id = site_id
+        # Variable Index to VariableLock map
         self.lock_map = dict()
+        # Variable Index to FIFO of waiting transaction id mapped to
+        # (transaction, lock type)
+        self.wait_queues = dict()
+        # Transaction id to waiting requests mapped to their variable
+        self.waiting_on = dict()
+        # Called with the variable whenever a lock on it is released
+        self.on_release = None
+        # Called with every request removed from a wait queue
+        self.on_wake = None
 
     def get_lock_map(self):
         """
@@ -25,6 +51,20 @@ class LockTable:
         """
         return self.lock_map
 
+    def get_locks(self, variable):
+        """
+        Returns locks set on a variable
+
+        Args:
+            variable: Variable for which locks are required
+        Returns:
+            List of locks set on the variable
+        """
+        if variable in self.lock_map:
+            return self.lock_map[variable].get_locks()
+        else:
+            return []
+
     def get_len_locks(self, variable):
         """
         Returns number of locks for a variable
@@ -33,7 +73,7 @@ class LockTable:
             Number of locks for a variable
         """
         if variable in self.lock_map:
-            return len(self.lock_map[variable])
+            return self.lock_map[variable].get_count()
         else:
             return 0
 
@@ -47,15 +87,12 @@ class LockTable:
             lock_type: Lock Type to be set
             variable: Variable on which the lock is required
         """
-        lock = Lock(lock_type, transaction)
-
         if variable not in self.lock_map:
-            self.lock_map[variable] = []
+            self.lock_map[variable] = VariableLock()
 
-        for org in self.lock_map[variable]:
-            if org == lock:
-                return
-        self.lock_map[variable].append(lock)
+        if self.lock_map[variable].add(transaction, lock_type):
+            transaction.add_held_lock(Lock(lock_type, transaction),
+                                      variable, self.site_id)
 
     def is_locked(self, variable):
         """
@@ -66,12 +103,7 @@ class LockTable:
         Returns:
             bool telling whether the lock is set
         """
-        if variable not in self.lock_map:
-            return False
-        else:
-            if len(self.lock_map[variable]) == 0:
-                return False
-            return True
+        return variable in self.lock_map
 
     def is_write_locked(self, variable):
         """
@@ -85,11 +117,7 @@ class LockTable:
         if variable not in self.lock_map:
             return False
         else:
-            for lock in self.lock_map[variable]:
-                if lock.get_lock_type() == LockType.WRITE:
-                    return True
-            else:
-                return False
+            return self.lock_map[variable].is_write_locked()
 
     def is_read_locked(self, variable):
         """
@@ -103,11 +131,7 @@ class LockTable:
         if variable not in self.lock_map:
             return False
         else:
-            for lock in self.lock_map[variable]:
-                if lock.get_lock_type() == LockType.WRITE:
-                    return True
-            else:
-                return False
+            return self.lock_map[variable].is_read_locked()
 
     def free(self, variable):
         """
@@ -116,7 +140,10 @@ class LockTable:
         Args:
             variable: Variable for which locks are to be freed
         """
-        self.lock_map.pop(variable)
+        for lock in self.lock_map.pop(variable).get_locks():
+            lock.transaction.remove_held_lock(lock, variable, self.site_id)
+
+        self._lock_released(variable)
 
     def clear_lock(self, lock, variable):
         """
@@ -126,16 +153,18 @@ class LockTable:
             lock: Lock to be cleared
             variable: variable on which lock is to cleared
         """
-        if variable in self.lock_map.keys():
-            try:
-                index = self.lock_map[variable].index(lock)
-                self.lock_map[variable] = self.lock_map[variable][
-                    :index] + self.lock_map[variable][index + 1:]
-                if len(self.lock_map[variable]) == 0:
+        if variable in self.lock_map:
+            variable_lock = self.lock_map[variable]
+
+            if variable_lock.remove(lock.transaction, lock.lock_type):
+
+                if variable_lock.get_count() == 0:
                     self.lock_map.pop(variable)
+
+                lock.transaction.remove_held_lock(lock, variable,
+                                                  self.site_id)
+                self._lock_released(variable)
                 return True
-            except ValueError:
-                pass
         return False
 
     def is_locked_by_transaction(self, current_transaction, variable,
@@ -153,14 +182,260 @@ class LockTable:
             1 if present and no lock type passed
         """
 
-        if variable in self.lock_map:
-            for lock in self.lock_map[variable]:
-                transaction = lock.get_transaction()
-                if current_transaction.get_id() == transaction.get_id():
-                    if lock_type is None:
-                        return 1
-                    elif lock_type == lock.get_lock_type():
-                        return 1
-            return 0
+        if variable in self.lock_map and \
+                self.lock_map[variable].has_lock(current_transaction,
+                                                 lock_type):
+            return 1
         else:
             return 0
+
+    def set_on_release(self, on_release):
+        """
+        Sets the callback to be called with the variable whenever
+        a lock on it is released
+
+        Args:
+            on_release: Callable taking variable name or None
+        """
+        self.on_release = on_release
+
+    def set_on_wake(self, on_wake):
+        """
+        Sets the callback to be called with every request woken up
+
+        Args:
+            on_wake: Callable taking the request
+        """
+        self.on_wake = on_wake
+
+    def _woken(self, request):
+        """
+        Notifies the on_wake callback about a request woken up
+
+        Args:
+            request: Request removed from a wait queue
+        """
+        if self.on_wake is not None:
+            self.on_wake(request)
+
+    def _lock_released(self, variable):
+        """
+        Notifies the on_release callback about a variable whose lock
+        was released, which grants it to waiters knowing the locks held
+        on the variable at all of the lock tables
+
+        Args:
+            variable: Variable whose lock was released
+        """
+        if self.on_release is not None:
+            self.on_release(variable)
+
+    def wait(self, transaction, lock_type, variable, request=None):
+        """
+        Puts a request of a transaction at the end of wait queue of a
+        variable, does nothing if it is already waiting on the variable
+
+        Args:
+            transaction: Transaction which is waiting
+            lock_type: Type of lock the transaction is waiting for
+            variable: Variable on which transaction waits
+            request: Hashable identifying the waiting request, in case a
+                     transaction can wait with more than one request,
+                     defaults to id of the transaction
+        """
+        if request is None:
+            request = transaction.get_id()
+
+        if variable not in self.wait_queues:
+            self.wait_queues[variable] = OrderedDict()
+
+        queue = self.wait_queues[variable]
+
+        if request not in queue:
+            queue[request] = (transaction, lock_type)
+
+            if transaction.get_id() not in self.waiting_on:
+                self.waiting_on[transaction.get_id()] = dict()
+
+            self.waiting_on[transaction.get_id()][request] = variable
+
+    def is_waiting(self, transaction, variable, request=None):
+        """
+        Tells whether a request of a transaction is in wait queue of
+        a variable
+
+        Args:
+            transaction: Transaction to be checked
+            variable: Variable whose queue is to be checked
+            request: Hashable identifying the request, defaults to
+                     id of the transaction
+        Returns:
+            bool telling whether the transaction is waiting
+        """
+        if request is None:
+            request = transaction.get_id()
+
+        requests = self.waiting_on.get(transaction.get_id(), dict())
+
+        return requests.get(request) == variable
+
+    def get_waiters(self, variable):
+        """
+        Returns requests waiting on a variable in FIFO order
+
+        Args:
+            variable: Variable whose waiters are required
+        Returns:
+            List of (request, transaction, lock type) tuples
+        """
+        if variable in self.wait_queues:
+            return [(request, transaction, lock_type) for
+                    request, (transaction, lock_type) in
+                    self.wait_queues[variable].items()]
+        else:
+            return []
+
+    def get_waited_variables(self):
+        """
+        Returns variables which have transactions waiting on them
+
+        Returns:
+            List of variables
+        """
+        return list(self.wait_queues)
+
+    def has_waiters(self, variable):
+        """
+        Tells whether any transaction waits on a variable
+
+        Args:
+            variable: Variable to be checked
+        Returns:
+            bool telling whether the wait queue of variable is not empty
+        """
+        return variable in self.wait_queues
+
+    @staticmethod
+    def is_compatible(transaction, lock_type, locks):
+        """
+        Tells whether a lock of a transaction can be held along with
+        other locks, a write lock only with locks of the transaction
+        itself and a read lock with any read lock
+
+        Args:
+            transaction: Transaction which wants the lock
+            lock_type: Type of the lock required
+            locks: Locks held on the variable
+        Returns:
+            bool telling whether the lock is compatible
+        """
+        for lock in locks:
+
+            if lock.transaction.get_id() == transaction.get_id():
+                continue
+
+            if lock_type == LockType.WRITE or \
+                    lock.lock_type == LockType.WRITE:
+                return False
+
+        return True
+
+    def grant(self, variable, locks):
+        """
+        Grants the turn to the waiters at the head of wait queue of a
+        variable, in FIFO order, as long as each of them is compatible
+        with the locks held and with the waiters granted before it.
+        Waiters already holding a lock on the variable, to upgrade it,
+        go ahead of the others, which wait for them to finish anyway
+
+        Args:
+            variable: Variable whose lock was released
+            locks: Locks still held on the variable at any lock table
+        Returns:
+            List of transactions granted in FIFO order
+        """
+        if variable not in self.wait_queues:
+            return []
+
+        held = list(locks)
+        granted = list()
+        holders = set(lock.transaction.get_id() for lock in held)
+        requests = sorted(self.wait_queues[variable].items(),
+                          key=lambda item: item[1][0].get_id() not in holders)
+
+        for request, (transaction, lock_type) in requests:
+
+            if not self.is_compatible(transaction, lock_type, held):
+                break
+
+            held.append(Lock(lock_type, transaction))
+            self._dequeue(variable, request, transaction)
+            granted.append(transaction)
+            self._woken(request)
+
+        return granted
+
+    def wake(self, variable, lock_type):
+        """
+        Removes transactions waiting for a type of lock from wait queue
+        of a variable, whatever locks are held on it
+
+        Args:
+            variable: Variable whose waiters are to be woken
+            lock_type: Type of lock the woken transactions wait for
+        Returns:
+            List of transactions woken in FIFO order
+        """
+        if variable not in self.wait_queues:
+            return []
+
+        woken = list()
+
+        for request, (transaction, waiting_type) in list(
+                self.wait_queues[variable].items()):
+
+            if waiting_type == lock_type:
+                self._dequeue(variable, request, transaction)
+                woken.append(transaction)
+                self._woken(request)
+
+        return woken
+
+    def _dequeue(self, variable, request, transaction):
+        """
+        Removes a request from wait queue of a variable
+
+        Args:
+            variable: Variable whose queue holds the request
+            request: Request to be removed
+            transaction: Transaction which made the request
+        """
+        queue = self.wait_queues[variable]
+        queue.pop(request)
+
+        if len(queue) == 0:
+            self.wait_queues.pop(variable)
+
+        requests = self.waiting_on[transaction.get_id()]
+        requests.pop(request)
+
+        if len(requests) == 0:
+            self.waiting_on.pop(transaction.get_id())
+
+    def wake_transaction(self, transaction):
+        """
+        Removes a transaction from all of the wait queues it is in
+
+        Args:
+            transaction: Transaction to be woken
+        """
+        requests = self.waiting_on.pop(transaction.get_id(), dict())
+
+        for request, variable in requests.items():
+            queue = self.wait_queues[variable]
+            queue.pop(request)
+
+            if len(queue) == 0:
+                self.wait_queues.pop(variable)
+
+            self._woken(request)
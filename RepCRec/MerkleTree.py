@@ -0,0 +1,140 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from array import array
+from bisect import bisect_left
+
+
+class MerkleTree:
+    """
+    MerkleTree is a hash tree over values of a sorted list of variables,
+    so that two sites holding the same variables can find the ones whose
+    values differ by comparing hashes from the root down, only descending
+    where they differ.
+
+    Nodes are kept in an array as a complete binary tree, node i has
+    children 2i and 2i + 1 and leaves start at size. Hashes are 64 bit,
+    mixed with splitmix64, as they only need to tell values apart and not
+    resist tampering.
+
+    Args:
+        indices: Indices of the variables in increasing order
+        values: Values of the variables in order of indices
+    """
+    MASK = (1 << 64) - 1
+
+    def __init__(self, indices, values):
+        self.indices = indices
+        self.size = 1
+
+        while self.size < len(indices):
+            self.size *= 2
+
+        self.nodes = array('Q', bytes(16 * self.size))
+
+        for position, index in enumerate(indices):
+            self.nodes[self.size + position] = self.hash_leaf(
+                index, values[position])
+
+        for node in range(self.size - 1, 0, -1):
+            self.nodes[node] = self.hash_pair(self.nodes[2 * node],
+                                              self.nodes[2 * node + 1])
+
+    @staticmethod
+    def mix(hash_value):
+        """
+        Finalizer of splitmix64, spreading every bit of input over output
+
+        Args:
+            hash_value: Integer to be mixed
+        Returns:
+            Mixed 64 bit integer
+        """
+        hash_value &= MerkleTree.MASK
+        hash_value = ((hash_value ^ (hash_value >> 30)) *
+                      0xBF58476D1CE4E5B9) & MerkleTree.MASK
+        hash_value = ((hash_value ^ (hash_value >> 27)) *
+                      0x94D049BB133111EB) & MerkleTree.MASK
+
+        return hash_value ^ (hash_value >> 31)
+
+    @staticmethod
+    def hash_leaf(index, value):
+        """
+        Returns hash of a variable and its value
+
+        Args:
+            index: Index of the variable
+            value: Value of the variable
+        Returns:
+            64 bit hash
+        """
+        return MerkleTree.mix(MerkleTree.mix(index) + value)
+
+    @staticmethod
+    def hash_pair(left, right):
+        """
+        Returns hash of a node from hashes of its children
+
+        Args:
+            left: Hash of the left child
+            right: Hash of the right child
+        Returns:
+            64 bit hash
+        """
+        return MerkleTree.mix(left * 0x9E3779B97F4A7C15 + right)
+
+    def update(self, index, value):
+        """
+        Changes value of a variable, rehashing its path to the root
+
+        Args:
+            index: Index of the variable
+            value: New value of the variable
+        """
+        node = self.size + bisect_left(self.indices, index)
+        self.nodes[node] = self.hash_leaf(index, value)
+        node //= 2
+
+        while node != 0:
+            self.nodes[node] = self.hash_pair(self.nodes[2 * node],
+                                              self.nodes[2 * node + 1])
+            node //= 2
+
+    def get_root(self):
+        """
+        Returns hash of the root
+
+        Returns:
+            64 bit hash of all of the values
+        """
+        return self.nodes[1]
+
+    def diff(self, other):
+        """
+        Finds the variables whose values differ from another tree over the
+        same variables, visiting only nodes whose hashes differ
+
+        Args:
+            other: MerkleTree over the same indices
+        Returns:
+            List of indices of differing variables in increasing order
+        """
+        differing = list()
+        stack = [1]
+
+        while len(stack) != 0:
+            node = stack.pop()
+
+            if self.nodes[node] == other.nodes[node]:
+                continue
+
+            if node >= self.size:
+                differing.append(self.indices[node - self.size])
+            else:
+                stack.append(2 * node + 1)
+                stack.append(2 * node)
+
+        return differing
@@ -0,0 +1,198 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+import zlib
+from array import array
+from bisect import bisect_left
+
+from .enums.ReplicationPolicy import ReplicationPolicy
+
+
+class Placement:
+    """
+    Placement is the table of sites holding a replica of each variable,
+    built once when the system starts according to a replication policy.
+    Distinct replica sets are kept once, each variable index maps to the
+    position of its set, so lookups are O(1) and cost no parsing.
+
+    Args:
+        num_sites: Number of sites
+        num_variables: Number of total variables present
+        policy: ReplicationPolicy used to place replicas
+        factor: Number of replicas of every variable, not used by
+                even-odd placement
+    """
+    # Points on the hash ring per site for consistent hashing
+    VIRTUAL_NODES = 64
+
+    def __init__(self, num_sites, num_variables,
+                 policy=ReplicationPolicy.EVEN_ODD, factor=3):
+        self.num_sites = num_sites
+        self.num_variables = num_variables
+        self.policy = policy
+        self.factor = max(1, min(factor, num_sites))
+        self.all_sites = tuple(range(1, num_sites + 1))
+        # Distinct sets of site indices, empty set is for unknown variables
+        self.replica_sets = [tuple()]
+        self.set_ids = array('l', bytes(8 * (num_variables + 1)))
+        self.site_indices = [None] + [array('q')
+                                      for i in range(num_sites)]
+        # Indices of variables having their only replica on a site
+        self.site_unreplicated = [None] + [array('q')
+                                           for i in range(num_sites)]
+
+        if policy == ReplicationPolicy.CONSISTENT_HASHING:
+            self.build_ring()
+
+        set_map = dict()
+
+        for index in range(1, num_variables + 1):
+            sites = self.place(index)
+
+            if sites not in set_map:
+                set_map[sites] = len(self.replica_sets)
+                self.replica_sets.append(sites)
+
+            self.set_ids[index] = set_map[sites]
+
+            for site in sites:
+                self.site_indices[site].append(index)
+
+            if len(sites) == 1:
+                self.site_unreplicated[sites[0]].append(index)
+
+    def build_ring(self):
+        """
+        Builds the consistent hash ring with VIRTUAL_NODES points for
+        every site
+        """
+        ring = list()
+
+        for site in range(1, self.num_sites + 1):
+
+            for node in range(self.VIRTUAL_NODES):
+                point = zlib.crc32(
+                    ("site" + str(site) + "-" + str(node)).encode())
+                ring.append((point, site))
+
+        ring.sort()
+        self.ring_points = [point for point, site in ring]
+        self.ring_sites = [site for point, site in ring]
+
+    def place(self, index):
+        """
+        Computes the sites holding replicas of a variable under the policy
+
+        Args:
+            index: Index of the variable
+        Returns:
+            tuple of site indices in increasing order
+        """
+        if self.policy == ReplicationPolicy.EVEN_ODD:
+
+            if index % 2 == 0:
+                return self.all_sites
+            else:
+                return ((index % self.num_sites) + 1,)
+
+        elif self.policy == ReplicationPolicy.FIXED_FACTOR:
+            return tuple(sorted(((index + i) % self.num_sites) + 1
+                                for i in range(self.factor)))
+
+        # Walk the ring clockwise from the variable's point until enough
+        # distinct sites are found
+        sites = set()
+        position = bisect_left(self.ring_points,
+                               zlib.crc32(("x" + str(index)).encode()))
+
+        while len(sites) < self.factor:
+            sites.add(self.ring_sites[position % len(self.ring_sites)])
+            position += 1
+
+        return tuple(sorted(sites))
+
+    def get_sites(self, index):
+        """
+        Returns sites holding replicas of a variable
+
+        Args:
+            index: Index of the variable
+        Returns:
+            tuple of site indices in increasing order, empty if the
+            variable is not present
+        """
+        if 0 < index <= self.num_variables:
+            return self.replica_sets[self.set_ids[index]]
+        else:
+            return self.replica_sets[0]
+
+    def get_set_id(self, index):
+        """
+        Returns position of the replica set of a variable, variables with
+        the same one are held by the same sites
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Position of the replica set, 0 if the variable is not present
+        """
+        if 0 < index <= self.num_variables:
+            return self.set_ids[index]
+        else:
+            return 0
+
+    def get_num_sets(self):
+        """
+        Returns number of replica sets, including the empty one at
+        position 0
+
+        Returns:
+            Number of replica sets
+        """
+        return len(self.replica_sets)
+
+    def get_set_sites(self, set_id):
+        """
+        Returns sites holding a replica set
+
+        Args:
+            set_id: Position of the replica set
+        Returns:
+            tuple of site indices in increasing order
+        """
+        return self.replica_sets[set_id]
+
+    def is_replicated(self, index):
+        """
+        Tells whether a variable has more than one replica
+
+        Args:
+            index: Index of the variable
+        Returns:
+            boolean whether replicated or not
+        """
+        return len(self.get_sites(index)) > 1
+
+    def get_indices(self, site_id):
+        """
+        Returns indices of variables having a replica on a site
+
+        Args:
+            site_id: Index of the site
+        Returns:
+            array of indices in increasing order
+        """
+        return self.site_indices[site_id]
+
+    def get_unreplicated_indices(self, site_id):
+        """
+        Returns indices of variables having their only replica on a site
+
+        Args:
+            site_id: Index of the site
+        Returns:
+            array of indices in increasing order
+        """
+        return self.site_unreplicated[site_id]
@@ -0,0 +1,568 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from .LockTable import LockTable
+from .SiteClient import BatchError
+from .enums.LockType import LockType
+
+
+class RemoteDataManager:
+    """
+    RemoteDataManager stands in for the DataManager of a site running in
+    its own process, with the same interface, sending operations to it
+    through a SiteClient.
+
+    Locks are granted by the site, a granted lock is also set in a mirror
+    lock table here holding the transactions themselves, so that waiting
+    transactions are woken and a failing site aborts its lock holders as
+    with a local data manager, and whether a lock can be granted is known
+    without asking the site. Operations whose result is not needed
+    at once, writes, lock releases, log commits and pruning of versions,
+    are kept until the next operation needing a reply and sent in the
+    same batch with it. Operations whose result will be needed next, as
+    the read following a read lock, can be prefetched after it in the
+    same batch, so that each instruction takes one round trip per site.
+
+    Args:
+        id: Id of the site
+        placement: Placement of replicas of variables on sites
+        client: SiteClient connected to the site process
+    """
+
+    def __init__(self, id, placement, client):
+        self.site_id = id
+        self.placement = placement
+        self.client = client
+        self.lock_table = LockTable(id)
+        self.indices = placement.get_indices(id)
+        self.index_set = set(self.indices)
+        # Operations not sent yet as (operation name, tuple of args)
+        self.deferred = list()
+        # (transaction, lock type, variable) of the lock request in flight
+        self.requested = None
+        # Operations to be sent after the next one needing a reply, whose
+        # results are kept, as (operation name, tuple of args)
+        self.prefetching = list()
+        # Operations sent in the last batch and the prefetched ones of it
+        self.sent = list()
+        self.sent_prefetches = list()
+        # Pairs of (operation name, tuple of args) and result of prefetched
+        # operations, valid until another batch is sent or deferred to
+        self.prefetched = list()
+        # Results found prefetched for operations sent, to be received
+        self.ready = list()
+        # Whether writes were sent since the last log commit
+        self.uncommitted = False
+        # Versions dropped by prunings sent, not counted yet
+        self.reclaimed = 0
+
+    @staticmethod
+    def encode(transaction):
+        """
+        Returns what is sent to the site for a transaction
+
+        Args:
+            transaction: Transaction
+        Returns:
+            Tuple of (id, name) of the transaction
+        """
+        return (transaction.id, transaction.name)
+
+    def defer(self, name, *args):
+        """
+        Keeps an operation to be sent with the next batch
+
+        Args:
+            name: Name of the operation
+            args: Args of the operation
+        """
+        self.deferred.append((name, args))
+        self.prefetched = list()
+
+    def prefetch(self, name, *args):
+        """
+        Keeps an operation to be sent after the next operation needing a
+        reply, in the same batch. Its result is used by the same operation
+        sent before any other batch instead of sending it
+
+        Args:
+            name: Name of the operation
+            args: Args of the operation
+        """
+        self.prefetching.append((name, args))
+
+    def call(self, name, *args):
+        """
+        Runs an operation at the site after the deferred ones and waits
+        for its result
+
+        Args:
+            name: Name of the operation
+            args: Args of the operation
+        Returns:
+            Result of the operation
+        """
+        self.send(name, *args)
+
+        return self.receive()
+
+    def send(self, name, *args):
+        """
+        Sends an operation after the deferred ones and before the
+        prefetched ones without waiting for its result, which is
+        collected with receive. Nothing is sent if its result was
+        prefetched
+
+        Args:
+            name: Name of the operation
+            args: Args of the operation
+        """
+        for op, result in self.prefetched:
+
+            if op == (name, args):
+                self.ready.append(result)
+                return
+
+        ops = self.deferred
+        ops.append((name, args))
+        ops.extend(self.prefetching)
+        self.deferred = list()
+        self.sent = ops
+        self.sent_prefetches = self.prefetching
+        self.prefetching = list()
+        self.prefetched = list()
+        self.client.send(ops)
+
+    def receive(self):
+        """
+        Waits for the result of the operation sent last, keeping the
+        results of prefetched operations sent with it and counting the
+        versions dropped by prunings
+
+        Returns:
+            Result of the operation
+        Raises:
+            BatchError naming the operation of the batch which failed at
+            the site, the operations before it took effect
+        """
+        if len(self.ready) != 0:
+            return self.ready.pop()
+
+        try:
+            results = self.client.receive()
+        except BatchError as error:
+            error.operation = self.sent[error.index][0]
+            self.count_reclaimed(error.results)
+            raise
+
+        position = len(results) - len(self.sent_prefetches)
+
+        self.prefetched = list(zip(self.sent_prefetches, results[position:]))
+        self.count_reclaimed(results)
+
+        return results[position - 1]
+
+    def count_reclaimed(self, results):
+        """
+        Counts the versions dropped by prunings of the last batch sent
+
+        Args:
+            results: Results of the operations of the batch which ran
+        """
+        for (name, args), result in zip(self.sent, results):
+
+            if name == "prune_versions":
+                self.reclaimed += result
+
+    def close(self):
+        """
+        Closes the connection to the site
+        """
+        self.client.close()
+
+    def get_variable(self, index):
+        """
+        Returns a Variable with current value of a variable given its index
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Variable instance, None if not present on this site
+        """
+        return self.call("get_variable", index)
+
+    def has_variable(self, index):
+        """
+        Tells whether variable is present on this site
+
+        Args:
+            index: Index of the variable to be checked
+        Returns:
+            boolean whether present or not
+        """
+        return index in self.index_set
+
+    def get_value(self, index):
+        """
+        Returns latest committed value of a variable present on this site
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Value of the variable
+        """
+        return self.call("get_value", index)
+
+    def get_version(self, index, time):
+        """
+        Returns value of a variable present on this site as committed at
+        or before time
+
+        Args:
+            index: Index of the variable
+            time: Time at which the value is required
+        Returns:
+            Value of the variable at time
+        """
+        return self.call("get_version", index, time)
+
+    def get_timed_version(self, index, time):
+        """
+        Returns the newest version of a variable present on this site
+        committed at or before time, with its commit time
+
+        Args:
+            index: Index of the variable
+            time: Time at which the value is required
+        Returns:
+            Tuple of (commit time, value), None if it had none
+        """
+        return self.call("get_timed_version", index, time)
+
+    def get_commit_time(self, index):
+        """
+        Returns time at which the latest value of a variable present on
+        this site was committed
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Commit time of the value
+        """
+        return self.call("get_commit_time", index)
+
+    def get_indices(self):
+        """
+        Returns indices of variables present on this site
+
+        Returns:
+            array of indices in increasing order
+        """
+        return self.indices
+
+    def get_num_variables(self):
+        """
+        Returns number of variables present on this site
+
+        Returns:
+            Number of variables
+        """
+        return len(self.indices)
+
+    def clear_lock(self, lock, variable):
+        """
+        Clear lock for the variable, the site clears it with the next
+        batch
+
+        Args:
+            lock: Lock to be cleared
+            variable: Index of variable for which the lock is to be cleared
+        """
+        if self.lock_table.clear_lock(lock, variable):
+            self.defer("clear_lock", lock.lock_type,
+                       self.encode(lock.transaction), variable)
+
+    def get_lock_table(self):
+        """
+        Get the mirror lock table of this data manager
+
+        Returns:
+            Lock table holding the locks granted by the site
+        """
+        return self.lock_table
+
+    def can_get_lock(self, transaction, lock_type, variable):
+        """
+        Tells whether the site would grant a lock on variable to a
+        transaction, without setting it. Every lock the site grants or
+        clears is set or cleared in the mirror lock table first, so it is
+        answered from there without asking the site
+
+        Args:
+            transaction: Transaction which wants the lock
+            lock_type: Type of the lock required
+            variable: Index of variable on which lock is required
+        Returns:
+            Boolean according to whether lock can be acquired or not
+        """
+        if self.lock_table.is_locked_by_transaction(transaction, variable):
+            return self.lock_table.get_len_locks(variable) == 1
+
+        if lock_type == LockType.WRITE:
+            return not self.lock_table.is_locked(variable)
+        else:
+            return not self.lock_table.is_write_locked(variable)
+
+    def get_lock(self, transaction, lock_type, variable):
+        """
+        Tries to get a lock on variable for a transaction from the site,
+        with the operations prefetched
+
+        Args:
+            transaction: Transaction which wants the lock
+            lock_type: Type of the lock required
+            variable: Index of variable on which lock is required
+        Returns:
+            Boolean according to whether lock was acquired or not
+        """
+        if self.requested == (transaction, lock_type, variable):
+            self.requested = None
+            granted = self.receive()
+        else:
+            granted = self.call("get_lock", self.encode(transaction),
+                                lock_type, variable)
+
+        if granted:
+            self.lock_table.set_lock(transaction, lock_type, variable)
+            return True
+
+        return False
+
+    def request_lock(self, transaction, lock_type, variable):
+        """
+        Sends a lock request without waiting for the site, the next
+        get_lock with the same args collects its result and must follow
+
+        Args:
+            transaction: Transaction which wants the lock
+            lock_type: Type of the lock required
+            variable: Index of variable on which lock is required
+        """
+        self.send("get_lock", self.encode(transaction), lock_type, variable)
+        self.requested = (transaction, lock_type, variable)
+
+    def write_variable(self, transaction, index, value, time):
+        """
+        Write a value for a variable for a transaction, as a new version
+        of the variable, the site writes it with the next batch
+
+        Args:
+            transaction: Transaction which wants to write the value
+            index: Index of variable whose value is to be written
+            value: Value to be written
+            time: Commit time of the transaction
+
+        Returns:
+            Boolean whether write was successful or not
+        """
+        if self.lock_table.is_locked_by_transaction(transaction,
+                                                    index,
+                                                    LockType.WRITE):
+            self.write_value(index, value, time)
+            return True
+        else:
+            return False
+
+    def write_value(self, index, value, time):
+        """
+        Writes a committed value of a variable as a new version with the
+        next batch, whatever locks are held on this site
+
+        Args:
+            index: Index of variable whose value is to be written
+            value: Value to be written
+            time: Commit time of the transaction
+        """
+        self.defer("write_value", index, value, time)
+        self.uncommitted = True
+
+    def get_tree(self, set_id):
+        """
+        Returns the MerkleTree over variables of a replica set held by this
+        site
+
+        Args:
+            set_id: Position of the replica set
+        Returns:
+            MerkleTree of the replica set, None if not held by this site
+        """
+        return self.call("get_tree", set_id)
+
+    def get_replica_sets(self):
+        """
+        Returns positions of replica sets this site holds variables of
+
+        Returns:
+            List of positions of replica sets in increasing order
+        """
+        return self.call("get_replica_sets")
+
+    def export_values(self, indices):
+        """
+        Returns committed values of variables, for a recovering site to
+        catch up with this one in a single transfer
+
+        Args:
+            indices: Indices of the variables
+        Returns:
+            List of (commit time, value) in order of indices
+        """
+        return self.call("export_values", indices)
+
+    def import_values(self, indices, values):
+        """
+        Commits values transferred from another site with the next batch
+
+        Args:
+            indices: Indices of the variables
+            values: List of (commit time, value) in order of indices
+        """
+        self.defer("import_values", indices, values)
+        self.uncommitted = True
+
+    def prune_versions(self, time, all_variables):
+        """
+        Drops versions of variables which reads at time or later can
+        not see with the next batch
+
+        Args:
+            time: Oldest time at which a read may happen
+            all_variables: If false, only variables written since last
+                           pruning are pruned
+        Returns:
+            Number of versions dropped by the prunings replied to since
+            the last call
+        """
+        self.defer("prune_versions", time, all_variables)
+        reclaimed = self.reclaimed
+        self.reclaimed = 0
+
+        return reclaimed
+
+    def has_uncommitted(self):
+        """
+        Tells whether writes were sent to the site since the last log
+        commit, as otherwise the site has nothing to log
+
+        Returns:
+            boolean whether there are writes to be committed
+        """
+        return self.uncommitted
+
+    def commit_log(self):
+        """
+        Ends the commit in progress in the write ahead log of the site
+        with the next batch
+        """
+        self.defer("commit_log")
+        self.uncommitted = False
+
+    def request_commit_log(self):
+        """
+        Sends the end of the commit in progress in the write ahead log
+        with the log position durable after it prefetched, the position
+        the commit is durable at is collected with receive
+        """
+        self.prefetch("get_log_position")
+        self.send("commit_log")
+        self.uncommitted = False
+
+    def take_checkpoint(self, wait=False):
+        """
+        Takes a checkpoint of the site
+
+        Args:
+            wait: Whether to wait for it to be written
+        """
+        self.call("take_checkpoint", wait)
+
+    def poll_log(self):
+        """
+        Nothing to do, the site writes commits whose group commit latency
+        passed on its own
+        """
+
+    def flush_log(self):
+        """
+        Writes all of the buffered commits in the write ahead log
+        """
+        self.call("flush_log")
+
+    def get_log_position(self):
+        """
+        Returns position up to which the write ahead log of the site is
+        durable
+
+        Returns:
+            Log position, None if there is no log
+        """
+        return self.call("get_log_position")
+
+    def get_log_counts(self):
+        """
+        Returns counters of commits logged and fsyncs done in the write
+        ahead log of the site, and checkpoints taken
+
+        Returns:
+            dict with commits, syncs and checkpoints counts
+        """
+        return self.call("get_log_counts")
+
+    def get_last_commit_time(self):
+        """
+        Returns latest commit time of the values the site replayed on
+        start
+
+        Returns:
+            Commit time
+        """
+        return self.call("get_last_commit_time")
+
+    def get_checkpoint(self):
+        """
+        Checkpoint is in the site process
+
+        Returns:
+            None
+        """
+        return None
+
+    def get_wal(self):
+        """
+        Write ahead log is in the site process
+
+        Returns:
+            None
+        """
+        return None
+
+    def get_num_versions(self):
+        """
+        Returns number of versions kept over all of the variables
+
+        Returns:
+            Number of versions
+        """
+        return self.call("get_num_versions")
+
+    def get_variables(self):
+        """
+        Returns Variables with current values of all variables present on
+        this site
+
+        Returns:
+            dict mapping variable name to Variable
+        """
+        return self.call("get_variables")
@@ -0,0 +1,98 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from array import array
+
+
+class ReplicaIndex:
+    """
+    ReplicaIndex tells which sites hold a readable copy of every variable,
+    as a mask of sites for each variable index where bit i - 1 is set for
+    site i. Sites update it whenever a copy becomes readable or stops
+    being readable, at start every copy is readable.
+
+    Args:
+        placement: Placement of replicas of variables on sites
+    """
+
+    def __init__(self, placement):
+        num_variables = placement.num_variables
+
+        # Masks of up to 64 sites fit in a machine word
+        if placement.num_sites <= 64:
+            self.masks = array('Q', bytes(8 * (num_variables + 1)))
+        else:
+            self.masks = [0] * (num_variables + 1)
+
+        set_masks = list()
+
+        for sites in placement.replica_sets:
+            mask = 0
+
+            for site in sites:
+                mask |= 1 << (site - 1)
+
+            set_masks.append(mask)
+
+        for index in range(1, num_variables + 1):
+            self.masks[index] = set_masks[placement.set_ids[index]]
+
+    def add(self, index, site_id):
+        """
+        Records that a site has a readable copy of a variable
+
+        Args:
+            index: Index of the variable
+            site_id: Index of the site
+        """
+        self.masks[index] |= 1 << (site_id - 1)
+
+    def remove(self, index, site_id):
+        """
+        Records that a site has no readable copy of a variable
+
+        Args:
+            index: Index of the variable
+            site_id: Index of the site
+        """
+        self.masks[index] &= ~(1 << (site_id - 1))
+
+    def get_first_site(self, index):
+        """
+        Returns the lowest site having a readable copy of a variable
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Index of the site, None if there is no readable copy
+        """
+        if index <= 0 or index >= len(self.masks) or self.masks[index] == 0:
+            return None
+
+        mask = self.masks[index]
+
+        return (mask & -mask).bit_length()
+
+    def get_sites(self, index):
+        """
+        Returns all sites having a readable copy of a variable
+
+        Args:
+            index: Index of the variable
+        Returns:
+            List of site indices in increasing order
+        """
+        if index <= 0 or index >= len(self.masks):
+            return []
+
+        sites = list()
+        mask = self.masks[index]
+
+        while mask != 0:
+            lowest = mask & -mask
+            sites.append(lowest.bit_length())
+            mask ^= lowest
+
+        return sites
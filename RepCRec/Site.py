@@ -3,12 +3,15 @@ Authors:
 Amanpreet Singh
 Sharan Agrawal
 """
+import bisect
+import itertools
 import logging
 
 from tornado import web, gen, process, httpserver, netutil
 from .config import config
 from .SiteHandler import SiteHandler
 from .DataManager import DataManager
+from .Bitmap import Bitmap
 from .Transaction import Transaction
 
 from .enums.SiteStatus import SiteStatus
@@ -28,23 +31,45 @@ class Site:
 
     Args:
         index: Index of the current site
+        placement: Placement of replicas of variables on sites
+        replica_index: ReplicaIndex to be kept updated with the variables
+                       readable at this site
+        wal: WriteAheadLog of the site or None
+        checkpoint: Checkpoint of the site or None
+        checkpoint_interval: Number of commits between checkpoints, 0 to
+                             never take one
+        data_manager: Data manager of the site if it runs elsewhere, one
+                      is made here if not passed
     """
     BASE_PORT = config['BASE_PORT']
 
-    def __init__(self, index):
+    def __init__(self, index, placement, replica_index, wal=None,
+                 checkpoint=None, checkpoint_interval=0, data_manager=None):
         self.id = index
 
         # Variables are mainly in DataManager, here only for convenience
         self.variables = []
         self.status = SiteStatus.UP
         self.last_failure_time = None
-        self.data_manager = DataManager(self.id)
-        self.recovered_variables = set()
-
-        for i in range(1, 21):
-
-            if i % 2 == 0 or (1 + i % 10) == self.id:
-                self.recovered_variables.add('x' + str(i))
+        # Ticks at which status of the site changed, increasing, and the
+        # status it changed to at each of them
+        self.status_times = []
+        self.statuses = []
+        self.placement = placement
+        self.data_manager = data_manager
+
+        if self.data_manager is None:
+            self.data_manager = DataManager(self.id, placement, wal,
+                                            checkpoint, checkpoint_interval)
+        self.replica_index = replica_index
+        # Indices of variables which can be read at this site, the site
+        # is fully recovered once all of its variables are in it
+        self.recovered_variables = Bitmap(placement.num_variables)
+        self.recovered_variables.add_all(self.data_manager.get_indices())
+        # Called whenever status of the site changes
+        self.on_status_change = None
+        # Called whenever the set of variables readable at the site changes
+        self.on_readable_change = None
 
     def set_status(self, status):
         """
@@ -55,10 +80,42 @@ class Site:
 
         if status in SiteStatus:
             self.status = status
+            self._readable_changed()
+
+            if self.on_status_change is not None:
+                self.on_status_change(self)
         else:
             log.error("Invalid Site status")
         return
 
+    def set_on_status_change(self, on_status_change):
+        """
+        Sets the callback to be called whenever status of the site
+        changes
+
+        Args:
+            on_status_change: Callable taking the site or None
+        """
+        self.on_status_change = on_status_change
+
+    def set_on_readable_change(self, on_readable_change):
+        """
+        Sets the callback to be called whenever status or recovered
+        variables of the site change, which changes what can be read
+        from the site
+
+        Args:
+            on_readable_change: Callable taking no arguments or None
+        """
+        self.on_readable_change = on_readable_change
+
+    def _readable_changed(self):
+        """
+        Notifies the readable change callback if there is one
+        """
+        if self.on_readable_change is not None:
+            self.on_readable_change()
+
     def get_status(self):
         """
         Returns status of the site
@@ -95,6 +152,71 @@ class Site:
         """
         self.last_failure_time = time
 
+    def record_status(self, time):
+        """
+        Records that the site has its current status from a tick on
+
+        Args:
+            time: Tick from which the site has the status
+        """
+        if self.status == SiteStatus.DOWN:
+            self.set_last_failure_time(time)
+
+        if len(self.status_times) > 0 and self.status_times[-1] == time:
+            self.statuses[-1] = self.status
+        else:
+            self.status_times.append(time)
+            self.statuses.append(self.status)
+
+    def get_status_at(self, time):
+        """
+        Returns status of the site at a tick, along with the tick from
+        which it had it
+
+        Args:
+            time: Tick at which the status is required
+        Returns:
+            Tuple of (SiteStatus, tick), tick is None if the site had
+            the status from the start
+        """
+        position = bisect.bisect_right(self.status_times, time) - 1
+
+        if position < 0:
+            return (SiteStatus.UP, None)
+
+        return (self.statuses[position], self.status_times[position])
+
+    def was_readable(self, variable, time):
+        """
+        Tells whether the copy of a variable at this site could be read
+        at a tick, so that a read only transaction which began then reads
+        the version it had. Copy at a site which is down now is not read.
+        Copy at a recovering site was readable if its version was
+        committed after the site recovered. A copy with no other replica
+        is readable even if the site was down then, as nothing is written
+        to it while the site is down
+
+        Args:
+            variable: Index of the variable
+            time: Tick at which the copy is read
+        Returns:
+            boolean whether the copy was readable
+        """
+        if self.status == SiteStatus.DOWN:
+            return False
+
+        if not self.placement.is_replicated(variable):
+            return True
+
+        status, since = self.get_status_at(time)
+
+        if status != SiteStatus.RECOVERING:
+            return status == SiteStatus.UP
+
+        version = self.data_manager.get_timed_version(variable, time)
+
+        return version is not None and version[0] >= since
+
     def get_lock(self, transaction, typeof, variable):
         """
         Tries to provide a transaction a lock on a variable.
@@ -103,16 +225,19 @@ class Site:
         Args:
             transaction: Transaction which wants the lock
             typeof: type of lock
-            variable: Variable on which lock is required
+            variable: Index of variable on which lock is required
         """
 
         if self.data_manager.get_lock(transaction, typeof, variable):
 
-            self.recovered_variables.add(variable)
+            if self.recovered_variables.add(variable):
+                self.replica_index.add(variable, self.id)
+                self._readable_changed()
 
             if len(self.recovered_variables) ==  \
-                    len(self.data_manager.variable_map):
-                self.status = SiteStatus.UP
+                    self.data_manager.get_num_variables() and \
+                    self.status != SiteStatus.UP:
+                self.set_status(SiteStatus.UP)
 
             return True
 
@@ -124,25 +249,70 @@ class Site:
 
         Args:
             lock: Lock to be removed
-            variable: Variable on which lock is to removed
+            variable: Index of variable on which lock is to removed
         """
         self.data_manager.clear_lock(lock, variable)
 
-    def write_variable(self, transaction, variable, value):
+    def write_variable(self, transaction, variable, value, time):
         """
         Help a transaction write a value on the variable
 
         Args:
             transaction: Transaction which wants to write a value
-            variable: Variable on which value is to be written
+            variable: Index of variable on which value is to be written
             value: Value to be written
+            time: Commit time of the transaction
         """
         if self.status != SiteStatus.DOWN and \
                 variable in self.recovered_variables:
 
             self.data_manager.write_variable(transaction,
                                              variable,
-                                             value)
+                                             value,
+                                             time)
+
+    def write_value(self, variable, value, time):
+        """
+        Writes a value committed by a transaction holding its lock at
+        another site, which makes the copy here readable
+
+        Args:
+            variable: Index of variable on which value is to be written
+            value: Value to be written
+            time: Commit time of the transaction
+        """
+        if self.status != SiteStatus.DOWN:
+            self.data_manager.write_value(variable, value, time)
+
+            if variable not in self.recovered_variables:
+                self.make_readable((variable,))
+
+    def get_variable_version(self, variable, time):
+        """
+        Returns value of the copy of a variable at this site, as committed
+        at or before time
+
+        Args:
+            variable: Index of the variable
+            time: Time at which the value is required
+        Returns:
+            Value of the variable at time
+        """
+        return self.data_manager.get_version(variable, time)
+
+    def prune_versions(self, time, all_variables):
+        """
+        Drops versions of variables at this site which reads at time or
+        later can not see
+
+        Args:
+            time: Oldest time at which a read may happen
+            all_variables: If false, only variables written since last
+                           pruning are pruned
+        Returns:
+            Number of versions dropped
+        """
+        return self.data_manager.prune_versions(time, all_variables)
 
     def listen(self):
         """
@@ -154,7 +324,7 @@ class Site:
 
         application = web.Application([
             (r"/", SiteHandler,
-             dict(variables=self.data_manager.variable_map,
+             dict(data_manager=self.data_manager,
                   index=self.id,
                   status=self.get_status()))
         ])
@@ -170,15 +340,26 @@ class Site:
         """
         Fails a website
         """
+        for index in self.data_manager.get_indices():
+
+            if index in self.recovered_variables:
+                self.replica_index.remove(index, self.id)
+
+        self.recovered_variables.clear()
         self.set_status(SiteStatus.DOWN)
-        self.recovered_variables = set()
         lock_table = self.data_manager.get_lock_table()
 
         lock_map = lock_table.get_lock_map()
 
-        for variable, locks in lock_map.items():
+        for variable, variable_lock in lock_map.items():
+
+            for lock in variable_lock.get_locks():
+
+                # Its writes are done, it only waits for the log
+                if lock.transaction.get_status() == \
+                        TransactionStatus.COMMITTING:
+                    continue
 
-            for lock in locks:
                 log.info(lock.transaction.name + " aborted as site " +
                          str(self.id) + " failed")
                 lock.transaction.set_status(TransactionStatus.ABORTED)
@@ -191,13 +372,49 @@ class Site:
         """
         # This would make sense once we actually kill the server
 
-        for variable in self.data_manager.variable_map.keys():
+        # Variables with no other replica are readable at once
+        for index in self.placement.get_unreplicated_indices(self.id):
 
-            if int(variable[1:]) % 2 != 0:
-                self.recovered_variables.add(variable)
+            if self.recovered_variables.add(index):
+                self.replica_index.add(index, self.id)
 
         self.set_status(SiteStatus.RECOVERING)
 
+    def catch_up(self, indices, values, unchanged=()):
+        """
+        Makes variables readable with values transferred from a site
+        holding their latest committed values, the site is up once all of
+        its variables are readable
+
+        Args:
+            indices: Indices of the variables transferred
+            values: List of (commit time, value) in order of indices
+            unchanged: Indices of variables found to already have their
+                       latest committed values here
+        """
+        self.data_manager.import_values(indices, values)
+        self.make_readable(itertools.chain(indices, unchanged))
+
+    def make_readable(self, indices):
+        """
+        Makes variables readable at this site, the site is up once all of
+        its variables are readable
+
+        Args:
+            indices: Indices of the variables
+        """
+        for index in indices:
+
+            if self.recovered_variables.add(index):
+                self.replica_index.add(index, self.id)
+
+        self._readable_changed()
+
+        if len(self.recovered_variables) == \
+                self.data_manager.get_num_variables() and \
+                self.status != SiteStatus.UP:
+            self.set_status(SiteStatus.UP)
+
     def dump_site(self):
         """
         Dumps the site
@@ -209,15 +426,15 @@ class Site:
             return
 
         count = 0
-        for index in list(self.data_manager.variable_map):
+        for index in self.data_manager.get_indices():
 
-            variable = self.data_manager.variable_map[index]
+            variable = self.data_manager.get_variable(index)
 
             if self.status == SiteStatus.RECOVERING:
 
                 count += 1
 
-                if variable.name not in self.recovered_variables:
+                if index not in self.recovered_variables:
                     log.info(variable.name + ":" +
                              " is not available for reading")
                 else:
@@ -227,26 +444,20 @@ class Site:
                              " copy or has been written after recovery)")
                 continue
 
-            if variable.value != int(index[1:]) * 10:
+            if variable.value != index * 10:
                 count += 1
                 log.info(variable.name + ":  " +
                          str(variable.value) + " at site " + str(self.id))
 
-        if count != len(self.data_manager.variable_map):
+        if count != self.data_manager.get_num_variables():
             log.info("All other variables have same initial value")
 
     def get_all_variables(self):
         """
-        Gets a list of variables present in data manager of this site
+        Gets a list of variables present in data manager of this site,
+        with their current values
 
         Returns:
             A list of variables present on this site
         """
-        variables = list()
-
-        for idx in list(self.data_manager.variable_map):
-
-            variable = self.data_manager.variable_map[idx]
-            variables.append(variable)
-
-        return variables
+        return list(self.data_manager.get_variables().values())
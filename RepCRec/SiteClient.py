@@ -0,0 +1,213 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+import pickle
+import socket
+import struct
+import time
+
+HEADER = struct.Struct('<I')
+
+
+class BatchError(Exception):
+    """
+    Raised when an operation of a batch failed at the site server. The
+    operations before it took effect and those after it were not run
+
+    Args:
+        results: List of results of the operations before the failed one
+        error: Exception raised by the failed operation
+    """
+
+    def __init__(self, results, error):
+        super().__init__(results, error)
+        self.results = results
+        self.error = error
+        # Position of the failed operation in the batch
+        self.index = len(results)
+        # Name of the failed operation, set by the sender of the batch
+        self.operation = None
+
+    def __str__(self):
+        operation = "Operation " + str(self.index)
+
+        if self.operation is not None:
+            operation += " " + self.operation
+
+        return operation + " of batch failed with " + repr(self.error) + \
+            ", the operations before it took effect"
+
+
+class SiteClient:
+    """
+    SiteClient talks to a SiteServer running a site in its own process
+    over a unix socket. Messages are pickled and prefixed with their
+    length, a request being a batch of (operation, args) run in order and
+    its reply the list of their results.
+
+    The connection is opened on first use and kept open for every later
+    batch, and a batch can be sent without waiting for its reply so that
+    several sites work on their batches at the same time. At most one
+    batch is in flight, sending another collects the reply of the first.
+
+    Args:
+        path: Path of the unix socket the server listens on
+        timeout: Seconds to keep retrying to connect while the server
+                 starts
+    """
+
+    def __init__(self, path, timeout=10):
+        self.path = path
+        self.timeout = timeout
+        self.connection = None
+        self.in_flight = False
+
+    @staticmethod
+    def send_message(connection, message):
+        """
+        Pickles a message and sends it prefixed with its length
+
+        Args:
+            connection: Connected socket
+            message: Picklable object
+        """
+        data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+        connection.sendall(HEADER.pack(len(data)) + data)
+
+    @staticmethod
+    def receive_exactly(connection, size):
+        """
+        Receives a number of bytes from a socket
+
+        Args:
+            connection: Connected socket
+            size: Number of bytes to be received
+        Returns:
+            bytes received, None if the socket was closed first
+        """
+        data = bytearray()
+
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+
+            if len(chunk) == 0:
+                return None
+
+            data += chunk
+
+        return bytes(data)
+
+    @staticmethod
+    def receive_message(connection):
+        """
+        Receives a message sent with send_message
+
+        Args:
+            connection: Connected socket
+        Returns:
+            Unpickled message, None if the socket was closed
+        """
+        header = SiteClient.receive_exactly(connection, HEADER.size)
+
+        if header is None:
+            return None
+
+        data = SiteClient.receive_exactly(connection,
+                                          HEADER.unpack(header)[0])
+
+        if data is None:
+            return None
+
+        return pickle.loads(data)
+
+    def connect(self):
+        """
+        Opens the connection to the server, retrying until its socket is
+        bound
+
+        Raises:
+            ConnectionError if the server is not up within timeout
+        """
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+            try:
+                connection.connect(self.path)
+                self.connection = connection
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                connection.close()
+
+                if time.monotonic() > deadline:
+                    raise ConnectionError("Site server at " + self.path +
+                                          " did not start")
+
+                time.sleep(0.01)
+
+    def send(self, ops):
+        """
+        Sends a batch of operations without waiting for its reply
+
+        Args:
+            ops: List of (operation name, tuple of args)
+        """
+        if self.in_flight:
+            self.receive()
+
+        if self.connection is None:
+            self.connect()
+
+        SiteClient.send_message(self.connection, ops)
+        self.in_flight = True
+
+    def receive(self):
+        """
+        Waits for the reply of the batch in flight
+
+        Returns:
+            List of results of the operations in order
+        Raises:
+            ConnectionError if the server closed the connection
+            BatchError if an operation failed at the server
+        """
+        self.in_flight = False
+        reply = SiteClient.receive_message(self.connection)
+
+        if reply is None:
+            raise ConnectionError("Site server at " + self.path +
+                                  " closed the connection")
+
+        if isinstance(reply, BatchError):
+            raise reply
+
+        return reply
+
+    def call(self, ops):
+        """
+        Sends a batch of operations and waits for its reply
+
+        Args:
+            ops: List of (operation name, tuple of args)
+        Returns:
+            List of results of the operations in order
+        """
+        self.send(ops)
+
+        return self.receive()
+
+    def close(self):
+        """
+        Closes the connection, collecting the reply in flight if any
+        """
+        if self.connection is None:
+            return
+
+        if self.in_flight:
+            self.receive()
+
+        self.connection.close()
+        self.connection = None
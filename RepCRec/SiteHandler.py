@@ -13,14 +13,14 @@ class SiteHandler(web.RequestHandler):
     Web request handler for a site.
 
     Args:
-        variables: dict containing value of the variables
-                   present on the site
+        data_manager: DataManager holding the variables
+                      present on the site
         index: index of the site whose this handler is
         status: Tells whether is site is up and running
     """
 
-    def initialize(self, variables, index, status):
-        self.variables = variables
+    def initialize(self, data_manager, index, status):
+        self.data_manager = data_manager
         self.site_index = index
         self.status = status
 
@@ -47,7 +47,8 @@ class SiteHandler(web.RequestHandler):
             string containing json representation
         """
         ret = dict()
-        for variable in self.variables:
-            ret[variable] = self.variables[variable].value
+        variables = self.data_manager.get_variables()
+        for variable in variables:
+            ret[variable] = variables[variable].value
 
         return json.dumps(ret, indent=4)
@@ -4,16 +4,33 @@ Sharan Agrawal
 Amanpreet Singh
 """
 import logging
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from array import array
 
 from tornado.ioloop import IOLoop
 
 from .Site import Site
+from .SiteClient import SiteClient
+from .SiteServer import SiteServer
+from .RemoteDataManager import RemoteDataManager
+from .Placement import Placement
+from .ReplicaIndex import ReplicaIndex
+from .WriteAheadLog import WriteAheadLog
+from .Checkpoint import Checkpoint
 from .Variable import Variable
-from .LockTable import LockTable
 from .enums.LockType import LockType
 from .enums.SiteStatus import SiteStatus
 from .enums.LockAcquireStatus import LockAcquireStatus
-from .constants import FAIL_FUNC, DUMP_FUNC, RECOVER_FUNC
+from .enums.ReplicationPolicy import ReplicationPolicy
+from .enums.ReplicaControl import ReplicaControl
+from .enums.ReadRouting import ReadRouting
+from .constants import FAIL_FUNC, DUMP_FUNC, RECOVER_FUNC, CHECK_FUNC
 
 log = logging.getLogger(__name__)
 
@@ -30,19 +47,288 @@ class SiteManager:
     Args:
         num_site: Number of sites
         num_variables: Number of total variables present
+        replication_policy: ReplicationPolicy used to place replicas
+        replication_factor: Number of replicas of every variable for
+                            policies using a fixed number
+        wal_dir: Directory holding write ahead logs of sites, None if
+                 committed writes are not logged
+        group_commit_size: Number of commits written to a log with one
+                           fsync, above 1 only with a group commit latency
+        group_commit_latency: Milliseconds a commit may wait for others
+                              to be written with it, as without it every
+                              commit is written at once
+        checkpoint_interval: Number of commits at a site between its
+                             checkpoints in wal_dir, 0 to never take one
+        catch_up: Whether recovering sites copy values of their
+                  replicated variables from other sites at once, instead
+                  of waiting for them to be written
+        replica_control: ReplicaControl keeping replicas consistent
+        read_quorum: Number of replicas a read consults under quorum
+                     control, 0 for the smallest one meeting every write
+                     quorum
+        write_quorum: Number of replicas a write locks under quorum
+                      control, 0 for a majority
+        atomic_locks: Whether locks on replicas are only taken once all
+                      of the needed ones can be granted, so a refused
+                      transaction holds none of them
+        read_routing: ReadRouting choosing the replica a read lock is
+                      requested from first
+        site_processes: Whether every site runs in its own process,
+                        reached through a unix socket
+    Raises:
+        ValueError if read and write quorums do not intersect, or if
+        commits are grouped with no group commit latency
     """
 
-    def __init__(self, num_sites, num_variables):
-        # Append None on zero index for easy retreival
+    def __init__(self, num_sites, num_variables,
+                 replication_policy=ReplicationPolicy.EVEN_ODD,
+                 replication_factor=3, wal_dir=None, group_commit_size=1,
+                 group_commit_latency=0, checkpoint_interval=0,
+                 catch_up=False,
+                 replica_control=ReplicaControl.AVAILABLE_COPIES,
+                 read_quorum=0, write_quorum=0, atomic_locks=False,
+                 read_routing=ReadRouting.FIRST, site_processes=False):
         self.num_sites = num_sites
-        self.sites = [None] + [Site(i) for i in range(1, num_sites + 1)]
+        self.placement = Placement(num_sites, num_variables,
+                                   replication_policy, replication_factor)
+        # Sites holding a readable copy of each variable
+        self.replica_index = ReplicaIndex(self.placement)
+        # Write ahead logs and checkpoints of sites, None on zero index as
+        # for sites
+        self.wals = [None] * (num_sites + 1)
+        self.logged = wal_dir is not None
+        checkpoints = [None] * (num_sites + 1)
+        # Data managers of sites running in their own processes, None on
+        # every index if sites run in this one
+        data_managers = [None] * (num_sites + 1)
+        self.site_processes = site_processes
+        self.processes = list()
+        # Directory holding sockets of site processes
+        self.socket_dir = None
+
+        if wal_dir is not None:
+
+            if group_commit_size > 1 and group_commit_latency <= 0:
+                raise ValueError("Group commit size %d needs a group "
+                                 "commit latency above 0" %
+                                 group_commit_size)
+
+            os.makedirs(wal_dir, exist_ok=True)
+
+        if site_processes:
+            data_managers = self.start_processes(
+                wal_dir, group_commit_size, group_commit_latency,
+                checkpoint_interval)
+        elif wal_dir is not None:
+
+            for i in range(1, num_sites + 1):
+                path = os.path.join(wal_dir, "site" + str(i))
+                self.wals[i] = WriteAheadLog(path + ".log",
+                                             group_commit_size,
+                                             group_commit_latency)
+                checkpoints[i] = Checkpoint(path + ".ckpt")
+
+        # Append None on zero index for easy retreival
+        self.sites = [None] + [Site(i, self.placement, self.replica_index,
+                                    self.wals[i], checkpoints[i],
+                                    checkpoint_interval, data_managers[i])
+                               for i in range(1, num_sites + 1)]
         self.num_variables = num_variables
+        self.catch_up = catch_up
+        # Reports of catch ups of recovering sites, in order
+        self.catch_up_reports = list()
+        # Called whenever what can be read from any site changes
+        self.on_readable_change = None
+
+        for site in self.sites[1:]:
+            site.set_on_readable_change(self.readable_changed)
+
+        self.replica_control = replica_control
+        self.atomic_locks = atomic_locks
+        self.read_routing = read_routing
+        # Number of read locks granted by each site, 0 on zero index
+        self.read_loads = [0] * (num_sites + 1)
+        # Reads routed so far, rotating the first site under round-robin
+        self.num_routed = 0
+        # Seeded so that routing is the same on every run
+        self.random = random.Random(0)
+        # Maps number of replicas to (read quorum, write quorum)
+        self.quorums = dict()
+        # Site holding the primary copy of each variable under primary
+        # copy control, 0 on zero index
+        self.primaries = None
+
+        if replica_control == ReplicaControl.PRIMARY_COPY:
+            self.primaries = array('l', [0] + [
+                self.placement.get_sites(index)[0]
+                for index in range(1, num_variables + 1)])
+
+        if replica_control == ReplicaControl.QUORUM:
+
+            for set_id in range(1, self.placement.get_num_sets()):
+                num_replicas = len(self.placement.get_set_sites(set_id))
+
+                if num_replicas not in self.quorums:
+                    self.quorums[num_replicas] = self.get_quorum_sizes(
+                        num_replicas, read_quorum, write_quorum)
+
+    def start_processes(self, wal_dir, group_commit_size,
+                        group_commit_latency, checkpoint_interval):
+        """
+        Starts a process running every site, waiting for each to have
+        rebuilt its variables before starting the next so that sites
+        replaying their logs report it in order
+
+        Args:
+            wal_dir: Directory holding write ahead logs of sites or None
+            group_commit_size: Number of commits written to a log with one
+                               fsync
+            group_commit_latency: Milliseconds a commit may wait for
+                                  others to be written with it
+            checkpoint_interval: Number of commits at a site between its
+                                 checkpoints
+        Returns:
+            List of RemoteDataManager of sites, None on zero index
+        """
+        # Forked processes start at once and need nothing pickled
+        method = None
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            method = "fork"
+
+        context = multiprocessing.get_context(method)
+        self.socket_dir = tempfile.mkdtemp(prefix="repcrec")
+        data_managers = [None]
+
+        for i in range(1, self.num_sites + 1):
+            path = os.path.join(self.socket_dir, "site" + str(i) + ".sock")
+            wal_path = None
+
+            if wal_dir is not None:
+                wal_path = os.path.join(wal_dir, "site" + str(i))
+
+            server = SiteServer(i, self.placement, path, wal_path,
+                                group_commit_size, group_commit_latency,
+                                checkpoint_interval)
+            process = context.Process(target=server.run, daemon=True)
+            process.start()
+            self.processes.append(process)
+            data_managers.append(RemoteDataManager(i, self.placement,
+                                                   SiteClient(path)))
+            data_managers[i].call("get_num_versions")
+
+        return data_managers
+
+    def call_sites(self, name, *args, indices=None):
+        """
+        Runs an operation on data managers of all of the sites, site
+        processes running it at the same time
+
+        Args:
+            name: Name of the data manager method
+            args: Args of the method
+            indices: Indices of the sites to run it on, all of them if not
+                     passed
+        Returns:
+            List of results in order of sites
+        """
+        sites = self.sites[1:]
+
+        if indices is not None:
+            sites = [self.sites[index] for index in indices]
+
+        if not self.site_processes:
+            return [getattr(site.data_manager, name)(*args)
+                    for site in sites]
+
+        for site in sites:
+            site.data_manager.send(name, *args)
+
+        return [site.data_manager.receive() for site in sites]
+
+    def stop(self):
+        """
+        Stops site processes, if any, once they have written out their
+        logs
+        """
+        if not self.site_processes or self.socket_dir is None:
+            return
+
+        self.call_sites("stop")
+
+        for site in self.sites[1:]:
+            site.data_manager.close()
+
+        for process in self.processes:
+            process.join()
+
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+        self.socket_dir = None
+
+    def get_quorum_sizes(self, num_replicas, read_quorum, write_quorum):
+        """
+        Returns sizes of read and write quorums for a variable, which
+        must overlap so that every read sees the last write and every
+        write sees the one before it. Quorums larger than the number of
+        replicas are capped to it
+
+        Args:
+            num_replicas: Number of replicas of the variable
+            read_quorum: Configured read quorum, 0 if not configured
+            write_quorum: Configured write quorum, 0 if not configured
+        Returns:
+            Tuple of (read quorum, write quorum)
+        Raises:
+            ValueError if the quorums do not overlap
+        """
+        majority = num_replicas // 2 + 1
+
+        if write_quorum > 0:
+            write_quorum = min(write_quorum, num_replicas)
+        elif read_quorum > 0:
+            write_quorum = max(num_replicas - read_quorum + 1, majority)
+        else:
+            write_quorum = majority
+
+        if read_quorum > 0:
+            read_quorum = min(read_quorum, num_replicas)
+        else:
+            read_quorum = num_replicas - write_quorum + 1
+
+        if read_quorum + write_quorum <= num_replicas or \
+                2 * write_quorum <= num_replicas:
+            raise ValueError("Read quorum %d and write quorum %d do not "
+                             "overlap for %d replicas" %
+                             (read_quorum, write_quorum, num_replicas))
+
+        return read_quorum, write_quorum
+
+    def get_quorums(self, variable):
+        """
+        Returns sizes of read and write quorums of a variable under
+        quorum control
+
+        Args:
+            variable: Index of the variable
+        Returns:
+            Tuple of (read quorum, write quorum)
+        """
+        return self.quorums[len(self.get_variable_sites(variable))]
+
+    def get_replica_control(self):
+        """
+        Getter for replica_control
+
+        Returns:
+            ReplicaControl keeping replicas consistent
+        """
+        return self.replica_control
 
     def tick(self, instruction):
         """
         IO calls the tick of Site Manager in specific cases when the
         Instruction has something to do with sites. This includes
-        instructions for fail, recover and dump.
+        instructions for fail, recover, dump and check.
 
         Args:
             instruction: Instruction object for next instruction
@@ -55,15 +341,14 @@ class SiteManager:
                     site.dump_site()
 
             elif params[0][0] == 'x':
-                sites = Variable.get_sites(int(params[0][1:]))
-                sites = self.get_site_range(sites)
+                index = Variable.get_index(params[0])
+                sites = self.get_variable_sites(index)
 
                 for site in sites:
-                    variables = self.sites[site].get_all_variables()
+                    data_manager = self.sites[site].data_manager
 
-                    for variable in variables:
-                        if variable.name == params[0]:
-                            log.info(variable.value)
+                    if data_manager.has_variable(index):
+                        log.info(data_manager.get_value(index))
 
             elif len(params[0]) == 2:
                 site = self.get_site(int(params[0]))
@@ -75,6 +360,9 @@ class SiteManager:
         elif instruction.get_instruction_type() == RECOVER_FUNC:
             self.recover(int(params[0]))
 
+        elif instruction.get_instruction_type() == CHECK_FUNC:
+            self.check_replicas()
+
         return
 
     def _check_index_sanity(self, index):
@@ -110,18 +398,32 @@ class SiteManager:
         Args:
             transaction: Transaction which wants the lock
             typeof: Type of lock to be acquired WRITE or READ
-            variable: variable name on which lock is requested.
+            variable: variable index on which lock is requested.
         Returns:
             Boolean telling whether a lock was successfully
             acquired or not
         """
-        sites = Variable.get_sites(variable)
-        sites = self.get_site_range(sites)
+        if self.replica_control == ReplicaControl.QUORUM:
+            return self.get_quorum_locks(transaction, typeof, variable)
+        elif self.replica_control == ReplicaControl.PRIMARY_COPY:
+            return self.get_primary_lock(transaction, typeof, variable)
+        elif self.atomic_locks and typeof == LockType.WRITE:
+            return self.get_all_locks(transaction, typeof, variable)
+
+        # Reads only go to sites having a readable copy
+        if typeof == LockType.READ:
+            sites = self.route_read(self.replica_index.get_sites(variable))
+        else:
+            sites = self.get_variable_sites(variable)
+
+            # Every site is asked, so site processes decide at once
+            if self.site_processes:
+                self.request_locks(transaction, typeof, variable, sites)
 
         flag = 1
         recovering_flag = 0
         all_sites_down = 1
-        even_index = int(variable[1:]) % 2 == 0
+        replicated = self.placement.is_replicated(variable)
 
         for site in sites:
 
@@ -129,19 +431,19 @@ class SiteManager:
             if status == SiteStatus.DOWN:
                 continue
 
-            if status == SiteStatus.RECOVERING and typeof == LockType.READ:
-
-                if variable not in self.sites[site].recovered_variables:
-                    continue
-
-                elif not even_index:
-                    recovering_flag = 1
+            if status == SiteStatus.RECOVERING and typeof == LockType.READ \
+                    and not replicated:
+                recovering_flag = 1
 
             all_sites_down = 0
 
+            if typeof == LockType.READ:
+                self.prefetch_read(site, variable)
+
             state = self.sites[site].get_lock(transaction, typeof, variable)
 
             if state == 1 and typeof == LockType.READ:
+                self.read_loads[site] += 1
 
                 if recovering_flag:
                     return LockAcquireStatus.GOT_LOCK_RECOVERING
@@ -156,113 +458,712 @@ class SiteManager:
         else:
             return LockAcquireStatus.GOT_LOCK
 
-    def get_site_range(self, sites):
+    def request_locks(self, transaction, typeof, variable, sites):
         """
-        A helper function which returns range of all sites if 'all'
-        is passed, otherwise returns a list containing only single
-        index passed
+        Sends a lock request to processes of all of the sites not down,
+        whose results are collected by get_lock of each site
 
         Args:
-            sites: string or number 'all' or a number
+            transaction: Transaction which wants the lock
+            typeof: Type of lock to be acquired
+            variable: Index of variable on which lock is requested
+            sites: Indices of the sites
+        """
+        for site in sites:
+
+            if self.sites[site].get_status() != SiteStatus.DOWN:
+
+                if typeof == LockType.READ:
+                    self.prefetch_read(site, variable)
+
+                self.sites[site].data_manager.request_lock(
+                    transaction, typeof, variable)
+
+    def prefetch_read(self, site, variable):
+        """
+        Has the process of a site send the value of a variable along with
+        the reply to the next lock request, for the read following a read
+        lock. Does nothing if sites run in this process
+
+        Args:
+            site: Index of the site
+            variable: Index of the variable
+        """
+        if not self.site_processes:
+            return
+
+        if self.replica_control == ReplicaControl.QUORUM:
+            self.sites[site].data_manager.prefetch("get_timed_version",
+                                                   variable, math.inf)
+        else:
+            self.sites[site].data_manager.prefetch("get_value", variable)
+
+    def route_read(self, sites):
+        """
+        Orders sites having a readable copy of a variable in which a read
+        lock is requested from them, according to the read routing
+
+        Args:
+            sites: Indices of the sites in increasing order
+        Returns:
+            List of site indices, the one to be tried first at the front
+        """
+        if len(sites) < 2 or self.read_routing == ReadRouting.FIRST:
+            return sites
+
+        if self.read_routing == ReadRouting.ROUND_ROBIN:
+            start = self.num_routed % len(sites)
+            self.num_routed += 1
+
+            return sites[start:] + sites[:start]
+
+        if self.read_routing == ReadRouting.LEAST_LOCKED:
+            return sorted(sites, key=self.get_num_locked)
+
+        first, second = self.random.sample(sites, 2)
+
+        if self.get_num_locked(second) < self.get_num_locked(first):
+            first = second
+
+        return [first] + [site for site in sites if site != first]
+
+    def get_num_locked(self, site):
+        """
+        Returns number of variables locked at a site, its load for read
+        routing
+
+        Args:
+            site: Index of the site
         Returns:
-            list containing site indices
+            Number of locked variables
+        """
+        return len(self.sites[site].data_manager.get_lock_table()
+                   .get_lock_map())
+
+    def get_read_loads(self):
         """
-        if sites == 'all':
-            sites = range(1, self.num_sites + 1)
+        Returns number of read locks granted by every site under
+        available copies control
+
+        Returns:
+            dict mapping site index to number of read locks
+        """
+        return {site: self.read_loads[site]
+                for site in range(1, self.num_sites + 1)}
+
+    def get_all_locks(self, transaction, typeof, variable):
+        """
+        Tries to lock every available replica of a variable for a
+        transaction at once. Locks are only taken once every one of them
+        can be granted, so a transaction which is refused holds none of
+        them and does not block others while it waits
+
+        Args:
+            transaction: Transaction which wants the lock
+            typeof: Type of lock to be acquired WRITE or READ
+            variable: variable index on which lock is requested.
+        Returns:
+            LockAcquireStatus
+        """
+        sites = self.get_available_sites(variable)
+
+        if len(sites) == 0:
+            return LockAcquireStatus.ALL_SITES_DOWN
+
+        for site in sites:
+
+            if not self.sites[site].data_manager.can_get_lock(
+                    transaction, typeof, variable):
+                return LockAcquireStatus.NO_LOCK
+
+        # Site processes are all asked at once
+        if self.site_processes:
+            self.request_locks(transaction, typeof, variable, sites)
+
+        for site in sites:
+            self.sites[site].get_lock(transaction, typeof, variable)
+
+        return LockAcquireStatus.GOT_LOCK
+
+    def get_quorum_locks(self, transaction, typeof, variable):
+        """
+        Tries to lock a quorum of replicas of a variable for a
+        transaction, read quorum for reads and write quorum for writes.
+        Sites are tried in increasing order until a quorum is locked. With
+        atomic locks, none are taken unless a quorum can be granted
+
+        Args:
+            transaction: Transaction which wants the lock
+            typeof: Type of lock to be acquired WRITE or READ
+            variable: variable index on which lock is requested.
+        Returns:
+            LockAcquireStatus, ALL_SITES_DOWN if too few sites are
+            available to form a quorum
+        """
+        read_quorum, write_quorum = self.get_quorums(variable)
+        quorum = read_quorum if typeof == LockType.READ else write_quorum
+        available = self.get_available_sites(variable)
+        sites = available
+        locked = 0
+
+        if self.atomic_locks:
+            sites = [site for site in available
+                     if self.sites[site].data_manager.can_get_lock(
+                         transaction, typeof, variable)]
+
+            if len(sites) < quorum:
+                sites = tuple()
+
+        # Sites tried first are asked at once, the others only if refused
+        if self.site_processes:
+            self.request_locks(transaction, typeof, variable,
+                               sites[:quorum])
+
+        for site in sites:
+
+            if self.sites[site].get_lock(transaction, typeof, variable):
+                locked += 1
+
+                if locked == quorum:
+                    return LockAcquireStatus.GOT_LOCK
+
+        if len(available) < quorum:
+            return LockAcquireStatus.ALL_SITES_DOWN
         else:
-            sites = [sites]
-        return sites
+            return LockAcquireStatus.NO_LOCK
+
+    def get_primary_site(self, variable):
+        """
+        Returns the site holding the primary copy of a variable, whose
+        lock table alone grants locks on it. The primary fails over to the
+        next replica holding a readable copy, or else one which is not
+        down, once it is down or holds neither a readable copy nor a lock
+        on the variable. It does not move back on recovery, as locks
+        granted by the new primary would be lost
+
+        Args:
+            variable: Index of the variable
+        Returns:
+            Index of the site, None if all sites holding it are down
+        """
+        primary = self.primaries[variable]
+        site = self.sites[primary]
+
+        if site.get_status() != SiteStatus.DOWN and \
+                (variable in site.recovered_variables or
+                 site.data_manager.get_lock_table().is_locked(variable)):
+            return primary
+
+        sites = self.get_variable_sites(variable)
+        position = sites.index(primary)
+        candidate = None
+
+        for index in sites[position:] + sites[:position]:
+
+            if variable in self.sites[index].recovered_variables:
+                candidate = index
+                break
+
+            if candidate is None and \
+                    self.sites[index].get_status() != SiteStatus.DOWN:
+                candidate = index
+
+        if candidate is None:
+            return None
+
+        if candidate != primary:
+            log.info("Primary copy of " + Variable.get_name(variable) +
+                     " moved from site " + str(primary) + " to site " +
+                     str(candidate))
+            self.primaries[variable] = candidate
+
+        return candidate
+
+    def get_primary_lock(self, transaction, typeof, variable):
+        """
+        Tries to provide a lock on a variable to a transaction from the
+        lock table of its primary copy alone, which is a single lock
+        operation whatever the number of replicas
+
+        Args:
+            transaction: Transaction which wants the lock
+            typeof: Type of lock to be acquired WRITE or READ
+            variable: variable index on which lock is requested.
+        Returns:
+            LockAcquireStatus, ALL_SITES_DOWN if there is no primary or it
+            can not be read yet
+        """
+        primary = self.get_primary_site(variable)
+
+        if primary is None:
+            return LockAcquireStatus.ALL_SITES_DOWN
+
+        site = self.sites[primary]
+
+        if typeof == LockType.READ and \
+                variable not in site.recovered_variables:
+            return LockAcquireStatus.ALL_SITES_DOWN
+
+        if not site.data_manager.get_lock(transaction, typeof, variable):
+            return LockAcquireStatus.NO_LOCK
+
+        if site.get_status() == SiteStatus.RECOVERING and \
+                typeof == LockType.READ and \
+                not self.placement.is_replicated(variable):
+            return LockAcquireStatus.GOT_LOCK_RECOVERING
+
+        return LockAcquireStatus.GOT_LOCK
+
+    def write_variable(self, transaction, variable, value, time):
+        """
+        Writes a value committed by a transaction on the replicas of a
+        variable. Under primary copy control every replica which is not
+        down is written, as only the primary is locked, otherwise those
+        on which the transaction holds a write lock
+
+        Args:
+            transaction: Transaction which wrote the value
+            variable: Index of the variable
+            value: Value to be written
+            time: Commit time of the transaction
+        """
+        if self.replica_control == ReplicaControl.PRIMARY_COPY:
+
+            for site in self.get_variable_sites(variable):
+                self.sites[site].write_value(variable, value, time)
+
+            return
+
+        for site in self.get_variable_sites(variable):
+            self.sites[site].write_variable(transaction, variable, value,
+                                            time)
+
+    def get_newest_version(self, variable, sites, time=math.inf):
+        """
+        Returns the newest version of a variable committed at or before
+        time among its copies at sites, versions being ordered by their
+        commit times
+
+        Args:
+            variable: Index of the variable
+            sites: Indices of sites holding the variable
+            time: Time at which the value is required, latest if not
+                  passed
+        Returns:
+            Tuple of (commit time, value), None if no copy had one
+        """
+        newest = None
+
+        for site in sites:
+            version = self.sites[site].data_manager.get_timed_version(
+                variable, time)
+
+            if version is not None and \
+                    (newest is None or version[0] > newest[0]):
+                newest = version
+
+        return newest
+
+    def get_read_value(self, transaction, variable):
+        """
+        Returns the value a transaction reads from a variable it has read
+        locks on. Under quorum control it is the newest value among the
+        copies it has locked, otherwise any readable copy
+
+        Args:
+            transaction: Transaction reading the variable
+            variable: Index of the variable
+        Returns:
+            Value of the variable
+        """
+        if self.replica_control != ReplicaControl.QUORUM:
+            return self.get_current_variables(variable)
+
+        sites = [site for site in self.get_variable_sites(variable)
+                 if self.sites[site].get_status() != SiteStatus.DOWN and
+                 self.sites[site].data_manager.get_lock_table()
+                 .is_locked_by_transaction(transaction, variable)]
+
+        return self.get_newest_version(variable, sites)[1]
+
+    def get_available_sites(self, variable):
+        """
+        Returns sites holding a replica of a variable which are not down
+
+        Args:
+            variable: Index of the variable
+        Returns:
+            List of site indices in increasing order
+        """
+        return [site for site in self.get_variable_sites(variable)
+                if self.sites[site].get_status() != SiteStatus.DOWN]
+
+    def can_read_version(self, transaction, variable):
+        """
+        Tells whether a read only transaction can read a variable now.
+        Under quorum control a read quorum of sites must be available,
+        otherwise a site must have had a readable copy when it began
+
+        Args:
+            transaction: Read only transaction
+            variable: Index of the variable
+        Returns:
+            boolean whether the variable can be read
+        """
+        if self.replica_control != ReplicaControl.QUORUM:
+            return self.get_snapshot_site(
+                variable, transaction.get_start_time()) is not None
+
+        return len(self.get_available_sites(variable)) >= \
+            self.get_quorums(variable)[0]
+
+    def read_version(self, transaction, variable):
+        """
+        Returns value of a variable as committed when a read only
+        transaction began. Under quorum control it is the newest such
+        version in a read quorum of available sites, otherwise the one at
+        the site which had a readable copy when it began
+
+        Args:
+            transaction: Read only transaction
+            variable: Index of the variable
+        Returns:
+            Value of the variable
+        """
+        time = transaction.get_start_time()
+
+        if self.replica_control != ReplicaControl.QUORUM:
+            return self.get_snapshot_site(
+                variable, time).get_variable_version(variable, time)
+
+        sites = self.get_available_sites(variable)[
+            :self.get_quorums(variable)[0]]
+        version = self.get_newest_version(variable, sites, time)
+
+        return None if version is None else version[1]
+
+    def get_replica_index(self):
+        """
+        Getter for replica index
+
+        Returns:
+            ReplicaIndex of sites having a readable copy of variables
+        """
+        return self.replica_index
+
+    def get_placement(self):
+        """
+        Getter for placement
+
+        Returns:
+            Placement of replicas of variables on sites
+        """
+        return self.placement
+
+    def get_variable_sites(self, variable):
+        """
+        Returns sites holding a replica of a variable
+
+        Args:
+            variable: Index of the variable
+        Returns:
+            tuple of site indices in increasing order
+        """
+        return self.placement.get_sites(variable)
 
     def get_current_variables(self, var=None):
         """
         Returns currently set variables of for a variable if passed, else
-        all of them
+        all of them. Values are taken from the lowest site having a
+        readable copy in the replica index, as all readable copies of a
+        variable hold its last committed value. Under quorum control they
+        are the newest values among copies at sites which are not down
 
         Args:
             var: If none, all variable values will be returned else
-                 value will be returned for var
+                 value will be returned for variable with index var
         Returns:
-            dict containing values for variables
+            dict mapping variable index to value, or value of var, None if
+            there is no readable copy of var
         """
+        if self.replica_control == ReplicaControl.QUORUM:
+            return self.get_quorum_variables(var)
+
+        if var is not None:
+            site = self.replica_index.get_first_site(var)
+
+            if site is None:
+                return None
+
+            return self.sites[site].data_manager.get_value(var)
+
         variable_values = dict()
 
-        for site in self.sites[1:]:
+        for index in range(1, self.num_variables + 1):
+            site = self.replica_index.get_first_site(index)
 
-            if site.status == SiteStatus.UP:
-                variables = site.get_all_variables()
+            if site is not None:
+                variable_values[index] = \
+                    self.sites[site].data_manager.get_value(index)
 
-                for variable in variables:
+        return variable_values
 
-                    if var is not None and variable.name == var:
-                        return variable.value
+    def get_quorum_variables(self, var=None):
+        """
+        Returns the newest committed values of a variable if passed, else
+        of all of them, among copies at sites which are not down
 
-                    variable_values[variable.name] = variable.value
+        Args:
+            var: If none, all variable values will be returned else
+                 value will be returned for variable with index var
+        Returns:
+            dict mapping variable index to value, or value of var, None if
+            every site holding var is down
+        """
+        if var is not None:
+            version = self.get_newest_version(
+                var, self.get_available_sites(var))
 
-                if len(variable_values) == self.num_variables:
-                    return variable_values
+            return None if version is None else version[1]
 
-            elif site.status == SiteStatus.RECOVERING:
+        variable_values = dict()
 
-                variables = site.get_all_variables()
+        for index in range(1, self.num_variables + 1):
+            version = self.get_newest_version(
+                index, self.get_available_sites(index))
 
-                for variable in variables:
+            if version is not None:
+                variable_values[index] = version[1]
 
-                    if variable.name in site.recovered_variables:
+        return variable_values
 
-                        if var is not None and variable.name == var:
-                            return variable.value
+    def get_snapshot_site(self, variable, time):
+        """
+        Returns the first site, in order of indices, whose copy of a
+        variable was readable at a tick, deciding it from the status the
+        site had then rather than now. Sites down now are skipped, so a
+        read only transaction waits while every such copy is down
 
-                        variable_values[variable.name] = variable.value
+        Args:
+            variable: Index of the variable
+            time: Tick at which the variable is read
+        Returns:
+            Site, None if no copy can be read
+        """
+        for index in self.get_variable_sites(variable):
+            site = self.sites[index]
 
-            if len(variable_values) == self.num_variables:
-                return variable_values
+            if site.was_readable(variable, time):
+                return site
 
-        if var is None:
-            return variable_values
-        else:
-            return None
+        return None
 
-    def get_set_locks(self):
+    def readable_changed(self):
+        """
+        Notifies the readable change callback that what can be read from
+        a site has changed
         """
-        Utility function to get all of the locks set in any
-        of the site's data manager
+        if self.on_readable_change is not None:
+            self.on_readable_change()
 
+    def prune_versions(self, time, all_variables):
+        """
+        Drops versions of variables at all of the sites, including down
+        ones, which reads at time or later can not see. Site processes
+        drop them with their next batch
+
+        Args:
+            time: Oldest time at which a read may happen
+            all_variables: If false, only variables written since last
+                           pruning are pruned
         Returns:
-            A dict containing variable name as key and list
-            of locks present anywhere.
+            Number of versions dropped, by site processes those replied
+            to since the last call
         """
-        locks = dict()
+        return sum(site.data_manager.prune_versions(time, all_variables)
+                   for site in self.sites[1:])
 
-        for site in self.sites[1:]:
-            lock_map = site.data_manager.lock_table.lock_map
+    def get_num_versions(self):
+        """
+        Returns number of versions kept at all of the sites
 
-            for var, curr_locks in lock_map.items():
-                if var not in locks:
-                    locks[var] = []
+        Returns:
+            Number of versions
+        """
+        return sum(self.call_sites("get_num_versions"))
 
-                for lock in curr_locks:
-                    if lock not in locks[var]:
-                        locks[var].append(lock)
-        lock_table = LockTable()
-        lock_table.lock_map = locks
-        return lock_table
+    def commit_logs(self):
+        """
+        Ends the commit in progress in write ahead logs of all of the
+        sites, which are written once their group commit is due. Without
+        logs, site processes get the commit with their next batch. With
+        logs, only processes of sites which got writes are asked, and
+        reply with the position their log is durable at as well
 
-    def clear_locks(self, lock, variable_name):
+        Returns:
+            dict mapping index of every site which logged the commit to
+            the log position it is durable at
+        """
+        if not self.logged:
+
+            for site in self.sites[1:]:
+                site.data_manager.commit_log()
+
+            return dict()
+
+        if not self.site_processes:
+            return {index: end for index, end in
+                    enumerate(self.call_sites("commit_log"), 1)
+                    if end is not None}
+
+        sites = [site for site in self.sites[1:]
+                 if site.data_manager.has_uncommitted()]
+
+        for site in sites:
+            site.data_manager.request_commit_log()
+
+        ends = dict()
+
+        for site in sites:
+            end = site.data_manager.receive()
+
+            if end is not None:
+                ends[site.id] = end
+
+        return ends
+
+    def get_log_positions(self, indices):
+        """
+        Returns positions up to which write ahead logs of sites are
+        durable
+
+        Args:
+            indices: Indices of the sites
+        Returns:
+            dict mapping site index to log position
+        """
+        return dict(zip(indices, self.call_sites("get_log_position",
+                                                 indices=indices)))
+
+    def poll_logs(self):
+        """
+        Writes commits which have waited for the group commit latency in
+        write ahead logs of all of the sites
+        """
+        for wal in self.wals[1:]:
+
+            if wal is not None:
+                wal.poll()
+
+    def flush_logs(self):
+        """
+        Writes all of the buffered commits in write ahead logs of all of
+        the sites
+        """
+        self.call_sites("flush_log")
+
+    def take_checkpoints(self):
+        """
+        Takes a checkpoint of all of the sites and waits for them to be
+        written
+        """
+        self.call_sites("take_checkpoint", True)
+
+    def get_last_commit_time(self):
+        """
+        Returns latest commit time of the values sites replayed from their
+        write ahead logs and checkpoints
+
+        Returns:
+            Commit time, 0 if nothing was replayed
+        """
+        return max(self.call_sites("get_last_commit_time"))
+
+    def get_log_counts(self):
+        """
+        Returns counters of commits logged, fsyncs done and truncations
+        over write ahead logs of all of the sites, and checkpoints taken
+
+        Returns:
+            dict with commits, syncs, truncations and checkpoints counts
+        """
+        counts = {"commits": 0, "syncs": 0, "truncations": 0,
+                  "checkpoints": 0}
+
+        for site_counts in self.call_sites("get_log_counts"):
+
+            for key, count in site_counts.items():
+                counts[key] += count
+
+        return counts
+
+    def get_variable_locks(self, variable, sites=None):
+        """
+        Utility function to get all of the locks set on a variable
+        in any of the site's data manager holding it
+
+        Args:
+            variable: Variable index for which locks are required
+            sites: Indices of the sites to be looked at, all of the sites
+                   holding the variable if not passed
+        Returns:
+            A list of distinct locks present on the variable, in order
+            of the sites holding them
+        """
+        if sites is None:
+            sites = self.get_variable_sites(variable)
+
+        locks = list()
+        seen = set()
+
+        for index in sites:
+            lock_table = self.sites[index].data_manager.lock_table
+
+            for lock in lock_table.get_locks(variable):
+
+                if lock not in seen:
+                    seen.add(lock)
+                    locks.append(lock)
+
+        return locks
+
+    def clear_locks(self, lock, variable):
         """
         Clears a particular lock for for a variable
 
         Args:
             lock: Lock to be cleared
-            variable_name: Variable for which the lock is to
-                           be cleared
+            variable: Index of variable for which the lock is to
+                      be cleared
         """
 
-        sites = Variable.get_sites(variable_name)
-        sites = self.get_site_range(sites)
+        sites = self.get_variable_sites(variable)
 
         for index in sites:
             site = self.sites[index]
-            site.clear_lock(lock, variable_name)
+            site.clear_lock(lock, variable)
+
+    def set_listeners(self, on_lock_release, on_status_change,
+                      on_readable_change):
+        """
+        Registers callbacks on all of the sites so that released locks,
+        changes in their status and in what can be read from them can be
+        observed
+
+        Args:
+            on_lock_release: Callable called with the variable whose lock
+                             was released at any site
+            on_status_change: Callable called with the site whose status
+                              changes
+            on_readable_change: Callable called when variables readable
+                                at any site change
+        """
+        self.on_readable_change = on_readable_change
+
+        for site in self.sites[1:]:
+            site.data_manager.get_lock_table().set_on_release(
+                on_lock_release)
+            site.set_on_status_change(on_status_change)
 
     def start(self):
         """
@@ -293,3 +1194,197 @@ class SiteManager:
         self._check_index_sanity(index)
         log.info("Site " + str(index) + " recovered")
         self.sites[index].recover()
+
+        # Quorums order copies by version, so stale copies are readable
+        if self.replica_control == ReplicaControl.QUORUM:
+            site = self.sites[index]
+            site.make_readable(site.data_manager.get_indices())
+
+        elif self.catch_up:
+            self.catch_up_site(index)
+
+    def catch_up_site(self, index):
+        """
+        Makes variables not yet readable at a recovering site readable
+        with latest committed values from sites having a readable copy.
+
+        For every replica set with an up site besides this one, hash
+        trees of the two sites are compared, only variables whose values
+        differ are copied and the rest are readable as they are. For other
+        sets, every variable is copied from the lowest site having a
+        readable copy. Copies are taken in one batch from every source
+        site and applied together.
+
+        A variable write locked at its source is skipped, as the writer
+        has no lock at the recovering site and would not write its value
+        there, so it stays unreadable until written
+
+        Args:
+            index: Index of the site to catch up
+        """
+        start = time.perf_counter()
+        site = self.sites[index]
+        data_manager = site.data_manager
+        batches = dict()
+        unchanged = list()
+
+        for replica_set in data_manager.get_replica_sets():
+            sites = self.placement.get_set_sites(replica_set)
+
+            if len(sites) == 1:
+                continue
+
+            tree = data_manager.get_tree(replica_set)
+            up_site = self.get_up_site(sites, index)
+            differing = set()
+
+            if up_site is not None:
+                differing = set(self.sites[up_site].data_manager.get_tree(
+                    replica_set).diff(tree))
+
+            for variable in tree.indices:
+
+                if variable in site.recovered_variables:
+                    continue
+
+                source = up_site
+
+                if source is None:
+                    source = self.replica_index.get_first_site(variable)
+
+                if source is None or self.sites[source].data_manager \
+                        .get_lock_table().is_write_locked(variable):
+                    continue
+
+                if up_site is not None and variable not in differing:
+                    unchanged.append(variable)
+                    continue
+
+                if source not in batches:
+                    batches[source] = list()
+
+                batches[source].append(variable)
+
+        indices = list()
+        values = list()
+
+        for source, variables in batches.items():
+            indices += variables
+            values += self.sites[source].data_manager.export_values(variables)
+
+        site.catch_up(indices, values, unchanged)
+        elapsed = time.perf_counter() - start
+
+        self.catch_up_reports.append({
+            "site": index,
+            "variables": len(indices) + len(unchanged),
+            "transferred": len(indices),
+            "seconds": elapsed
+        })
+
+        report = "Site " + str(index) + " caught up " + \
+            str(len(indices) + len(unchanged)) + " variables, copying " + \
+            str(len(indices))
+
+        if len(batches) == 1:
+            report += " from site " + str(list(batches)[0])
+        elif len(batches) > 1:
+            report += " from sites " + \
+                ", ".join(str(source) for source in sorted(batches))
+
+        log.info(report)
+        log.debug("Catch up of site " + str(index) + " took " +
+                  str(round(elapsed * 1000, 3)) + " ms")
+
+    def get_up_site(self, sites, excluded):
+        """
+        Returns the lowest up site among sites, other than excluded
+
+        Args:
+            sites: Indices of sites in increasing order
+            excluded: Index of a site not to be returned
+        Returns:
+            Index of the site, None if there is none
+        """
+        for site in sites:
+
+            if site != excluded and \
+                    self.sites[site].get_status() == SiteStatus.UP:
+                return site
+
+        return None
+
+    def compare_sites(self, first, second):
+        """
+        Finds variables held by both sites whose values differ, comparing
+        hash trees of replica sets both of them hold
+
+        Args:
+            first: Index of a site
+            second: Index of another site
+        Returns:
+            List of indices of differing variables in increasing order
+        """
+        first_manager = self.sites[first].data_manager
+        second_manager = self.sites[second].data_manager
+        differing = list()
+
+        for replica_set in first_manager.get_replica_sets():
+            second_tree = second_manager.get_tree(replica_set)
+
+            if second_tree is not None:
+                differing += first_manager.get_tree(replica_set).diff(
+                    second_tree)
+
+        return sorted(differing)
+
+    def check_replicas(self):
+        """
+        Compares readable copies of replicated variables with the copy at
+        the lowest up site holding them, logging every one which differs.
+        Only subtrees whose hashes differ are visited
+
+        Returns:
+            List of (variable index, site index) of differing copies
+        """
+        differing = list()
+
+        for replica_set in range(1, self.placement.get_num_sets()):
+            sites = self.placement.get_set_sites(replica_set)
+            reference = self.get_up_site(sites, None)
+
+            if len(sites) == 1 or reference is None:
+                continue
+
+            tree = self.sites[reference].data_manager.get_tree(replica_set)
+
+            for site in sites:
+
+                if site == reference or \
+                        self.sites[site].get_status() == SiteStatus.DOWN:
+                    continue
+
+                for variable in tree.diff(
+                        self.sites[site].data_manager.get_tree(replica_set)):
+
+                    if variable in self.sites[site].recovered_variables:
+                        differing.append((variable, site))
+
+        for variable, site in sorted(differing):
+            log.info(Variable.get_name(variable) + " at site " + str(site) +
+                     " differs from other replicas")
+
+        if len(differing) == 0:
+            log.info("All readable replicas agree")
+
+        return differing
+
+    def get_catch_up_reports(self):
+        """
+        Getter for catch_up_reports
+
+        Returns:
+            List of dicts with site, variables transferred and seconds
+            taken by every catch up
+        """
+        return self.catch_up_reports
@@ -0,0 +1,227 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+import logging
+import os
+import selectors
+import socket
+
+from .DataManager import DataManager
+from .Lock import Lock
+from .SiteClient import SiteClient, BatchError
+from .Transaction import Transaction
+from .WriteAheadLog import WriteAheadLog
+from .Checkpoint import Checkpoint
+
+log = logging.getLogger(__name__)
+
+
+class SiteServer:
+    """
+    SiteServer runs the data manager of a site in its own process and
+    serves batches of operations on it sent by SiteClient over a unix
+    socket, replying to every batch with the list of results.
+
+    Transactions are sent as (id, name), the server keeps a Transaction
+    for every one holding locks here so that its lock table works as in
+    a single process. If the site has a write ahead log, commits waiting
+    for the group commit latency are written while the server waits for
+    requests.
+
+    Args:
+        index: Index of the site
+        placement: Placement of replicas of variables on sites
+        path: Path of the unix socket to listen on
+        wal_path: Path of the write ahead log and checkpoint without
+                  extension, None if commits are not logged
+        group_commit_size: Number of commits written to the log with one
+                           fsync
+        group_commit_latency: Milliseconds a commit may wait for others
+                              to be written with it
+        checkpoint_interval: Number of commits between checkpoints, 0 to
+                             never take one
+    """
+    # Operations on the data manager taking a transaction as first arg
+    TRANSACTION_OPERATIONS = {"get_lock", "can_get_lock", "write_variable"}
+    OPERATIONS = TRANSACTION_OPERATIONS | {
+        "write_value", "get_value", "get_version", "get_timed_version",
+        "get_commit_time", "get_variable", "get_variables", "get_tree",
+        "get_replica_sets", "export_values", "import_values",
+        "prune_versions", "get_num_versions", "commit_log",
+        "take_checkpoint", "flush_log", "get_log_counts",
+        "get_last_commit_time", "get_log_position"}
+
+    def __init__(self, index, placement, path, wal_path=None,
+                 group_commit_size=1, group_commit_latency=0,
+                 checkpoint_interval=0):
+        self.index = index
+        self.placement = placement
+        self.path = path
+        self.wal_path = wal_path
+        self.group_commit_size = group_commit_size
+        self.group_commit_latency = group_commit_latency
+        self.checkpoint_interval = checkpoint_interval
+        self.data_manager = None
+        # Maps (id, name) to Transaction holding locks at this site
+        self.transactions = dict()
+        self.running = False
+
+    def run(self):
+        """
+        Listens on the socket, builds the data manager and serves
+        requests until asked to stop. Target of the site process
+        """
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen()
+
+        wal = None
+        checkpoint = None
+
+        if self.wal_path is not None:
+            wal = WriteAheadLog(self.wal_path + ".log",
+                                self.group_commit_size,
+                                self.group_commit_latency)
+            checkpoint = Checkpoint(self.wal_path + ".ckpt")
+
+        self.data_manager = DataManager(self.index, self.placement, wal,
+                                        checkpoint, self.checkpoint_interval)
+
+        # Wakes up to write commits whose group commit latency passed
+        timeout = None
+
+        if wal is not None and self.group_commit_latency > 0:
+            timeout = self.group_commit_latency / 1000
+
+        selector = selectors.DefaultSelector()
+        selector.register(listener, selectors.EVENT_READ)
+        self.running = True
+
+        while self.running:
+
+            for key, events in selector.select(timeout):
+
+                if key.fileobj is listener:
+                    connection, address = listener.accept()
+                    selector.register(connection, selectors.EVENT_READ)
+                elif not self.serve(key.fileobj):
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+
+            self.data_manager.poll_log()
+
+        selector.close()
+        listener.close()
+
+    def serve(self, connection):
+        """
+        Runs a batch of operations received on a connection and replies
+        with their results. If one of them raises, the rest are not run
+        and the reply is a BatchError with the results of those before it
+
+        Args:
+            connection: Connected socket ready to be read
+        Returns:
+            Whether the connection is still open
+        """
+        ops = SiteClient.receive_message(connection)
+
+        if ops is None:
+            return False
+
+        reply = list()
+
+        for name, args in ops:
+
+            try:
+                reply.append(self.execute(name, args))
+            except Exception as error:
+                log.error("Site " + str(self.index) + " failed to run " +
+                          "operation " + str(len(reply)) + " " + name +
+                          ": " + repr(error))
+                reply = BatchError(reply, error)
+                break
+
+        SiteClient.send_message(connection, reply)
+
+        return True
+
+    def execute(self, name, args):
+        """
+        Runs an operation on the data manager
+
+        Args:
+            name: Name of the operation
+            args: Tuple of args, transactions as (id, name)
+        Returns:
+            Result of the operation
+        Raises:
+            ValueError if the operation is not known
+        """
+        if name == "stop":
+            self.stop()
+            return None
+
+        if name == "clear_lock":
+            lock_type, key, variable = args
+            transaction = self.get_transaction(key)
+            self.data_manager.clear_lock(Lock(lock_type, transaction),
+                                         variable)
+            self.release_transaction(key)
+            return None
+
+        if name not in self.OPERATIONS:
+            raise ValueError("Unknown site operation " + name)
+
+        if name not in self.TRANSACTION_OPERATIONS:
+            return getattr(self.data_manager, name)(*args)
+
+        key = args[0]
+        result = getattr(self.data_manager, name)(self.get_transaction(key),
+                                                  *args[1:])
+        self.release_transaction(key)
+
+        return result
+
+    def get_transaction(self, key):
+        """
+        Returns the Transaction standing for a transaction at this site,
+        making one if it holds no locks here yet
+
+        Args:
+            key: Tuple of (id, name) of the transaction
+        Returns:
+            Transaction
+        """
+        if key not in self.transactions:
+            self.transactions[key] = Transaction(key[0], key[1])
+
+        return self.transactions[key]
+
+    def release_transaction(self, key):
+        """
+        Forgets a transaction once it holds no locks at this site
+
+        Args:
+            key: Tuple of (id, name) of the transaction
+        """
+        if len(self.transactions[key].get_held_locks()) == 0:
+            self.transactions.pop(key)
+
+    def stop(self):
+        """
+        Writes out the log and the checkpoint being written, and stops
+        serving once the current batch is replied to
+        """
+        self.data_manager.flush_log()
+        checkpoint = self.data_manager.get_checkpoint()
+
+        if checkpoint is not None:
+            checkpoint.wait()
+
+        self.running = False
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -14,22 +14,40 @@ class Transaction:
     read only and has a status set to one of the TransactionStatus
     types
 
+    Variables are referred to by their indices in all of the dicts
+
     Args:
-        id: Id of the transaction (1, 2, 3 etc)
+        id: Id of the transaction given to its name, lower for the
+            transaction named first (0, 1, 2 etc)
         name: Name of the transaction (T1, T2, etc)
         read_only: Boolean telling whether the transaction is
                    read only or not
+        start_time: Tick of transaction manager at which the
+                    transaction began, read only transactions read
+                    versions committed at or before it
     """
+    __slots__ = ('status', 'id', 'sites_accessed', 'name',
+                 'uncommitted_variables', 'read_variables', 'is_read_only',
+                 'variable_values', 'held_locks', 'start_time',
+                 'ticks_run', 'last_run_time')
 
-    def __init__(self, id, name, read_only=False):
+    def __init__(self, id, name, read_only=False, start_time=0):
         self.status = TransactionStatus.RUNNING
         self.id = id
-        self.sites_accesssed = []
+        self.sites_accessed = []
         self.name = name
         self.uncommitted_variables = dict()
         self.read_variables = dict()
         self.is_read_only = read_only
         self.variable_values = dict()
+        # (variable, site id) to list of locks held, site id is None
+        # for locks in the global lock table
+        self.held_locks = dict()
+        self.start_time = start_time
+        # Number of ticks in which the transaction executed a read or a
+        # write, and the last of them
+        self.ticks_run = 0
+        self.last_run_time = None
 
     def get_id(self):
         """
@@ -49,14 +67,36 @@ class Transaction:
         """
         return self.status
 
-    def is_read_only(self):
+    def get_start_time(self):
+        """
+        Get tick at which the transaction began
+
+        Returns:
+            Start time of the transaction
+        """
+        return self.start_time
+
+    def get_ticks_run(self):
         """
-        Tells whether transaction is read only
+        Get number of ticks in which the transaction executed a read or
+        a write, ticks spent blocked or waiting are not counted
 
         Returns:
-            Boolean telling whether read read only
+            Number of ticks run
+        """
+        return self.ticks_run
+
+    def record_run(self, time):
+        """
+        Records that the transaction executed a read or a write at a tick,
+        counted once however many it executed at that tick
+
+        Args:
+            time: Tick of transaction manager
         """
-        return self.is_read_only
+        if self.last_run_time != time:
+            self.last_run_time = time
+            self.ticks_run += 1
 
     def get_sites_accessed(self):
         """
@@ -107,14 +147,87 @@ class Transaction:
         """
         self.uncommitted_variables = dict()
 
+    def get_held_locks(self):
+        """
+        Get the locks currently held by this transaction
+
+        Returns:
+            Dict mapping (variable, site id) to list of locks held
+        """
+        return self.held_locks
+
+    def get_num_locks(self):
+        """
+        Get number of locks held by this transaction in the global
+        lock table
+
+        Returns:
+            Number of locks held
+        """
+        num_locks = 0
+
+        for (variable, site_id), locks in self.held_locks.items():
+            if site_id is None:
+                num_locks += len(locks)
+
+        return num_locks
+
+    def add_held_lock(self, lock, variable, site_id):
+        """
+        Record a lock set for this transaction in a lock table
+
+        Args:
+            lock: Lock which was set
+            variable: Variable on which lock was set
+            site_id: Id of the site of the lock table, None for global
+        """
+        key = (variable, site_id)
+
+        if key not in self.held_locks:
+            self.held_locks[key] = []
+
+        self.held_locks[key].append(lock)
+
+    def remove_held_lock(self, lock, variable, site_id):
+        """
+        Forget a lock of this transaction cleared from a lock table
+
+        Args:
+            lock: Lock which was cleared
+            variable: Variable from which lock was cleared
+            site_id: Id of the site of the lock table, None for global
+        """
+        key = (variable, site_id)
+
+        if key in self.held_locks:
+            locks = self.held_locks[key]
+
+            for index, held in enumerate(locks):
+                if held.lock_type == lock.lock_type:
+                    locks.pop(index)
+                    break
+
+            if len(locks) == 0:
+                self.held_locks.pop(key)
+
     def __eq__(self, other):
         """
-        Compare this transaction with some other
+        Compare this transaction with some other, transactions are
+        equal if they have the same id
 
         Returns:
             Boolean: Whether equal or not
         """
-        if isinstance(self, other.__class__):
-            return self.__dict__ == other.__dict__
+        if isinstance(other, Transaction):
+            return self.id == other.id
         else:
             return False
+
+    def __hash__(self):
+        """
+        Hash of the transaction, consistent with equality on id
+
+        Returns:
+            Hash of the transaction's id
+        """
+        return hash(self.id)
@@ -3,10 +3,13 @@ Authors:
 Amanpreet Singh
 Sharan Agrawal
 """
+import heapq
 import logging
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 from .Transaction import Transaction
+from .Variable import Variable
+from .Interner import Interner
 from .Lock import Lock
 from .LockTable import LockTable
 
@@ -14,6 +17,9 @@ from .enums.LockAcquireStatus import LockAcquireStatus
 from .enums.LockType import LockType
 from .enums.TransactionStatus import TransactionStatus
 from .enums.InstructionType import InstructionType
+from .enums.DeadlockPolicy import DeadlockPolicy
+from .enums.SiteStatus import SiteStatus
+from .enums.VictimPolicy import VictimPolicy
 from .constants import BEGIN_FUNC, BEGIN_READ_ONLY_FUNC, WRITE_FUNC, \
     READ_FUNC, END_FUNC
 
@@ -31,30 +37,131 @@ class TransactionManager:
         num_sites (int): Number of sites
         lock_table (class object): Global instance of LockTable
         site_manager (class object): Global instance of SiteManager
-        transaction_map (dict): Maps transaction name to Transaction class
+        transaction_names (Interner): gives ids to transaction names as
+                                      instructions are parsed, every table
+                                      is keyed by these ids and variable
+                                      indices, names are only used for
+                                      output
+        transaction_map (dict): Maps transaction id to Transaction class
                                 object
-        blocked_transactions (dict): stores blocked transaction name mapped to
-                                     blocking transaction tuple
-                                     (transaction name, lock type, variable, .)
-        waiting_transaction (dict): stores waiting transaction name mapped to
-                                    a tuple containing relevant information
+        blocked_transactions (OrderedDict): stores (time, blocked transaction
+                                            id) mapped to blocking
+                                            transaction tuple
+                                            (transaction id, lock type,
+                                            variable, .) in order of blocking
+        waiting_transactions (OrderedDict): stores (time, waiting transaction
+                                            id) mapped to a tuple
+                                            containing relevant information
+                                            in order of waiting
+        blocked_by_transaction (dict): maps blocked transaction id to an
+                                       ordered dict of time of blocking
+                                       mapped to blocking transaction tuple,
+                                       which is also the waits-for graph
+        waiting_by_transaction (dict): maps waiting transaction id to an
+                                       ordered dict of time of waiting
+                                       mapped to its tuple
+        blocked_writes (dict): maps variable to (time, id) of blocked
+                               records waiting for a write lock on it
+        blocked_order (dict): maps (time, id) of a blocked record to its
+                              sequence number
+        waiting_order (dict): maps (time, id) of a waiting record to its
+                              sequence number, records are always visited
+                              in sequence order
+        ready (dict): (time, id) of waiting records which are not in a
+                      lock wait queue mapped to their sequence number, only
+                      these are retried
+        ready_queue (list): heap of (sequence number, (time, id)) of ready
+                            records, may contain records no longer ready
+        site_waits (dict): (time, id) of waiting records which wait for a
+                           site to serve their variable mapped to the
+                           variable, woken whenever a site changes status
+                           or makes a copy readable
+        in_tick (bool): whether an instruction of transactions is being
+                        processed, site instructions come between ticks
+        new_edges (list): (blocked, blocking) transaction ids of edges
+                          added to waits-for graph since last deadlock check
+        aborts_pending (bool): set when a site changed status, as it may have
+                               aborted transactions
+        blockers_finished (bool): set when a blocking transaction may have
+                                  committed or aborted
+        deadlock_policy (DeadlockPolicy): how deadlocks are handled, the
+                                          waits-for graph is only kept for
+                                          detection
+        victim_policy (VictimPolicy): how the transaction to be aborted in
+                                      a detected deadlock is chosen
+        discarded_work (dict): maps id of every aborted transaction to a
+                               dict with ticks in which it read or wrote,
+                               locks it held, and number of variables it
+                               read and wrote
+        pending_commits (OrderedDict): maps id of every transaction whose
+                                       commit is not durable yet to its
+                                       commit time and a dict of the log
+                                       position of every site it waits
+                                       for, in order of commit
+        read_only_start_times (OrderedDict): maps id of every running
+                                             read only transaction to its
+                                             start time, oldest first
+        last_watermark (int): low watermark at which versions were last
+                              pruned
+        versions_reclaimed (int): number of versions pruned so far
     """
 
-    def __init__(self, num_vars, num_sites, lock_table, site_manager):
+    def __init__(self, num_vars, num_sites, lock_table, site_manager,
+                 deadlock_policy=DeadlockPolicy.DETECTION,
+                 victim_policy=VictimPolicy.YOUNGEST):
         self.number_of_variables = num_vars
         self.number_of_sites = num_sites
+        self.transaction_names = Interner()
         self.transaction_map = dict()
         self.lock_table = lock_table
         self.site_manager = site_manager
-        self.current_time = 0
-        self.blocked_transactions = defaultdict(dict)
-        self.waiting_transactions = defaultdict(dict)
+        # Goes on after the commits sites replayed on a restart
+        self.current_time = site_manager.get_last_commit_time()
+        self.in_tick = False
+        self.blocked_transactions = OrderedDict()
+        self.waiting_transactions = OrderedDict()
+        self.blocked_by_transaction = dict()
+        self.waiting_by_transaction = dict()
+        self.blocked_writes = dict()
+        self.blocked_order = dict()
+        self.waiting_order = dict()
+        self.next_order = 0
+        self.ready = dict()
+        self.ready_queue = list()
+        self.last_waiting_time = None
+        self.site_waits = dict()
+        self.new_edges = list()
+        self.aborts_pending = False
+        self.blockers_finished = False
+        self.deadlock_policy = deadlock_policy
+        self.victim_policy = victim_policy
+        self.discarded_work = dict()
+        self.pending_commits = OrderedDict()
+        self.read_only_start_times = OrderedDict()
+        self.last_watermark = None
+        self.versions_reclaimed = 0
+
+        self.lock_table.set_on_wake(self.mark_ready)
+        self.lock_table.set_on_release(self.lock_released)
+        self.site_manager.set_listeners(self.lock_released,
+                                        self.site_status_changed,
+                                        self.wake_site_waits)
+
+    def get_transaction_names(self):
+        """
+        Getter for transaction_names
+
+        Returns:
+            Interner of transaction names
+        """
+        return self.transaction_names
 
     def tick(self, instruction):
         """
 
         Method responsible for calling other methods based on instruction type.
-        Also checks for deadlocks on every tick
+        Also runs maintenance passes, each of which returns at once unless
+        some state change since its last run made it necessary
 
         Args:
             instruction : object of class Instruction, contains the
@@ -62,6 +169,9 @@ class TransactionManager:
 
         """
         self.current_time += 1
+        self.in_tick = True
+        self.site_manager.poll_logs()
+        self.finish_commits()
         self.clear_aborted()
         self.detect_and_clear_deadlocks()
         self.blocked_to_waiting()
@@ -71,6 +181,10 @@ class TransactionManager:
 
         # log.info(params, instruction.get_instruction_type())
 
+        if params[0] in self.transaction_map:
+            # Transaction's state may change, its waits must be retried
+            self.wake_transaction(self.transaction_map[params[0]])
+
         if instruction.get_instruction_type() == BEGIN_FUNC:
             self.begin(params)
 
@@ -89,6 +203,8 @@ class TransactionManager:
         else:
             log.info("We have a problem")
 
+        self.in_tick = False
+
     def begin(self, params):
         """
         Method responsible for initializing a transaction and making a new
@@ -100,18 +216,22 @@ class TransactionManager:
 
         """
 
-        current_index = len(self.transaction_map)
+        name = self.transaction_names.get_name(params[0])
 
-        log.info("Starting " + params[0])
-        self.transaction_map[str(params[0])] = Transaction(
-            current_index, params[0])
+        log.info("Starting " + name)
+        self.transaction_map[params[0]] = Transaction(
+            params[0], name, start_time=self.current_time)
 
         return
 
     def begin_read_only(self, params):
         """
         Method responsible for initializing a read only transaction and making
-        a new instance of Transaction class
+        a new instance of Transaction class. It only keeps its start time,
+        values are read lazily from versions as of its start time at a
+        site whose copy was readable then. It starts before the oldest
+        commit still waiting for its group commit, if any, so that it never
+        reads a commit which may yet be lost.
 
         Args:
             params : list of parameters of the parsed instruction, containing
@@ -119,15 +239,18 @@ class TransactionManager:
 
         """
 
-        current_index = len(self.transaction_map)
+        name = self.transaction_names.get_name(params[0])
 
-        log.info("Starting read only transaction " + params[0])
-        self.transaction_map[params[0]] = Transaction(
-            current_index, params[0], True)
+        start_time = self.current_time
+
+        for commit_time, ends in self.pending_commits.values():
+            start_time = min(start_time, commit_time - 1)
+            break
 
-        self.transaction_map[
-            params[0]].variable_values = \
-            self.site_manager.get_current_variables()
+        log.info("Starting read only transaction " + name)
+        self.transaction_map[params[0]] = Transaction(
+            params[0], name, True, start_time)
+        self.read_only_start_times[params[0]] = start_time
 
     def write_request(self, params):
         """
@@ -144,14 +267,14 @@ class TransactionManager:
 
         """
 
-        transaction_name = params[0]
+        transaction_id = params[0]
         variable = params[1]
-        value = int(params[2])
+        value = params[2]
 
-        if transaction_name not in self.transaction_map:
+        if transaction_id not in self.transaction_map:
             return
 
-        transaction = self.transaction_map[transaction_name]
+        transaction = self.transaction_map[transaction_id]
 
         is_waiting = transaction.get_status() == TransactionStatus.WAITING
         is_running = transaction.get_status() == TransactionStatus.RUNNING
@@ -163,8 +286,10 @@ class TransactionManager:
 
             self.lock_table.set_lock(transaction, LockType.WRITE, variable)
             log.info(transaction.name +
-                     " already has a write lock on " + variable)
+                     " already has a write lock on " +
+                     Variable.get_name(variable))
             transaction.uncommitted_variables[variable] = value
+            transaction.record_run(self.current_time)
             transaction.set_status(TransactionStatus.RUNNING)
             return
 
@@ -173,24 +298,23 @@ class TransactionManager:
                                                           variable)
         if lock_acquire_status == LockAcquireStatus.GOT_LOCK:
 
-            log.info(transaction.name + " got write lock on " + variable)
+            log.info(transaction.name + " got write lock on " +
+                     Variable.get_name(variable))
             self.lock_table.set_lock(transaction,
                                      LockType.WRITE, variable)
 
             transaction.uncommitted_variables[variable] = value
+            transaction.record_run(self.current_time)
 
-            squashed_waiting_transactions = \
-                self.get_squashed_waiting_transactions()
+            for waiting_tuple in self.get_waiting_tuples(transaction.id):
 
-            if transaction.name in squashed_waiting_transactions:
-
-                for waiting_tuple in squashed_waiting_transactions[
-                        transaction.name]:
-
-                    if waiting_tuple[1] != variable:
-                        return
+                if waiting_tuple[1] != variable:
+                    break
+            else:
+                transaction.set_status(TransactionStatus.RUNNING)
 
-            transaction.set_status(TransactionStatus.RUNNING)
+            # Waiters may abort it under wound-wait, so it goes last
+            self.block_waiters(variable)
 
         elif lock_acquire_status == LockAcquireStatus.ALL_SITES_DOWN:
 
@@ -198,57 +322,110 @@ class TransactionManager:
                                  variable,
                                  value)
 
-            squashed_waiting_transactions = \
-                self.get_squashed_waiting_transactions()
+            if waiting_txn_tuple in self.get_waiting_tuples(
+                    transaction.id):
+                return
+
+            log.info(transaction.name + " is waiting on " +
+                     Variable.get_name(variable))
 
-            if transaction.name in squashed_waiting_transactions:
+            transaction.set_status(TransactionStatus.WAITING)
+
+            self.add_waiting(transaction.id, waiting_txn_tuple)
+
+        else:
+            for lock in self.site_manager.get_variable_locks(variable):
 
-                if waiting_txn_tuple in squashed_waiting_transactions[
-                        transaction.name]:
+                if lock.transaction == transaction:
+                    continue
+
+                if not self.block(transaction, lock.transaction,
+                                  (InstructionType.WRITE, variable, value)):
                     return
 
-            log.info(transaction.name + " is waiting on " + variable)
+    def block(self, transaction, blocking_transaction, params):
+        """
+        Method responsible for recording that a transaction is blocked
+        by another one holding a lock on the variable it requested,
+        unless it is already blocked by it or deadlock policy does not
+        let it wait.
 
-            transaction.set_status(TransactionStatus.WAITING)
+        Args:
+            transaction (Transaction): transaction which requested a lock
+            blocking_transaction (Transaction): transaction holding a lock
+            params (tuple): instruction type, variable and, for a write,
+                            value of the request
+        Returns:
+            Boolean telling whether transaction got blocked
+        """
+
+        variable = params[1]
+        blocking_txn_tuple = (blocking_transaction.id,) + tuple(params)
+
+        if blocking_txn_tuple in self.get_blocked_tuples(transaction.id):
+            return False
+
+        if not self.can_wait(transaction, blocking_transaction):
+            return False
 
-            self.waiting_transactions[self.current_time][
-                transaction.name] = waiting_txn_tuple
+        if params[0] == InstructionType.WRITE:
+            log.info(transaction.name + " is blocked for a write lock by " +
+                     blocking_transaction.name + " on " +
+                     Variable.get_name(variable))
+            transaction.set_status(TransactionStatus.BLOCKED)
 
+            self.current_time += 1
+
+            self.add_blocked(transaction.id, blocking_txn_tuple)
+
+            # Readers waiting on variable now queue behind this write
+            self.lock_table.wake(variable, LockType.READ)
         else:
+            log.info(transaction.name + " is blocked by " +
+                     blocking_transaction.name + " on " +
+                     Variable.get_name(variable))
+            transaction.set_status(TransactionStatus.BLOCKED)
 
-            for lock in self.site_manager.get_set_locks().lock_map[variable]:
+            self.add_blocked(transaction.id, blocking_txn_tuple)
 
-                blocking_transaction = lock.transaction.name
+            self.current_time += 1
 
-                if lock.transaction == transaction:
-                    continue
+        return True
 
-                blocking_txn_tuple = (blocking_transaction,
-                                      InstructionType.WRITE,
-                                      variable,
-                                      value)
+    def block_waiters(self, variable):
+        """
+        Method responsible for blocking the transactions in the wait
+        queue of a variable by the transactions holding locks on it
+        which conflict with their requests, as when a lock changes hands.
+        They are not retried, only the waits-for graph learns whom they
+        wait for.
 
-                squashed_blocking_transactions = \
-                    self.get_squashed_blocked_transactions()
+        Args:
+            variable (int): index of the variable
+        """
 
-                if transaction.name in squashed_blocking_transactions:
+        if not self.lock_table.has_waiters(variable):
+            return
 
-                    if blocking_txn_tuple in squashed_blocking_transactions[
-                            transaction.name]:
-                        return
+        locks = self.get_all_locks(variable)
 
-                log.info(transaction.name +
-                         " is blocked for a write lock by " +
-                         blocking_transaction + " on " + variable)
-                transaction.set_status(TransactionStatus.BLOCKED)
+        for request, waiter, lock_type in self.lock_table.get_waiters(
+                variable):
+
+            for lock in locks:
 
-                self.current_time += 1
+                if not self.lock_table.is_waiting(waiter, variable, request):
+                    break
+
+                if lock.transaction.id == waiter.id or \
+                        not self.is_live(lock.transaction.id) or \
+                        LockTable.is_compatible(waiter, lock_type, [lock]):
+                    continue
 
-                self.blocked_transactions[self.current_time][
-                    transaction_name] = blocking_txn_tuple
+                self.block(waiter, lock.transaction,
+                           self.waiting_transactions[request])
 
-    def read_request_read_only(self, transaction, variable, transaction_name,
-                               try_waiting):
+    def read_request_read_only(self, transaction, variable, transaction_id):
         """
         Method responsible for processing a read request from a read only
         transaction, if the site holding the variable is down,
@@ -259,34 +436,27 @@ class TransactionManager:
                      instruction name
 
         """
-        if try_waiting:
-
-            val = self.site_manager.get_current_variables(variable)
-
-            if val is None:
-
-                transaction.variable_values[variable] = val
-            else:
-                return
-
-        if variable in transaction.variable_values:
+        if self.site_manager.can_read_version(transaction, variable):
 
             if variable not in transaction.read_variables:
                 transaction.read_variables[variable] = list()
 
-            transaction.read_variables[
-                variable].append(transaction.variable_values[variable])
+            val = self.site_manager.read_version(transaction, variable)
 
-            squashed_waiting_transactions = \
-                self.get_squashed_waiting_transactions()
+            transaction.read_variables[variable].append(val)
+            transaction.record_run(self.current_time)
 
-            if transaction.name in squashed_waiting_transactions:
+            # The read is done, whichever record of it was waiting
+            for time, waiting_tuple in list(self.waiting_by_transaction.get(
+                    transaction_id, dict()).items()):
 
-                for waiting_tuple in squashed_waiting_transactions[
-                        transaction.name]:
+                if waiting_tuple == (InstructionType.READ_ONLY, variable):
+                    self.remove_waiting(time, transaction_id)
 
-                    if waiting_tuple[1] != variable:
-                        return
+            for waiting_tuple in self.get_waiting_tuples(transaction.id):
+
+                if waiting_tuple[1] != variable:
+                    return
 
             transaction.set_status(TransactionStatus.RUNNING)
 
@@ -294,24 +464,20 @@ class TransactionManager:
 
             waiting_txn = (InstructionType.READ_ONLY, variable)
 
-            squashed_waiting_transactions = \
-                self.get_squashed_waiting_transactions()
-
-            if transaction_name in squashed_waiting_transactions:
+            if transaction_id in self.waiting_by_transaction:
 
-                if waiting_txn_tuple in squashed_waiting_transactions[
-                        transaction_name]:
+                if waiting_txn in self.get_waiting_tuples(transaction_id):
                     return
 
             transaction.set_status(TransactionStatus.WAITING)
-            log.info(transaction.name + " is waiting on " + variable)
+            log.info(transaction.name + " is waiting on " +
+                     Variable.get_name(variable))
 
-            self.waiting_transactions[self.current_time][
-                transaction_name] = waiting_txn
+            self.add_waiting(transaction_id, waiting_txn)
 
         return
 
-    def read_request(self, params, try_waiting=False):
+    def read_request(self, params):
         """
         Method responsible for processing a read request, gets read locks on
         the variable to be written,
@@ -326,13 +492,13 @@ class TransactionManager:
 
         """
 
-        transaction_name = params[0]
+        transaction_id = params[0]
         variable = params[1]
 
-        if transaction_name not in self.transaction_map:
+        if transaction_id not in self.transaction_map:
             return
 
-        transaction = self.transaction_map[transaction_name]
+        transaction = self.transaction_map[transaction_id]
 
         is_waiting = transaction.get_status() == TransactionStatus.WAITING
         is_running = transaction.get_status() == TransactionStatus.RUNNING
@@ -341,8 +507,8 @@ class TransactionManager:
             return
 
         if transaction.is_read_only:
-            self.read_request_read_only(
-                transaction, variable, transaction_name, try_waiting)
+            self.read_request_read_only(transaction, variable,
+                                        transaction_id)
 
         else:
 
@@ -352,12 +518,14 @@ class TransactionManager:
                 val = transaction.uncommitted_variables[variable]
 
                 log.info(transaction.name + " got read lock on " +
-                         variable + " having value " + str(val))
+                         Variable.get_name(variable) + " having value " +
+                         str(val))
 
                 if variable not in transaction.read_variables:
                     transaction.read_variables[variable] = list()
 
                 transaction.read_variables[variable].append(val)
+                transaction.record_run(self.current_time)
 
                 return
 
@@ -366,44 +534,42 @@ class TransactionManager:
 
                 self.lock_table.set_lock(transaction, LockType.READ, variable)
                 log.info(transaction.name +
-                         " already has a read lock on " + variable)
+                         " already has a read lock on " +
+                         Variable.get_name(variable))
+                transaction.record_run(self.current_time)
                 transaction.set_status(TransactionStatus.RUNNING)
                 return
 
-            for time in list(self.blocked_transactions):
-
-                blocked_tuple_dict = self.blocked_transactions[time]
+            if variable in self.blocked_writes:
 
-                for key in list(blocked_tuple_dict):
+                # Earliest transaction blocked for a write lock on variable
+                key = min(self.blocked_writes[variable],
+                          key=self.blocked_order.get)[1]
 
-                    blocked_tuple = blocked_tuple_dict[key]
-                    # print(len(blocked_tuple), variable)
+                for lock in self.lock_table.get_locks(variable):
 
-                    if len(blocked_tuple) == 4 and \
-                            blocked_tuple[2] == variable:
+                    blocking_transaction = lock.transaction.id
 
-                        for lock in self.lock_table.lock_map[variable]:
-
-                            blocking_transaction = lock.transaction.name
+                    if lock.transaction == transaction:
+                        continue
 
-                            if lock.transaction == transaction:
-                                continue
+                    blocking_txn_tuple = (blocking_transaction,
+                                          InstructionType.READ,
+                                          variable)
 
-                            blocking_txn_tuple = (blocking_transaction,
-                                                  InstructionType.READ,
-                                                  variable)
+                    if not self.can_wait(transaction, lock.transaction):
+                        return
 
-                            transaction.set_status(TransactionStatus.BLOCKED)
+                    transaction.set_status(TransactionStatus.BLOCKED)
 
-                            self.blocked_transactions[self.current_time][
-                                transaction_name] = blocking_txn_tuple
+                    self.add_blocked(transaction_id, blocking_txn_tuple)
 
-                            log.info(transaction_name + " will not get a " +
-                                     "read lock on " + variable +
-                                     " because " + key +
-                                     " is already waiting for a write lock")
+                    log.info(transaction.name + " will not get a " +
+                             "read lock on " + Variable.get_name(variable) +
+                             " because " + self.transaction_map[key].name +
+                             " is already waiting for a write lock")
 
-                            return
+                    return
 
             lock_acquire_status = self.site_manager.get_locks(
                 transaction, LockType.READ, variable)
@@ -415,344 +581,676 @@ class TransactionManager:
                 if lock_acquire_status == LockAcquireStatus.GOT_LOCK:
 
                     log.info(transaction.name + " got read lock on " +
-                             variable + " having value " +
-                             str(self.site_manager.get_current_variables(
-                                 variable)))
+                             Variable.get_name(variable) + " having value " +
+                             str(self.site_manager.get_read_value(
+                                 transaction, variable)))
 
                 else:
 
-                    log.info("Although, the site holding " + variable +
+                    log.info("Although, the site holding " +
+                             Variable.get_name(variable) +
                              " is recovering, " + transaction.name +
                              " got read lock on " +
-                             variable + " having value " +
-                             str(self.site_manager.get_current_variables(
-                                 variable)) + " since its the only copy")
+                             Variable.get_name(variable) + " having value " +
+                             str(self.site_manager.get_read_value(
+                                 transaction, variable)) +
+                             " since its the only copy")
 
                 if variable not in transaction.read_variables:
                     transaction.read_variables[variable] = list()
 
-                curr_variable = self.site_manager.get_current_variables(
-                    variable)
+                curr_variable = self.site_manager.get_read_value(
+                    transaction, variable)
                 transaction.read_variables[
                     variable].append(curr_variable)
+                transaction.record_run(self.current_time)
 
                 self.lock_table.set_lock(transaction,
                                          LockType.READ, variable)
 
-                squashed_waiting_transactions = \
-                    self.get_squashed_waiting_transactions()
-
-                if transaction.name in squashed_waiting_transactions:
-
-                    for waiting_tuple in squashed_waiting_transactions[
-                            transaction.name]:
+                for waiting_tuple in self.get_waiting_tuples(
+                        transaction.id):
 
-                        if waiting_tuple[1] != variable:
-                            return
+                    if waiting_tuple[1] != variable:
+                        break
+                else:
+                    transaction.set_status(TransactionStatus.RUNNING)
 
-                transaction.set_status(TransactionStatus.RUNNING)
+                # Waiters may abort it under wound-wait, so it goes last
+                self.block_waiters(variable)
 
             elif lock_acquire_status == LockAcquireStatus.ALL_SITES_DOWN:
 
                 waiting_txn_tuple = (InstructionType.READ, variable)
 
-                squashed_waiting_transactions = \
-                    self.get_squashed_waiting_transactions()
+                if waiting_txn_tuple in self.get_waiting_tuples(
+                        transaction.id):
+                    return
+
+                log.info(transaction.name + " is waiting on " +
+                         Variable.get_name(variable))
+
+                transaction.set_status(TransactionStatus.WAITING)
+
+                self.add_waiting(transaction.id, waiting_txn_tuple)
+
+            else:
+                for lock in self.site_manager.get_variable_locks(variable):
 
-                if transaction.name in squashed_waiting_transactions:
+                    if lock.transaction == transaction:
+                        continue
 
-                    if waiting_txn_tuple in squashed_waiting_transactions[
-                            transaction.name]:
+                    if not self.block(transaction, lock.transaction,
+                                      (InstructionType.READ, variable)):
                         return
+        return
 
-                log.info(transaction.name + " is waiting on " + variable)
+    def clear_aborted(self):
+        """
+        Method responsible for clearing transactions
+        aborted due to site failure. Excplicitely calls
+        the abort function for them. Does nothing unless
+        a site changed status since last time.
+        """
 
-                transaction.set_status(TransactionStatus.WAITING)
+        if not self.aborts_pending:
+            return
 
-                self.waiting_transactions[self.current_time][
-                    transaction.name] = waiting_txn_tuple
+        self.aborts_pending = False
 
-            else:
+        for trn_id in list(self.transaction_map):
+            transaction = self.transaction_map[trn_id]
+            if transaction.get_status() == TransactionStatus.ABORTED:
 
-                for lock in self.site_manager.get_set_locks().lock_map[
-                        variable]:
+                self.abort(trn_id)
 
-                    blocking_transaction = lock.transaction.name
+    def site_status_changed(self, site):
+        """
+        Method called whenever status of a site changes. Failing site
+        may have aborted transactions and recovering site may serve
+        waiting ones, so transactions waiting for a site are woken up
+        and aborted transactions are cleared on next tick. Writes waiting
+        for a lock on a variable the recovering site holds are retried
+        too, as they have to lock its copy as well. The tick from which
+        the site has its status is recorded, for read only transactions
+        to know which copies were readable when they began.
 
-                    if lock.transaction == transaction:
-                        continue
+        Args:
+            site (Site): site whose status changed
+        """
 
-                    blocking_txn_tuple = (blocking_transaction,
-                                          InstructionType.READ,
-                                          variable)
+        self.aborts_pending = True
+        self.blockers_finished = True
+        self.wake_site_waits()
 
-                    squashed_blocking_transactions = \
-                        self.get_squashed_blocked_transactions()
+        if self.in_tick:
+            site.record_status(self.current_time)
+        else:
+            # Status changing between ticks holds from the next one on
+            site.record_status(self.current_time + 1)
 
-                    if transaction.name in squashed_blocking_transactions:
+        if site.get_status() != SiteStatus.RECOVERING:
+            return
 
-                        if blocking_txn_tuple in \
-                                squashed_blocking_transactions[
-                                transaction.name]:
-                            return
+        for variable in self.lock_table.get_waited_variables():
 
-                    log.info(transaction.name + " is blocked by " +
-                             blocking_transaction + " on " + variable)
-                    transaction.set_status(TransactionStatus.BLOCKED)
+            if site.data_manager.has_variable(variable):
+                self.lock_table.wake(variable, LockType.WRITE)
 
-                    self.blocked_transactions[self.current_time][
-                        transaction_name] = blocking_txn_tuple
+    def wake_site_waits(self):
+        """
+        Method responsible for retrying the waiting records which wait
+        for a site to serve their variable, called whenever a site
+        changes status or makes a copy readable.
+        """
 
-                    self.current_time += 1
-        return
+        site_waits = self.site_waits
+        self.site_waits = dict()
 
-    def clear_aborted(self):
+        for key in site_waits:
+            self.mark_ready(key)
+
+    def lock_released(self, variable):
         """
-        Method responsible for clearing transactions
-        aborted due to site failure. Excplicitely calls
-        the abort function for them.
+        Method called whenever a lock on a variable is released in the
+        global lock table or at any site. The variable is granted to the
+        transactions at the head of its wait queue which are compatible
+        with the locks still held on it.
+
+        Args:
+            variable (int): index of the variable
         """
 
-        to_pop = list()
+        if not self.lock_table.has_waiters(variable):
+            return
 
-        for trn_name in list(self.transaction_map):
-            transaction = self.transaction_map[trn_name]
-            if transaction.get_status() == TransactionStatus.ABORTED:
+        self.lock_table.grant(variable, self.get_all_locks(variable))
+        self.block_waiters(variable)
+
+    def get_all_locks(self, variable):
+        """
+        Returns locks held on a variable in the global lock table and at
+        the sites holding it which are not down, locks left at a failed
+        site block no one
+
+        Args:
+            variable (int): index of the variable
+        Returns:
+            list of locks, a lock may be in it more than once
+        """
 
-                to_pop.append(trn_name)
-                self.abort(trn_name)
+        return self.lock_table.get_locks(variable) + \
+            self.site_manager.get_variable_locks(
+                variable, self.site_manager.get_available_sites(variable))
 
-    def detect_and_clear_deadlocks(self):
+    def wake_transaction(self, transaction):
         """
-        Method responsible for detecting and clearing deadlocks.
-        Traverses through blocked transactions and tries to detect deadlock
-        on each of them.
+        Method responsible for retrying all of the waiting records of a
+        transaction, whether they wait for a lock or a site.
+
+        Args:
+            transaction (Transaction): transaction to be woken
         """
 
-        squashed_blocked_transactions = \
-            self.get_squashed_blocked_transactions()
+        self.lock_table.wake_transaction(transaction)
 
-        for x in list(squashed_blocked_transactions):
+        for time in self.waiting_by_transaction.get(transaction.id, dict()):
+            key = (time, transaction.id)
 
-            visited = dict()
-            current = []
-            self.detect_deadlock(
-                x, visited, current, squashed_blocked_transactions)
+            if key in self.site_waits:
+                self.site_waits.pop(key)
+                self.mark_ready(key)
 
-    def detect_deadlock(self, transaction, visited, current, blocked_dict):
+    def add_blocked(self, transaction_id, blocked_tuple):
         """
-        Method responsible for detecting deadlock and calling the
-        clear_deadlock function when necessary.
+        Method responsible for recording that a transaction is blocked
+        at current time, indexing the record by transaction id and
+        variable, and remembering the new edge of the waits-for graph.
 
         Args:
-            transaction (str) : name of the blocked transaction
-            visited (dict) : stores index of each transaction visited
-            current (list) : list of all transactions which may be
-                             involved in a deadlock
-            blocked_list (dict) : stores blocked transactions and
-                                  the tuple containing information
-                                  about the blocker
+            transaction_id (int): id of the blocked transaction
+            blocked_tuple (tuple): tuple containing information about
+                                   the blocker, blocker's id first
         """
 
-        is_aborted = self.transaction_map[transaction].get_status() \
-            == TransactionStatus.ABORTED
-        is_committed = self.transaction_map[transaction].get_status() \
-            == TransactionStatus.COMMITTED
+        key = (self.current_time, transaction_id)
 
-        if transaction in blocked_dict and not is_aborted and not is_committed:
+        if key in self.blocked_transactions:
+            self.unindex_blocked_write(key)
+        else:
+            self.blocked_order[key] = self.next_order
+            self.next_order += 1
 
-            visited[transaction] = len(current) + 1
-            current.append(transaction)
+        self.blocked_transactions[key] = blocked_tuple
 
-            for block in blocked_dict[transaction]:
+        if transaction_id not in self.blocked_by_transaction:
+            self.blocked_by_transaction[transaction_id] = OrderedDict()
 
-                block = block[0]
+        self.blocked_by_transaction[transaction_id][self.current_time] = \
+            blocked_tuple
 
-                if self.transaction_map[block].get_status() == \
-                        TransactionStatus.ABORTED:
-                    continue
+        if len(blocked_tuple) == 4:
 
-                if block in visited:
-                    self.clear_deadlock(current, visited[block] - 1)
-                else:
-                    self.detect_deadlock(block, visited, current,
-                                         blocked_dict)
+            if blocked_tuple[2] not in self.blocked_writes:
+                self.blocked_writes[blocked_tuple[2]] = set()
 
-            current.pop()
-            visited.pop(transaction)
+            self.blocked_writes[blocked_tuple[2]].add(key)
 
-    def clear_deadlock(self, transaction_list, index):
+        if not self.is_live(blocked_tuple[0]):
+            self.blockers_finished = True
+
+        if self.deadlock_policy == DeadlockPolicy.DETECTION:
+            self.new_edges.append((transaction_id, blocked_tuple[0]))
+
+    def remove_blocked(self, time, transaction_id):
         """
-        Method responsible for resolving deadlock after
-        it has been detected by aborting
-        the youngest transaction involved.
+        Method responsible for removing a blocked record of a transaction
+        along with its indexes.
 
         Args:
-            transaction_list (list) : list of all transactions visited
+            time (int): time at which the transaction was blocked
+            transaction_id (int): id of the blocked transaction
+        """
 
-            index (int) : index of the first transaction involved in deadlock
+        key = (time, transaction_id)
+
+        self.unindex_blocked_write(key)
+        self.blocked_transactions.pop(key)
+        self.blocked_order.pop(key)
+
+        records = self.blocked_by_transaction[transaction_id]
+        records.pop(time)
+
+        if len(records) == 0:
+            self.blocked_by_transaction.pop(transaction_id)
+
+    def unindex_blocked_write(self, key):
         """
+        Method responsible for removing a blocked record from the index
+        of transactions blocked for a write lock on a variable.
 
-        transaction_list = transaction_list[index:]
-        max_id = -1
-        max_name = None
+        Args:
+            key (tuple): (time, id) of the blocked record
+        """
 
-        for name in transaction_list:
-            transaction = self.transaction_map[name]
-            is_committed = transaction.get_status() == \
-                TransactionStatus.ABORTED
-            is_aborted = transaction.get_status() == \
-                TransactionStatus.COMMITTED
-            if is_committed or is_aborted:
-                return
+        blocked_tuple = self.blocked_transactions[key]
 
-            if max_id < transaction.id:
-                max_id = self.transaction_map[name].id
-                max_name = name
+        if len(blocked_tuple) != 4:
+            return
+
+        keys = self.blocked_writes[blocked_tuple[2]]
+        keys.discard(key)
 
-        log.info(max_name + " aborted as it is youngest in a deadlock")
-        self.abort(max_name)
+        if len(keys) == 0:
+            self.blocked_writes.pop(blocked_tuple[2])
 
-    def get_squashed_blocked_transactions(self):
+    def get_blocked_tuples(self, transaction_id):
         """
-        Method responsible for squashing the default dict
-        self.blocked_transactions (based on current time as key)
-        into a default dict based on transaction name as key.
+        Returns blocked records of a transaction
 
+        Args:
+            transaction_id (int): id of the transaction
+        Returns:
+            list of blocking transaction tuples in order of blocking
         """
 
-        squashed_blocked_transactions = defaultdict(list)
+        if transaction_id in self.blocked_by_transaction:
+            return list(
+                self.blocked_by_transaction[transaction_id].values())
+        else:
+            return []
+
+    def add_waiting(self, transaction_id, waiting_tuple):
+        """
+        Method responsible for recording that a transaction is waiting
+        at current time, indexing the record by transaction id and
+        making it ready to be retried.
+
+        Args:
+            transaction_id (int): id of the waiting transaction
+            waiting_tuple (tuple): tuple containing information about
+                                   the request to be retried
+        """
 
-        for blocked_dicts in self.blocked_transactions.values():
+        key = (self.current_time, transaction_id)
 
-            for transaction_name in list(blocked_dicts):
-                blocked_tuple = blocked_dicts[transaction_name]
-                squashed_blocked_transactions[
-                    transaction_name].append(blocked_tuple)
+        if key not in self.waiting_transactions:
+            self.waiting_order[key] = self.next_order
+            self.next_order += 1
 
-        return squashed_blocked_transactions
+        self.waiting_transactions[key] = waiting_tuple
 
-    def get_squashed_waiting_transactions(self):
+        if transaction_id not in self.waiting_by_transaction:
+            self.waiting_by_transaction[transaction_id] = OrderedDict()
+
+        self.waiting_by_transaction[transaction_id][self.current_time] = \
+            waiting_tuple
+        self.last_waiting_time = self.current_time
+
+        self.mark_ready(key)
+
+    def remove_waiting(self, time, transaction_id):
         """
-        Method responsible for squashing the default dict
-        self.waiting_transactions (based on current time as key)
-        into a default dict based on transaction name as key.
+        Method responsible for removing a waiting record of a transaction
+        along with its indexes.
+
+        Args:
+            time (int): time at which the transaction started waiting
+            transaction_id (int): id of the waiting transaction
         """
 
-        squashed_waiting_transactions = defaultdict(list)
+        key = (time, transaction_id)
 
-        for waiting_dicts in self.waiting_transactions.values():
+        self.waiting_transactions.pop(key)
+        self.waiting_order.pop(key)
+        self.ready.pop(key, None)
+        self.site_waits.pop(key, None)
 
-            for transaction_name in list(waiting_dicts):
+        records = self.waiting_by_transaction[transaction_id]
+        records.pop(time)
 
-                waiting_tuple = waiting_dicts[transaction_name]
+        if len(records) == 0:
+            self.waiting_by_transaction.pop(transaction_id)
 
-                squashed_waiting_transactions[
-                    transaction_name].append(waiting_tuple)
+    def get_waiting_tuples(self, transaction_id):
+        """
+        Returns waiting records of a transaction
+
+        Args:
+            transaction_id (int): id of the transaction
+        Returns:
+            list of waiting tuples in order of waiting
+        """
 
-        return squashed_waiting_transactions
+        if transaction_id in self.waiting_by_transaction:
+            return list(
+                self.waiting_by_transaction[transaction_id].values())
+        else:
+            return []
 
-    def blocked_to_waiting(self):
+    def mark_ready(self, key):
         """
-        Method responsible for trying to resolve blocked transactions
-        by checking if the transaction blocking them has been
-        committed or aborted. If so, it changes the status of the blocked
-        transaction to waiting.
+        Method responsible for putting a waiting record in the ready queue,
+        called whenever it is added or woken up from a lock wait queue.
+
+        Args:
+            key (tuple): (time, id) of the waiting record
         """
 
-        to_pop = list()
+        if key in self.waiting_transactions and key not in self.ready:
+            self.ready[key] = self.waiting_order[key]
+            heapq.heappush(self.ready_queue, (self.waiting_order[key], key))
 
-        squashed_blocked_transactions = \
-            self.get_squashed_blocked_transactions()
+    def is_live(self, transaction_id):
+        """
+        Tells whether a transaction can still take part in a deadlock
 
-        for blocked_dict_key in sorted(self.blocked_transactions.keys()):
+        Args:
+            transaction_id (int): id of the transaction
+        Returns:
+            Boolean telling whether transaction is neither aborted
+            nor committed, nor waiting for its commit to be written
+        """
 
-            items = list(self.blocked_transactions[blocked_dict_key])
+        status = self.transaction_map[transaction_id].get_status()
 
-            for key in items:
-                blocked_tuple = self.blocked_transactions[
-                    blocked_dict_key][key]
-                is_clear = True
+        return status != TransactionStatus.ABORTED and \
+            status != TransactionStatus.COMMITTED and \
+            status != TransactionStatus.COMMITTING
 
-                # for blocking_transaction in block:
+    def can_wait(self, transaction, blocking_transaction):
+        """
+        Method responsible for preventing deadlocks when a transaction
+        is about to be blocked by another one, according to deadlock policy.
+        Age of a transaction is given by its id, lower id being older.
 
-                block = self.transaction_map[blocked_tuple[0]]
-                is_aborted = block.get_status() == TransactionStatus.ABORTED
-                is_committed = block.get_status() == \
-                    TransactionStatus.COMMITTED
-                is_clear = is_clear & (is_aborted or is_committed)
-                if is_clear:
+        wait-die: an older transaction waits, a younger one is aborted.
+        wound-wait: an older transaction aborts the blocking one and then
+        waits for it to be cleared, a younger one waits.
+        no-wait: the transaction is aborted.
 
-                    to_delete = None
+        Args:
+            transaction (Transaction): transaction about to be blocked
+            blocking_transaction (Transaction): transaction blocking it
+        Returns:
+            Boolean telling whether transaction can be blocked, it has
+            been aborted otherwise
+        """
 
-                    for blocker_tuple in squashed_blocked_transactions[key]:
+        if self.deadlock_policy == DeadlockPolicy.DETECTION or \
+                not self.is_live(blocking_transaction.id):
+            return True
 
-                        if blocker_tuple[0] == block.name:
-                            to_delete = blocker_tuple
-                            break
+        is_older = transaction.id < blocking_transaction.id
 
-                    squashed_blocked_transactions[key].remove(to_delete)
-                    to_pop.append((blocked_dict_key, key))
+        if self.deadlock_policy == DeadlockPolicy.WAIT_DIE and is_older:
+            return True
 
-                    if len(squashed_blocked_transactions[key]) == 0:
+        if self.deadlock_policy == DeadlockPolicy.WOUND_WAIT:
 
-                        flag = 0
-                        squashed_waiting_transactions = \
-                            self.get_squashed_waiting_transactions()
+            if is_older:
+                log.info(blocking_transaction.name + " aborted as it is " +
+                         "wounded by older " + transaction.name)
+                self.abort(blocking_transaction.id)
 
-                        if key in squashed_waiting_transactions:
+            return True
 
-                            for bl_tuple in squashed_waiting_transactions[key]:
+        if self.deadlock_policy == DeadlockPolicy.WAIT_DIE:
+            log.info(transaction.name + " aborted as it is younger than " +
+                     blocking_transaction.name + " which blocks it")
+        else:
+            log.info(transaction.name + " aborted as it is blocked by " +
+                     blocking_transaction.name)
 
-                                if bl_tuple == blocked_tuple[1:]:
-                                    flag = 1
-                                    break
-                        if flag:
-                            continue
+        self.abort(transaction.id)
 
-                        self.waiting_transactions[self.current_time][
-                            key] = blocked_tuple[1:]
-                        transaction = self.transaction_map[key]
-                        transaction.set_status(TransactionStatus.WAITING)
+        return False
 
-        for key in to_pop:
-            self.blocked_transactions[key[0]].pop(key[1])
+    def detect_and_clear_deadlocks(self):
+        """
+        Method responsible for detecting and clearing deadlocks.
+        The waits-for graph has no cycle after every check, so a new
+        cycle must pass through an edge added since the last check. Only
+        these edges are checked, in the order they were added, and
+        nothing is done if there are none.
+        """
+
+        new_edges = self.new_edges
+        self.new_edges = list()
+
+        for blocked, blocking in new_edges:
 
-    def abort(self, name):
+            cycle = self.detect_deadlock(blocked, blocking)
+
+            while cycle is not None:
+                self.clear_deadlock(cycle, 0)
+                cycle = self.detect_deadlock(blocked, blocking)
+
+    def detect_deadlock(self, blocked, blocking):
         """
-        Method responsible for aborting transactions. It clears
-        the transaction from blocked and waiting dicts.
+        Method responsible for detecting a deadlock through the edge
+        blocked -> blocking of the waits-for graph. Searches iteratively
+        for a path from blocking back to blocked.
+
+        Args:
+            blocked (int) : id of the blocked transaction
+            blocking (int) : id of the transaction blocking it
+        Returns:
+            list of transaction ids forming the cycle starting with
+            blocked or None if there is no deadlock
+        """
+
+        if not self.is_live(blocked) or not self.is_live(blocking) or \
+                blocking not in self.get_blockers(blocked):
+            return None
+
+        visited = set([blocking])
+        current = [blocked, blocking]
+        stack = [iter(self.get_blockers(blocking))]
+
+        while len(stack) > 0:
+
+            block = next(stack[-1], None)
+
+            if block is None:
+                stack.pop()
+                current.pop()
+                continue
+
+            if block == blocked:
+                return current
+
+            if block in visited or not self.is_live(block) or \
+                    block not in self.blocked_by_transaction:
+                continue
+
+            visited.add(block)
+            current.append(block)
+            stack.append(iter(self.get_blockers(block)))
+
+        return None
+
+    def get_blockers(self, transaction_id):
+        """
+        Returns transactions a transaction waits for, i.e. its edges
+        in the waits-for graph
+
+        Args:
+            transaction_id (int): id of the transaction
+        Returns:
+            list of ids of blocking transactions in order of blocking
+        """
+
+        return [blocked_tuple[0] for blocked_tuple in
+                self.get_blocked_tuples(transaction_id)]
+
+    def get_abort_cost(self, transaction):
+        """
+        Method responsible for estimating cost of aborting a transaction
+        according to victim policy. Younger transactions cost less
+        when costs are otherwise equal.
 
         Args:
-            name (str): name of the transaction to be aborted
+            transaction (Transaction): transaction to be estimated
+        Returns:
+            tuple which compares lower for a cheaper victim
+        """
+
+        if self.victim_policy == VictimPolicy.FEWEST_LOCKS:
+            cost = transaction.get_num_locks()
+        elif self.victim_policy == VictimPolicy.SMALLEST_WRITE_SET:
+            cost = len(transaction.get_uncommitted_variables())
+        elif self.victim_policy == VictimPolicy.LEAST_TICKS:
+            cost = transaction.get_ticks_run()
+        else:
+            cost = 0
+
+        return (cost, -transaction.id)
+
+    def clear_deadlock(self, transaction_list, index):
+        """
+        Method responsible for resolving deadlock after
+        it has been detected by aborting
+        the transaction involved which is cheapest to abort
+        according to victim policy.
+
+        Args:
+            transaction_list (list) : list of all transactions visited
+
+            index (int) : index of the first transaction involved in deadlock
+        """
+
+        transaction_list = transaction_list[index:]
+        min_cost = None
+        min_id = None
+
+        for transaction_id in transaction_list:
+            transaction = self.transaction_map[transaction_id]
+            is_committed = transaction.get_status() == \
+                TransactionStatus.ABORTED
+            is_aborted = transaction.get_status() == \
+                TransactionStatus.COMMITTED
+            if is_committed or is_aborted:
+                return
+
+            cost = self.get_abort_cost(transaction)
+
+            if min_cost is None or cost < min_cost:
+                min_cost = cost
+                min_id = transaction_id
+
+        if self.victim_policy == VictimPolicy.FEWEST_LOCKS:
+            reason = "holds fewest locks"
+        elif self.victim_policy == VictimPolicy.SMALLEST_WRITE_SET:
+            reason = "has smallest write set"
+        elif self.victim_policy == VictimPolicy.LEAST_TICKS:
+            reason = "has run for least ticks"
+        else:
+            reason = "is youngest"
+
+        log.info(self.transaction_map[min_id].name + " aborted as it " +
+                 reason + " in a deadlock")
+        self.abort(min_id)
+
+    def blocked_to_waiting(self):
         """
+        Method responsible for trying to resolve blocked transactions
+        by checking if the transaction blocking them has been
+        committed or aborted. If so, it changes the status of the blocked
+        transaction to waiting, once none of its blockers is left.
+        Does nothing unless a blocker may have finished since last time.
+        """
+
+        if not self.blockers_finished:
+            return
+
+        self.blockers_finished = False
+
+        to_pop = list()
+        num_blocked = dict()
+
+        for (time, key), blocked_tuple in list(
+                self.blocked_transactions.items()):
+
+            block = self.transaction_map[blocked_tuple[0]]
+            is_aborted = block.get_status() == TransactionStatus.ABORTED
+            is_committed = block.get_status() == TransactionStatus.COMMITTED
 
-        to_pop_blocked = list()
-        to_pop_waiting = list()
+            if not (is_aborted or is_committed):
+                continue
 
-        for time in sorted(self.blocked_transactions.keys()):
+            if key not in num_blocked:
+                num_blocked[key] = len(self.blocked_by_transaction[key])
 
-            if name in self.blocked_transactions[time]:
+            num_blocked[key] -= 1
+            to_pop.append((time, key))
 
-                to_pop_blocked.append((time, name))
+            if num_blocked[key] == 0:
 
-        for key in to_pop_blocked:
-            self.blocked_transactions[key[0]].pop(key[1])
+                if blocked_tuple[1:] in self.get_waiting_tuples(key):
+                    continue
+
+                self.add_waiting(key, blocked_tuple[1:])
+                transaction = self.transaction_map[key]
+                transaction.set_status(TransactionStatus.WAITING)
+                self.wake_transaction(transaction)
+
+        for key in to_pop:
+            self.remove_blocked(key[0], key[1])
+
+    def abort(self, transaction_id):
+        """
+        Method responsible for aborting transactions. It clears
+        the transaction from blocked and waiting dicts.
+
+        Args:
+            transaction_id (int): id of the transaction to be aborted
+        """
 
-        for time in self.waiting_transactions.keys():
+        for time in list(self.blocked_by_transaction.get(transaction_id,
+                                                         dict())):
+            self.remove_blocked(time, transaction_id)
 
-            if name in self.waiting_transactions[time]:
-                to_pop_waiting.append((time, name))
+        for time in list(self.waiting_by_transaction.get(transaction_id,
+                                                         dict())):
+            self.remove_waiting(time, transaction_id)
 
-        for key in to_pop_waiting:
-            self.waiting_transactions[key[0]].pop(key[1])
+        transaction = self.transaction_map[transaction_id]
+
+        if transaction_id not in self.discarded_work:
+            self.record_discarded_work(transaction)
 
-        transaction = self.transaction_map[name]
         transaction.set_status(TransactionStatus.ABORTED)
+        self.read_only_start_times.pop(transaction_id, None)
+        self.blockers_finished = True
+        self.wake_transaction(transaction)
         self.clear_locks(transaction)
 
         return
 
+    def record_discarded_work(self, transaction):
+        """
+        Method responsible for recording the work thrown away by
+        aborting a transaction in discarded_work.
+
+        Args:
+            transaction (Transaction): transaction being aborted
+        """
+
+        work = {
+            "ticks": transaction.get_ticks_run(),
+            "locks": transaction.get_num_locks(),
+            "reads": len(transaction.get_read_variables()),
+            "writes": len(transaction.get_uncommitted_variables())
+        }
+
+        log.debug("Discarded work of " + transaction.name + ": " +
+                  str(work["ticks"]) + " ticks, " + str(work["locks"]) +
+                  " locks, " + str(work["reads"]) + " reads, " +
+                  str(work["writes"]) + " writes")
+
+        self.discarded_work[transaction.id] = work
+
     def clear_locks(self, transaction):
         """
         Method responsible for clearing locks of transactions. It clears
@@ -764,19 +1262,31 @@ class TransactionManager:
                                                        locks have to be cleared
         """
 
-        lock_map = self.site_manager.get_set_locks().get_lock_map()
+        site_locks = defaultdict(list)
+        held_locks = transaction.get_held_locks()
 
-        for var_name in sorted(list(lock_map)):
-            locks = lock_map[var_name]
-            for lock in locks:
-                if lock.transaction == transaction:
-                    self.site_manager.clear_locks(lock, var_name)
-                    log.debug("Clearing site locks for " + transaction.name +
-                              " variable: " + var_name)
+        for (variable, site_id), locks in list(held_locks.items()):
 
-                    if self.lock_table.clear_lock(lock, var_name):
-                        log.info("Clearing locks for " + transaction.name +
-                                 " variable: " + var_name)
+            if site_id is None:
+                continue
+
+            site = self.site_manager.get_site(site_id)
+
+            for lock in list(locks):
+                site.clear_lock(lock, variable)
+
+                if lock not in site_locks[variable]:
+                    site_locks[variable].append(lock)
+
+        # Variables are cleared in order of their names
+        for variable in sorted(site_locks, key=Variable.get_name):
+            for lock in site_locks[variable]:
+                log.debug("Clearing site locks for " + transaction.name +
+                          " variable: " + Variable.get_name(variable))
+
+                if self.lock_table.clear_lock(lock, variable):
+                    log.info("Clearing locks for " + transaction.name +
+                             " variable: " + Variable.get_name(variable))
 
     def try_waiting(self):
         """
@@ -784,123 +1294,385 @@ class TransactionManager:
         Traverses through the waiting transactions and tries to get
         locks for them, to change their status to running.
 
+        A transaction whose retry left it waiting, without getting the
+        lock, is put in the wait queue of its variable if other
+        transactions hold locks on it, and is retried once the variable
+        is granted to it. Otherwise it waits for a site to serve the
+        variable and is retried once a site changes status or makes a
+        copy readable. Either wait ends early if the transaction itself
+        changes.
+
+        Only records in the ready queue are visited, in the order they
+        started waiting, and nothing is done if it is empty. A pass covers
+        records which started waiting before current time, and records
+        of current time added before the pass reaches them if there were
+        any when it started. Records woken up behind the pass are left
+        for the next one.
         """
 
+        if len(self.ready) == 0:
+            return
+
+        start_time = self.current_time
+        has_current = self.last_waiting_time == start_time
+        current_limit = None
+        last_order = -1
+        retried = list()
         to_pop = list()
 
-        for time in list(self.waiting_transactions):
+        while len(self.ready_queue) > 0:
+
+            order, key = self.ready_queue[0]
+
+            if self.ready.get(key) != order:
+                heapq.heappop(self.ready_queue)
+                continue
+
+            time, transaction = key
+
+            if time >= start_time and current_limit is None:
+                current_limit = self.next_order
+
+            if time > start_time or (time == start_time and (
+                    not has_current or order >= current_limit)):
+                break
 
-            waiting_dicts = self.waiting_transactions[time]
+            heapq.heappop(self.ready_queue)
+            self.ready.pop(key)
 
-            for transaction in list(waiting_dicts):
+            if order <= last_order:
+                retried.append(key)
+                continue
 
-                params = waiting_dicts[transaction]
-                transaction_obj = self.transaction_map[transaction]
-                transaction_obj.set_status(TransactionStatus.WAITING)
+            last_order = order
+            params = self.waiting_transactions[key]
+            transaction_obj = self.transaction_map[transaction]
 
-                if params[0] == InstructionType.WRITE:
-                    self.write_request((transaction, params[1], params[2]))
+            transaction_obj.set_status(TransactionStatus.WAITING)
 
-                elif params[0] == InstructionType.READ:
-                    self.read_request((transaction, params[1]))
+            if params[0] == InstructionType.WRITE:
+                self.write_request((transaction, params[1], params[2]))
+                lock_type = LockType.WRITE
 
-                elif params[0] == InstructionType.READ_ONLY:
-                    self.read_request((transaction, params[1]), True)
+            elif params[0] == InstructionType.READ:
+                self.read_request((transaction, params[1]))
+                lock_type = LockType.READ
 
-                if self.transaction_map[transaction].get_status() == \
-                   TransactionStatus.RUNNING:
-                    to_pop.append((time, transaction))
+            elif params[0] == InstructionType.READ_ONLY:
+                self.read_request((transaction, params[1]))
+                lock_type = LockType.READ
+
+            if self.is_still_waiting(transaction_obj, params, lock_type):
+                self.park_waiting(key, transaction_obj, params, lock_type)
+            else:
+                self.wake_transaction(transaction_obj)
+                retried.append(key)
+
+            if self.transaction_map[transaction].get_status() == \
+               TransactionStatus.RUNNING:
+                to_pop.append(key)
 
         for key in to_pop:
-            self.waiting_transactions[key[0]].pop(key[1])
+            if key in self.waiting_transactions:
+                self.remove_waiting(key[0], key[1])
+
+        for key in retried:
+            self.mark_ready(key)
+
+    def is_still_waiting(self, transaction, params, lock_type):
+        """
+        Tells whether a retried waiting record left its transaction
+        waiting as before, neither running, blocked, aborted nor holding
+        the lock it waits for.
+
+        Args:
+            transaction (Transaction): transaction of the record
+            params (tuple): waiting tuple of the record
+            lock_type (LockType): type of lock the record waits for
+        Returns:
+            bool telling whether the record has to wait further
+        """
+
+        if transaction.get_status() != TransactionStatus.WAITING:
+            return False
+
+        if params[0] == InstructionType.READ_ONLY:
+            return params in self.get_waiting_tuples(transaction.id)
 
-    def commit_transaction(self, name):
+        if lock_type == LockType.WRITE:
+            return not self.lock_table.is_locked_by_transaction(
+                transaction, params[1], LockType.WRITE)
+
+        return not self.lock_table.is_locked_by_transaction(transaction,
+                                                            params[1])
+
+    def park_waiting(self, key, transaction, params, lock_type):
+        """
+        Method responsible for keeping a waiting record from being
+        retried until it may succeed. It waits in the lock wait queue of
+        its variable if other transactions hold locks on it, otherwise
+        for a site to serve the variable.
+
+        Args:
+            key (tuple): (time, id) of the waiting record
+            transaction (Transaction): transaction of the record
+            params (tuple): waiting tuple of the record
+            lock_type (LockType): type of lock the record waits for
+        """
+
+        variable = params[1]
+        locks = self.get_all_locks(variable)
+
+        if params[0] != InstructionType.READ_ONLY and any(
+                lock.transaction.id != transaction.id for lock in locks):
+            self.lock_table.wait(transaction, lock_type, variable, key)
+            # A request compatible with the locks held waits for no release
+            self.lock_table.grant(variable, locks)
+        else:
+            self.site_waits[key] = variable
+
+    def commit_transaction(self, transaction_id):
         """
         Method responsible for commiting transactions when we
         recieve an end instruction. It traverses through the list
         of uncommitted variables and writes the values on the
         respective sites.
 
+        Returns:
+            dict mapping index of every site which logged the commit to
+            the log position it is durable at
         """
 
-        status = self.transaction_map[name].get_status()
+        status = self.transaction_map[transaction_id].get_status()
 
         if status == TransactionStatus.COMMITTED or \
                 status == TransactionStatus.ABORTED:
-            return
+            return dict()
 
-        transaction = self.transaction_map[name]
+        transaction = self.transaction_map[transaction_id]
         read_variables = transaction.get_read_variables()
 
         for variable, values in read_variables.items():
 
             for value in values:
 
-                log.info(name + " read the value " +
-                         str(value) + " of variable " + variable)
+                log.info(transaction.name + " read the value " +
+                         str(value) + " of variable " +
+                         Variable.get_name(variable))
 
         uncommited_variables = transaction.get_uncommitted_variables()
 
         for variable, value in uncommited_variables.items():
+            self.site_manager.write_variable(transaction, variable, value,
+                                             self.current_time)
+        ends = self.site_manager.commit_logs()
+        self.read_only_start_times.pop(transaction_id, None)
+
+        return ends
+
+    def get_low_watermark(self):
+        """
+        Returns the oldest time at which a read only transaction may still
+        read, which is the start time of the oldest running one if any,
+        else current time. A read only transaction started later begins
+        before the oldest commit not written yet, so it bounds it too
+
+        Returns:
+            Low watermark time
+        """
+        watermark = self.current_time
+
+        for start_time in self.read_only_start_times.values():
+            watermark = start_time
+            break
+
+        for commit_time, ends in self.pending_commits.values():
+            watermark = min(watermark, commit_time - 1)
+            break
+
+        return watermark
+
+    def prune_versions(self):
+        """
+        Method responsible for dropping versions which no read only
+        transaction can see. Runs after every commit, but only visits
+        all of the variables with old versions when the low watermark
+        has moved, otherwise only the ones written since last run.
+        """
+        watermark = self.get_low_watermark()
+        all_variables = watermark != self.last_watermark
+        self.last_watermark = watermark
 
-            for i in range(1, self.number_of_sites + 1):
-                var = int(variable[1:])
-                if var % 2 == 0 or ((var % 10) + 1) == i:
-                    site = self.site_manager.get_site(i)
-                    site.write_variable(transaction,
-                                        variable,
-                                        value)
-        self.transaction_map[name].set_status(TransactionStatus.COMMITTED)
+        reclaimed = self.site_manager.prune_versions(watermark, all_variables)
+
+        if reclaimed != 0:
+            self.versions_reclaimed += reclaimed
+            log.debug("Reclaimed " + str(reclaimed) + " versions older " +
+                      "than time " + str(watermark))
+
+    def get_version_counts(self):
+        """
+        Returns counters of versions retained at all of the sites and
+        versions reclaimed so far
+
+        Returns:
+            dict with retained and reclaimed counts
+        """
+        return {
+            "retained": self.site_manager.get_num_versions(),
+            "reclaimed": self.versions_reclaimed
+        }
 
     def end(self, params):
         """
         Method called when we recieve an end instruction.
-        Calls commit_transaction and clears the transaction
-        from blocked and waiting dicts. Also clears locks
-        held by transaction.
+        Calls commit_transaction and, once the commit is durable in
+        write ahead logs, finishes it. A commit left buffered for a
+        group commit keeps the transaction committing, holding its
+        locks, until the fsync of its batch.
 
         Args:
-            params(list) : contains the transaction name to be committed
+            params(list) : contains the transaction id to be committed
         """
 
-        status = self.transaction_map[params[0]].get_status()
+        transaction = self.transaction_map[params[0]]
+        status = transaction.get_status()
 
         if status == TransactionStatus.COMMITTED or \
-                status == TransactionStatus.ABORTED:
+                status == TransactionStatus.ABORTED or \
+                status == TransactionStatus.COMMITTING:
+            return
+
+        self.pending_commits[params[0]] = (
+            self.current_time, self.commit_transaction(params[0]))
+        # Earlier commits written in the same batch are finished first
+        self.finish_commits()
+        self.prune_versions()
+
+        if params[0] in self.pending_commits:
+            log.info(transaction.name + " waits for its commit to be " +
+                     "written")
+            transaction.set_status(TransactionStatus.COMMITTING)
+            self.remove_requests(transaction)
+            return
+
+        self.detect_and_clear_deadlocks()
+        self.blocked_to_waiting()
+        self.try_waiting()
+
+    def finish_commit(self, transaction_id):
+        """
+        Method responsible for reporting a transaction committed once its
+        commit is durable. It clears the transaction from blocked and
+        waiting dicts and clears locks held by it.
+
+        Args:
+            transaction_id (int): id of the committed transaction
+        """
+
+        transaction = self.transaction_map[transaction_id]
+        transaction.set_status(TransactionStatus.COMMITTED)
+        self.blockers_finished = True
+
+        log.info(transaction.name + " committed")
+        self.remove_requests(transaction)
+        self.clear_locks(transaction)
+
+    def remove_requests(self, transaction):
+        """
+        Method responsible for clearing a transaction which ended from
+        blocked and waiting dicts and from lock wait queues, so that none
+        of its requests is retried
+
+        Args:
+            transaction (Transaction): transaction which ended
+        """
+
+        self.wake_transaction(transaction)
+
+        for time in list(self.blocked_by_transaction.get(transaction.id,
+                                                         dict())):
+            self.remove_blocked(time, transaction.id)
+
+        for time in list(self.waiting_by_transaction.get(transaction.id,
+                                                         dict())):
+            self.remove_waiting(time, transaction.id)
+
+    def is_written(self, ends, positions):
+        """
+        Tells whether a commit is durable at every site which logged it
+
+        Args:
+            ends (dict): maps site index to log position the commit is
+                         durable at
+            positions (dict): maps site index to log position it is
+                              durable up to
+        Returns:
+            Boolean telling whether the commit is durable
+        """
+
+        for index, end in ends.items():
+
+            if positions[index] < end:
+                return False
+
+        return True
+
+    def finish_commits(self):
+        """
+        Method responsible for finishing the commits whose group commit
+        has been written since last time, in order of commit. A commit
+        is only finished once all of the earlier ones are, even if its
+        own logs are written first. Does nothing unless some commit is
+        pending.
+        """
+
+        if len(self.pending_commits) == 0:
             return
 
-        self.commit_transaction(params[0])
+        positions = None
 
-        log.info(params[0] + " committed")
-        self.clear_locks(self.transaction_map[params[0]])
+        for transaction_id, (commit_time, ends) in list(
+                self.pending_commits.items()):
 
-        squashed_blocked_transactions = \
-            self.get_squashed_blocked_transactions()
+            # Logs are only asked for once a commit logged something
+            if len(ends) != 0 and positions is None:
+                positions = self.site_manager.get_log_positions(
+                    self.get_pending_sites())
 
-        to_pop_blocked = list()
-        to_pop_waiting = list()
+            if not self.is_written(ends, positions):
+                break
 
-        if params[0] in squashed_blocked_transactions:
+            self.pending_commits.pop(transaction_id)
+            self.finish_commit(transaction_id)
 
-            squashed_blocked_transactions.pop(params[0])
+    def get_pending_sites(self):
+        """
+        Returns the sites whose log some pending commit waits for
 
-            for blocked_dict_key in sorted(self.blocked_transactions.keys()):
+        Returns:
+            List of site indices in increasing order
+        """
 
-                if params[0] in self.blocked_transactions[blocked_dict_key]:
+        sites = set()
 
-                    to_pop_blocked.append((blocked_dict_key, params[0]))
+        for commit_time, ends in self.pending_commits.values():
+            sites.update(ends)
 
-            for key in to_pop_blocked:
-                self.blocked_transactions[key[0]].pop(key[1])
+        return sorted(sites)
 
-        for time in self.waiting_transactions.keys():
+    def flush_commits(self):
+        """
+        Method responsible for writing all of the buffered commits at the
+        end of input and finishing the transactions waiting for them
+        """
 
-            if params[0] in self.waiting_transactions[time]:
-                to_pop_waiting.append((time, params[0]))
+        self.site_manager.flush_logs()
 
-        for key in to_pop_waiting:
-            self.waiting_transactions[key[0]].pop(key[1])
+        if len(self.pending_commits) == 0:
+            return
 
+        self.finish_commits()
         self.detect_and_clear_deadlocks()
         self.blocked_to_waiting()
         self.try_waiting()
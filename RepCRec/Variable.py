@@ -13,12 +13,16 @@ class Variable:
     Variable class represents the data of our sites which
     can be read or written by transactions
 
+    Sites keep their variables in a VariableStore, a Variable holds
+    the value of one of them at the time it was made.
+
     Args:
         index: index of variable
         name: Name of the variable
         value: Initial value of the variable
         current_site_id: Index of the site on which the variable is present
     """
+    __slots__ = ('index', 'name', 'current_site_id', 'value', 'lock_type')
 
     def __init__(self, index, name, value, current_site_id):
         self.index = index
@@ -27,24 +31,30 @@ class Variable:
         self.value = value
         self.lock_type = None
 
-    @classmethod
-    def get_sites(self, id):
+    @staticmethod
+    def get_index(name):
         """
-        Class method which returns the sites on which the variable is present
-        given an id
+        Returns index of a variable given its name, names are only parsed
+        when instructions are read
 
         Args:
-            id: id of the variable for which list of sites is requested
+            name: Name of the variable, like x12
         Returns:
-            List of sites on which variable with index=id is present
+            Index of the variable
+        """
+        return int(name[1:])
+
+    @staticmethod
+    def get_name(index):
         """
-        if type(id) == str:
-            id = int(id[1:])
+        Returns name of a variable given its index, for output
 
-        if id % 2 == 0:
-            return 'all'
-        else:
-            return (id % 10) + 1
+        Args:
+            index: Index of the variable
+        Returns:
+            Name of the variable
+        """
+        return 'x' + str(index)
 
     def get_current_site(self):
         """
@@ -0,0 +1,151 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from .enums.LockType import LockType
+from .Lock import Lock
+
+
+class VariableLock:
+    """
+    Represents the state of all locks held on a single variable in
+    a lock table. Instead of a list of locks it keeps a writer slot,
+    the readers keyed by transaction id (in the order they got the lock)
+    and a count of locks held, so that granting, testing, upgrading
+    and releasing a lock are all constant time.
+
+    A transaction can hold both a read and a write lock on the same
+    variable, in which case it is present in both the readers and the
+    writer slot and is counted twice.
+    """
+
+    def __init__(self):
+        self.writer = None
+        self.readers = dict()
+        self.count = 0
+
+    def get_count(self):
+        """
+        Returns number of locks held on the variable
+
+        Returns:
+            Number of locks held
+        """
+        return self.count
+
+    def get_writer(self):
+        """
+        Returns transaction holding the write lock
+
+        Returns:
+            Transaction holding the write lock or None
+        """
+        return self.writer
+
+    def get_readers(self):
+        """
+        Returns transactions holding a read lock
+
+        Returns:
+            Dict mapping transaction id to transaction holding read lock
+        """
+        return self.readers
+
+    def is_write_locked(self):
+        """
+        Tells whether a write lock is held
+
+        Returns:
+            bool telling whether the write lock is held
+        """
+        return self.writer is not None
+
+    def is_read_locked(self):
+        """
+        Tells whether a read lock is held
+
+        Returns:
+            bool telling whether a read lock is held
+        """
+        return len(self.readers) != 0
+
+    def has_lock(self, transaction, lock_type=None):
+        """
+        Tells whether transaction holds a lock, of a particular
+        type if lock_type is passed
+
+        Args:
+            transaction: Transaction to be checked
+            lock_type: If we have to check for a particular lock type
+        Returns:
+            bool telling whether the lock is held
+        """
+        if lock_type != LockType.READ and self.writer is not None and \
+                self.writer.get_id() == transaction.get_id():
+            return True
+
+        if lock_type != LockType.WRITE and \
+                transaction.get_id() in self.readers:
+            return True
+
+        return False
+
+    def add(self, transaction, lock_type):
+        """
+        Adds a lock of lock_type for transaction, does nothing if the
+        transaction already holds such a lock
+
+        Args:
+            transaction: Transaction which gets the lock
+            lock_type: Type of the lock
+        Returns:
+            bool telling whether a new lock was added
+        """
+        if self.has_lock(transaction, lock_type):
+            return False
+
+        if lock_type == LockType.WRITE:
+            self.writer = transaction
+        else:
+            self.readers[transaction.get_id()] = transaction
+
+        self.count += 1
+        return True
+
+    def remove(self, transaction, lock_type):
+        """
+        Removes lock of lock_type held by transaction
+
+        Args:
+            transaction: Transaction whose lock is to be removed
+            lock_type: Type of the lock
+        Returns:
+            bool telling whether a lock was removed
+        """
+        if not self.has_lock(transaction, lock_type):
+            return False
+
+        if lock_type == LockType.WRITE:
+            self.writer = None
+        else:
+            self.readers.pop(transaction.get_id())
+
+        self.count -= 1
+        return True
+
+    def get_locks(self):
+        """
+        Returns the locks held on the variable, read locks first in the
+        order they were granted followed by the write lock
+
+        Returns:
+            List of locks held
+        """
+        locks = [Lock(LockType.READ, transaction)
+                 for transaction in self.readers.values()]
+
+        if self.writer is not None:
+            locks.append(Lock(LockType.WRITE, self.writer))
+
+        return locks
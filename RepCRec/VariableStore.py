@@ -0,0 +1,268 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from array import array
+from bisect import bisect_left
+
+
+class VariableStore:
+    """
+    VariableStore keeps the variables held by a site in columns with an
+    entry per held variable only, so that no object is made per variable.
+    The variable at position p of the sorted indices has value values[p]
+    committed at commit_times[p], positions are found by binary search
+    over indices. Values are 64 bit signed integers.
+
+    Every committed value is kept as a version. Older versions of a
+    variable, which are only present while a read only transaction may
+    still read them, are kept in history. The initial value of variable
+    i is 10 * i, committed at time 0.
+
+    Args:
+        num_variables: Number of total variables present
+        indices: Indices of the variables held, in increasing order
+    """
+    __slots__ = ('num_variables', 'indices', 'values', 'commit_times',
+                 'history')
+
+    def __init__(self, num_variables, indices):
+        self.num_variables = num_variables
+        self.indices = array('q', indices)
+        self.values = array('q', [10 * index for index in self.indices])
+        self.commit_times = array('q', bytes(8 * len(self.indices)))
+        # Maps index to list of (commit time, value) of older versions
+        self.history = dict()
+
+    def get_position(self, index):
+        """
+        Returns position of a held variable in the columns
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Position of the variable, None if not held
+        """
+        position = bisect_left(self.indices, index)
+
+        if position < len(self.indices) and \
+                self.indices[position] == index:
+            return position
+
+        return None
+
+    def has_variable(self, index):
+        """
+        Tells whether a variable is held
+
+        Args:
+            index: Index of the variable
+        Returns:
+            boolean whether held or not
+        """
+        return self.get_position(index) is not None
+
+    def get_indices(self):
+        """
+        Getter for indices
+
+        Returns:
+            array of indices of held variables in increasing order
+        """
+        return self.indices
+
+    def get_num_variables(self):
+        """
+        Returns number of variables held
+
+        Returns:
+            Number of variables held
+        """
+        return len(self.indices)
+
+    def get_value(self, index):
+        """
+        Returns latest committed value of a variable
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Value of the variable
+        """
+        return self.values[self.get_position(index)]
+
+    def get_values(self):
+        """
+        Returns the column of values
+
+        Returns:
+            Values of held variables in order of indices
+        """
+        return self.values
+
+    def get_commit_times(self):
+        """
+        Returns the column of commit times
+
+        Returns:
+            Commit times of held variables in order of indices
+        """
+        return self.commit_times
+
+    def set_values(self, values, commit_times):
+        """
+        Replaces values of all of the variables, dropping older versions
+
+        Args:
+            values: Values of held variables in order of indices, such as
+                    an array or a memoryview of 64 bit integers
+            commit_times: Commit times of the values, in the same form
+        """
+        self.values = values
+        self.commit_times = commit_times
+        self.history = dict()
+
+    def set_value(self, index, value, time):
+        """
+        Sets value of a variable as committed at time, dropping its older
+        versions
+
+        Args:
+            index: Index of the variable
+            value: Value of the variable
+            time: Commit time of the value
+        """
+        position = self.get_position(index)
+        self.history.pop(index, None)
+        self.values[position] = value
+        self.commit_times[position] = time
+
+    def add_version(self, index, time, value):
+        """
+        Commits a new version of a variable, which becomes its value
+
+        Args:
+            index: Index of the variable
+            time: Time of the commit
+            value: Value committed
+        """
+        position = self.get_position(index)
+
+        if index not in self.history:
+            self.history[index] = list()
+
+        self.history[index].append((self.commit_times[position],
+                                    self.values[position]))
+        self.values[position] = value
+        self.commit_times[position] = time
+
+    def get_version(self, index, time):
+        """
+        Returns value of the newest version of a variable committed at or
+        before time
+
+        Args:
+            index: Index of the variable
+            time: Time at which the value is required
+        Returns:
+            Value of the variable at time, None if it had none
+        """
+        position = self.get_position(index)
+
+        if self.commit_times[position] <= time:
+            return self.values[position]
+
+        for commit_time, value in reversed(self.history.get(index, ())):
+            if commit_time <= time:
+                return value
+
+        return None
+
+    def get_timed_version(self, index, time):
+        """
+        Returns the newest version of a variable committed at or before
+        time, with its commit time
+
+        Args:
+            index: Index of the variable
+            time: Time at which the value is required
+        Returns:
+            Tuple of (commit time, value), None if it had none
+        """
+        position = self.get_position(index)
+
+        if self.commit_times[position] <= time:
+            return (self.commit_times[position], self.values[position])
+
+        for commit_time, value in reversed(self.history.get(index, ())):
+            if commit_time <= time:
+                return (commit_time, value)
+
+        return None
+
+    def get_commit_time(self, index):
+        """
+        Returns time at which the value of a variable was committed
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Commit time of the value
+        """
+        return self.commit_times[self.get_position(index)]
+
+    def get_versions(self, index):
+        """
+        Returns all versions of a variable
+
+        Args:
+            index: Index of the variable
+        Returns:
+            List of (commit time, value) of the variable in order of commit
+        """
+        position = self.get_position(index)
+
+        return self.history.get(index, list()) + \
+            [(self.commit_times[position], self.values[position])]
+
+    def get_num_versions(self, index):
+        """
+        Returns number of versions kept for a variable
+
+        Args:
+            index: Index of the variable
+        Returns:
+            Number of versions
+        """
+        return len(self.history.get(index, ())) + 1
+
+    def prune_versions(self, index, time):
+        """
+        Drops versions of a variable older than the newest one committed
+        at or before time, as reads at time or later can not see them
+
+        Args:
+            index: Index of the variable
+            time: Oldest time at which a read may happen
+        Returns:
+            Number of versions dropped
+        """
+        if index not in self.history:
+            return 0
+
+        older = self.history[index]
+
+        if self.get_commit_time(index) <= time:
+            self.history.pop(index)
+            return len(older)
+
+        keep = len(older) - 1
+
+        while keep > 0 and older[keep][0] > time:
+            keep -= 1
+
+        if keep > 0:
+            self.history[index] = older[keep:]
+
+        return keep
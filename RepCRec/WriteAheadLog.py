@@ -0,0 +1,275 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+import os
+import struct
+import time
+import zlib
+
+
+class WriteAheadLog:
+    """
+    WriteAheadLog is the file to which a site appends the writes it
+    commits, so that its variables can be rebuilt after a restart.
+
+    Every commit at the site is one record holding commit time, number of
+    writes, (index, value) of every write and a crc32 of all of these, so
+    that a record torn by a crash is detected and dropped on replay.
+
+    Positions in the log count bytes of records written since it was
+    created. The file starts with a header of magic and the position of
+    its first record, so that once a checkpoint covers the records before
+    a position they can be dropped by rewriting the file with only the
+    records after it, keeping positions of these as they were.
+
+    Records are buffered and written with a single fsync once batch_size
+    commits are buffered or latency milliseconds have passed since the
+    oldest buffered one (group commit). With no latency every commit is
+    written at once, whatever the batch size. A commit is durable once the
+    position of the log passes the end of its record, callers must not
+    report it committed before that.
+
+    Args:
+        path: Path of the log file, created if not present
+        batch_size: Number of commits buffered before they are written
+        latency: Milliseconds a commit may stay buffered
+    """
+    MAGIC = b'RWAL'
+    FILE_HEADER = struct.Struct('<4sq')
+    HEADER = struct.Struct('<qI')
+    WRITE = struct.Struct('<qq')
+    CHECKSUM = struct.Struct('<I')
+
+    def __init__(self, path, batch_size=1, latency=0):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.latency = latency / 1000
+        # Writes of the commit in progress as (index, value)
+        self.pending = list()
+        self.pending_time = None
+        self.buffer = bytearray()
+        self.buffered_commits = 0
+        self.oldest_buffered = None
+        self.num_commits = 0
+        self.num_syncs = 0
+        self.num_truncations = 0
+        self.file = open(path, 'ab')
+
+        if self.file.tell() == 0:
+            self.file.write(self.FILE_HEADER.pack(self.MAGIC, 0))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+        with open(path, 'rb') as log_file:
+            magic, self.base = self.FILE_HEADER.unpack(
+                log_file.read(self.FILE_HEADER.size))
+
+        if magic != self.MAGIC:
+            raise ValueError(path + " is not a write ahead log")
+
+        # Position up to which the file is known to be written and synced
+        self.position = self.base + self.file.tell() - self.FILE_HEADER.size
+
+    def get_offset(self, position):
+        """
+        Returns offset in the file of a position in the log
+
+        Args:
+            position: Position in the log, not before its first record
+        Returns:
+            Offset in the file
+        """
+        return position - self.base + self.FILE_HEADER.size
+
+    def replay(self, start=0):
+        """
+        Reads all of the complete records in the log file after start,
+        truncating it after the last one so that a torn record is not
+        followed by new ones
+
+        Args:
+            start: Position of the first record to be read, as covered by
+                   a checkpoint, records before the first one in the file
+                   are gone
+        Returns:
+            List of (commit time, list of (index, value)) in order of
+            commit
+        """
+        start = max(start, self.base)
+
+        with open(self.path, 'rb') as log_file:
+            log_file.seek(self.get_offset(start))
+            data = log_file.read()
+
+        records = list()
+        offset = 0
+
+        while offset + self.HEADER.size <= len(data):
+            commit_time, count = self.HEADER.unpack_from(data, offset)
+            end = offset + self.HEADER.size + count * self.WRITE.size
+
+            if end + self.CHECKSUM.size > len(data) or \
+                    self.CHECKSUM.unpack_from(data, end)[0] != \
+                    zlib.crc32(data[offset:end]):
+                break
+
+            writes = [self.WRITE.unpack_from(data, position) for position
+                      in range(offset + self.HEADER.size, end,
+                               self.WRITE.size)]
+            records.append((commit_time, writes))
+            offset = end + self.CHECKSUM.size
+
+        # A log shorter than start has nothing to be replayed or truncated
+        if offset != len(data):
+            os.truncate(self.path, self.get_offset(start + offset))
+            self.position = start + offset
+
+        return records
+
+    def truncate(self, position):
+        """
+        Drops the records before a position, once a durable checkpoint
+        includes them. The records after it are copied to a new file
+        which replaces the log once synced, so a crash leaves either of
+        the two
+
+        Args:
+            position: Position up to which records are dropped, not after
+                      the durable end of the log
+        """
+        if position <= self.base:
+            return
+
+        with open(self.path, 'rb') as log_file:
+            log_file.seek(self.get_offset(position))
+            data = log_file.read(self.position - position)
+
+        temporary = self.path + ".tmp"
+
+        with open(temporary, 'wb') as log_file:
+            log_file.write(self.FILE_HEADER.pack(self.MAGIC, position) + data)
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+        self.file.close()
+        os.replace(temporary, self.path)
+        self.file = open(self.path, 'ab')
+        self.base = position
+        self.num_truncations += 1
+
+    def get_base(self):
+        """
+        Getter for base
+
+        Returns:
+            Position of the first record in the file
+        """
+        return self.base
+
+    def append(self, commit_time, index, value):
+        """
+        Adds a write to the commit in progress
+
+        Args:
+            commit_time: Time of the commit
+            index: Index of the variable written
+            value: Value written
+        """
+        self.pending.append((index, value))
+        self.pending_time = commit_time
+
+    def commit(self):
+        """
+        Ends the commit in progress, buffering its record and writing the
+        buffer if the batch is full or its latency has passed
+
+        Returns:
+            boolean whether the commit had any writes to be logged
+        """
+        logged = len(self.pending) != 0
+
+        if logged:
+            record = self.HEADER.pack(self.pending_time, len(self.pending))
+
+            for index, value in self.pending:
+                record += self.WRITE.pack(index, value)
+
+            self.buffer += record + self.CHECKSUM.pack(zlib.crc32(record))
+            self.pending = list()
+            self.buffered_commits += 1
+            self.num_commits += 1
+
+            if self.oldest_buffered is None:
+                self.oldest_buffered = time.monotonic()
+
+        if self.buffered_commits >= self.batch_size:
+            self.flush()
+        else:
+            self.poll()
+
+        return logged
+
+    def poll(self):
+        """
+        Writes the buffer if the oldest buffered commit has waited for
+        latency
+        """
+        if self.oldest_buffered is not None and \
+                time.monotonic() - self.oldest_buffered >= self.latency:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes all of the buffered commits to the file with one fsync
+        """
+        if self.buffered_commits == 0:
+            return
+
+        self.file.write(self.buffer)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        self.position += len(self.buffer)
+        self.buffer = bytearray()
+        self.buffered_commits = 0
+        self.oldest_buffered = None
+        self.num_syncs += 1
+
+    def close(self):
+        """
+        Writes the buffered commits and closes the file
+        """
+        self.flush()
+        self.file.close()
+
+    def get_position(self):
+        """
+        Getter for position
+
+        Returns:
+            Position in the log up to which commits are durable
+        """
+        return self.position
+
+    def get_end(self):
+        """
+        Returns position of the end of the buffered records
+
+        Returns:
+            Position the log reaches once all of the buffered commits are
+            written
+        """
+        return self.position + len(self.buffer)
+
+    def get_counts(self):
+        """
+        Returns counters of commits logged, fsyncs done and truncations
+        of the log
+
+        Returns:
+            dict with commits, syncs and truncations counts
+        """
+        return {"commits": self.num_commits, "syncs": self.num_syncs,
+                "truncations": self.num_truncations}
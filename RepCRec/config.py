@@ -5,5 +5,35 @@ config = {
     "BASE_PORT": 9919,
     "LOG_LEVEL": logging.INFO,
     "NUM_SITES": 10,
-    "NUM_VARIABLES": 20
+    "NUM_VARIABLES": 20,
+    # One of detection, wait-die, wound-wait or no-wait
+    "DEADLOCK_POLICY": "detection",
+    # One of youngest, fewest-locks, smallest-write-set or least-ticks
+    "VICTIM_POLICY": "youngest",
+    # One of even-odd, fixed-factor or consistent-hashing
+    "REPLICATION_POLICY": "even-odd",
+    # Replicas of every variable, not used by even-odd
+    "REPLICATION_FACTOR": 3,
+    # Directory of write ahead logs of sites, None to not log commits
+    "WAL_DIR": None,
+    # Commits written to a write ahead log with one fsync
+    "GROUP_COMMIT_SIZE": 1,
+    # Milliseconds a commit may wait for others to be written with it
+    "GROUP_COMMIT_LATENCY": 0,
+    # Commits at a site between its checkpoints, 0 to never take one
+    "CHECKPOINT_INTERVAL": 0,
+    # Whether recovering sites copy values of replicated variables at once
+    "CATCH_UP": False,
+    # One of available-copies, quorum or primary-copy
+    "REPLICA_CONTROL": "available-copies",
+    # Replicas a read consults under quorum, 0 for the smallest valid one
+    "READ_QUORUM": 0,
+    # Replicas a write locks under quorum, 0 for a majority
+    "WRITE_QUORUM": 0,
+    # Whether write locks on replicas are taken only once all can be granted
+    "ATOMIC_LOCKS": False,
+    # One of first, round-robin, least-locked or power-of-two
+    "READ_ROUTING": "first",
+    # Whether every site runs in its own process
+    "SITE_PROCESSES": False
 }
@@ -10,4 +10,5 @@ DUMP_FUNC = "dump"
 END_FUNC = "end"
 FAIL_FUNC = "fail"
 RECOVER_FUNC = "recover"
-SITE_MANAGER_FUNCS = [DUMP_FUNC, FAIL_FUNC, RECOVER_FUNC]
+CHECK_FUNC = "check"
+SITE_MANAGER_FUNCS = [DUMP_FUNC, FAIL_FUNC, RECOVER_FUNC, CHECK_FUNC]
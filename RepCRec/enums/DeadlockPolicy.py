@@ -0,0 +1,18 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from enum import Enum
+
+
+class DeadlockPolicy(Enum):
+    """
+    Ways of handling deadlocks. Detection lets transactions block and
+    aborts the youngest one in a cycle, others prevent cycles using age
+    of transactions whenever one would be blocked by another
+    """
+    DETECTION = "detection"
+    WAIT_DIE = "wait-die"
+    WOUND_WAIT = "wound-wait"
+    NO_WAIT = "no-wait"
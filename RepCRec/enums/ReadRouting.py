@@ -0,0 +1,20 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from enum import Enum
+
+
+class ReadRouting(Enum):
+    """
+    Ways of choosing the replica a read lock is requested from. First
+    takes the lowest site having a readable copy, round-robin rotates the
+    first site tried over reads, least-locked tries the site with fewest
+    locked variables first and power-of-two tries the less locked of two
+    random readable sites first
+    """
+    FIRST = "first"
+    ROUND_ROBIN = "round-robin"
+    LEAST_LOCKED = "least-locked"
+    POWER_OF_TWO = "power-of-two"
@@ -0,0 +1,19 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from enum import Enum
+
+
+class ReplicaControl(Enum):
+    """
+    Ways of keeping replicas of a variable consistent. Available copies
+    writes every available replica and reads any readable one, quorum
+    writes W replicas and reads R of them, taking the newest version.
+    Primary copy locks only the primary replica of a variable and writes
+    every available one
+    """
+    AVAILABLE_COPIES = "available-copies"
+    QUORUM = "quorum"
+    PRIMARY_COPY = "primary-copy"
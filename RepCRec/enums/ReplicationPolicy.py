@@ -0,0 +1,18 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from enum import Enum
+
+
+class ReplicationPolicy(Enum):
+    """
+    Ways of placing replicas of variables on sites. Even-odd replicates
+    even variables at every site and keeps odd variable i only at site
+    (i mod num_sites) + 1, the others keep a fixed number of replicas of
+    every variable on consecutive sites or on a consistent hash ring
+    """
+    EVEN_ODD = "even-odd"
+    FIXED_FACTOR = "fixed-factor"
+    CONSISTENT_HASHING = "consistent-hashing"
@@ -15,3 +15,4 @@ class TransactionStatus(Enum):
     BLOCKED = 2
     ABORTED = 3
     COMMITTED = 4
+    COMMITTING = 5
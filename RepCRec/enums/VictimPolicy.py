@@ -0,0 +1,17 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+"""
+from enum import Enum
+
+
+class VictimPolicy(Enum):
+    """
+    Ways of choosing the transaction to be aborted in a deadlock,
+    ties are broken in favour of the youngest transaction
+    """
+    YOUNGEST = "youngest"
+    FEWEST_LOCKS = "fewest-locks"
+    SMALLEST_WRITE_SET = "smallest-write-set"
+    LEAST_TICKS = "least-ticks"
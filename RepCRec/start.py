@@ -13,6 +13,11 @@ from .SiteManager import SiteManager
 from .TransactionManager import TransactionManager
 from .IO import IO
 from .LockTable import LockTable
+from .enums.DeadlockPolicy import DeadlockPolicy
+from .enums.VictimPolicy import VictimPolicy
+from .enums.ReplicationPolicy import ReplicationPolicy
+from .enums.ReplicaControl import ReplicaControl
+from .enums.ReadRouting import ReadRouting
 from tornado.ioloop import IOLoop
 from tornado import gen
 
@@ -29,6 +34,33 @@ class Main:
         sites: Whether to bind sites to port
         out_file: If out_file is present, logs will be written to it
         stdin: Whether to take input from stdin
+        deadlock_policy: Name of the policy used to handle deadlocks
+        victim_policy: Name of the policy used to choose transaction
+                       aborted in a deadlock
+        replication_policy: Name of the policy used to place replicas of
+                            variables on sites
+        replication_factor: Number of replicas of every variable, not
+                            used by even-odd policy
+        wal_dir: Directory of write ahead logs of sites, commits are not
+                 logged if not passed
+        group_commit_size: Number of commits written to a log with one
+                           fsync
+        group_commit_latency: Milliseconds a commit may wait for others to
+                              be written with it
+        checkpoint_interval: Number of commits at a site between its
+                             checkpoints, 0 to never take one
+        catch_up: Whether recovering sites copy values of replicated
+                  variables from other sites at once
+        replica_control: Name of the way replicas are kept consistent
+        read_quorum: Replicas a read consults under quorum control, 0 for
+                     the smallest one meeting every write quorum
+        write_quorum: Replicas a write locks under quorum control, 0 for
+                      a majority
+        atomic_locks: Whether locks on replicas are taken only once all of
+                      the needed ones can be granted
+        read_routing: Name of the policy choosing the replica a read lock
+                      is requested from
+        site_processes: Whether every site runs in its own process
     """
     @plac.annotations(
         file_path=("File name, pass anything in case of stdin",
@@ -39,13 +71,64 @@ class Main:
         out_file=("Output file, if not passed by default we" +
                   " will print to stdout", "option", "o", str),
         stdin=("Takes input from stdin instead of file if passed", "flag",
-               "i"))
+               "i"),
+        deadlock_policy=("Deadlock handling policy", "option", "d", str,
+                         [policy.value for policy in DeadlockPolicy]),
+        victim_policy=("Choice of transaction aborted in a deadlock",
+                       "option", "c", str,
+                       [policy.value for policy in VictimPolicy]),
+        replication_policy=("Placement of replicas of variables on sites",
+                            "option", "p", str,
+                            [policy.value for policy in ReplicationPolicy]),
+        replication_factor=("Replicas of every variable, not used by " +
+                            "even-odd placement", "option", "k", int),
+        wal_dir=("Directory of write ahead logs of sites, state is " +
+                 "replayed from it on start", "option", "w", str),
+        group_commit_size=("Commits written to a log with one fsync, " +
+                           "above 1 needs -l", "option", "b", int),
+        group_commit_latency=("Milliseconds a commit may wait for others " +
+                              "to be written with it", "option", "l",
+                              float),
+        checkpoint_interval=("Commits at a site between its checkpoints " +
+                             "in write ahead log directory, 0 for none",
+                             "option", "e", int),
+        catch_up=("Recovering sites copy values of replicated variables " +
+                  "from other sites at once", "flag", "u"),
+        replica_control=("Way replicas of variables are kept consistent",
+                         "option", "q", str,
+                         [control.value for control in ReplicaControl]),
+        read_quorum=("Replicas a read consults under quorum control, 0 " +
+                     "for the smallest valid one", "option", "R", int),
+        write_quorum=("Replicas a write locks under quorum control, 0 " +
+                      "for a majority", "option", "W", int),
+        atomic_locks=("Locks on replicas are taken only once all of them " +
+                      "can be granted", "flag", "a"),
+        read_routing=("Choice of replica a read lock is requested from",
+                      "option", "r", str,
+                      [routing.value for routing in ReadRouting]),
+        site_processes=("Every site runs in its own process, reached " +
+                        "through a unix socket", "flag", "m"))
     def __init__(self, file_path,
                  num_sites=config['NUM_SITES'],
                  num_variables=config['NUM_VARIABLES'],
                  sites=False,
                  out_file=None,
-                 stdin=False):
+                 stdin=False,
+                 deadlock_policy=config['DEADLOCK_POLICY'],
+                 victim_policy=config['VICTIM_POLICY'],
+                 replication_policy=config['REPLICATION_POLICY'],
+                 replication_factor=config['REPLICATION_FACTOR'],
+                 wal_dir=config['WAL_DIR'],
+                 group_commit_size=config['GROUP_COMMIT_SIZE'],
+                 group_commit_latency=config['GROUP_COMMIT_LATENCY'],
+                 checkpoint_interval=config['CHECKPOINT_INTERVAL'],
+                 catch_up=config['CATCH_UP'],
+                 replica_control=config['REPLICA_CONTROL'],
+                 read_quorum=config['READ_QUORUM'],
+                 write_quorum=config['WRITE_QUORUM'],
+                 atomic_locks=config['ATOMIC_LOCKS'],
+                 read_routing=config['READ_ROUTING'],
+                 site_processes=config['SITE_PROCESSES']):
         p = Path('.')
         p = p / file_path
 
@@ -56,12 +139,18 @@ class Main:
                             format='%(levelname)s - %(asctime)s - %(message)s',
                             level=config['LOG_LEVEL'])
 
-        self.site_manager = SiteManager(num_sites, num_variables)
+        self.site_manager = SiteManager(
+            num_sites, num_variables, ReplicationPolicy(replication_policy),
+            replication_factor, wal_dir, group_commit_size,
+            group_commit_latency, checkpoint_interval, catch_up,
+            ReplicaControl(replica_control), read_quorum, write_quorum,
+            atomic_locks, ReadRouting(read_routing), site_processes)
 
         self.lock_table = LockTable()
 
         self.transaction_manager = TransactionManager(
-            num_variables, num_sites, self.lock_table, self.site_manager)
+            num_variables, num_sites, self.lock_table, self.site_manager,
+            DeadlockPolicy(deadlock_policy), VictimPolicy(victim_policy))
 
         self.io = IO(p, self.site_manager,
                      self.transaction_manager, self.lock_table, stdin=stdin)
@@ -75,7 +164,10 @@ class Main:
         if self.sites:
             self.site_manager.start()
 
-        self.io.run()
+        try:
+            self.io.run()
+        finally:
+            self.site_manager.stop()
 
     def run(self):
         """
@@ -84,7 +176,10 @@ class Main:
         if self.sites:
             self.site_manager.start()
 
-        self.io.run()
+        try:
+            self.io.run()
+        finally:
+            self.site_manager.stop()
 
 
 if __name__ == "__main__":
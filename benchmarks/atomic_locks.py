@@ -0,0 +1,132 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+
+Runs the same input trace with write locks on replicas taken one site at
+a time and taken all at once, and compares how often transactions are
+blocked, the site locks blocked transactions still hold on the variable
+they wait for, and abort rate. If no trace is passed, a random high
+contention trace is generated.
+
+Usage: python benchmarks/atomic_locks.py [-t 200] [-x 4] [-d detection]
+       [trace]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import plac
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RepCRec.config import config  # noqa: E402
+from RepCRec.SiteManager import SiteManager  # noqa: E402
+from RepCRec.TransactionManager import TransactionManager  # noqa: E402
+from RepCRec.IO import IO  # noqa: E402
+from RepCRec.LockTable import LockTable  # noqa: E402
+from RepCRec.enums.DeadlockPolicy import DeadlockPolicy  # noqa: E402
+from RepCRec.enums.InstructionType import InstructionType  # noqa: E402
+from RepCRec.enums.TransactionStatus import TransactionStatus  # noqa: E402
+from deadlock_policies import generate_trace  # noqa: E402
+
+
+def run_locking(trace_path, atomic_locks, policy):
+    """
+    Runs a trace taking locks on replicas one at a time or all at once
+
+    Args:
+        trace_path: Path of the trace
+        atomic_locks: Whether locks on replicas are taken all at once
+        policy: DeadlockPolicy to be used
+    Returns:
+        Tuple of (committed, aborted, blocks dict, seconds taken)
+    """
+    site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'],
+                               atomic_locks=atomic_locks)
+    lock_table = LockTable()
+    transaction_manager = TransactionManager(
+        config['NUM_VARIABLES'], config['NUM_SITES'], lock_table,
+        site_manager, policy)
+    io = IO(trace_path, site_manager, transaction_manager, lock_table)
+
+    blocks = {"reads": 0, "writes": 0, "held": 0}
+    add_blocked = transaction_manager.add_blocked
+
+    def count_blocked(transaction_id, blocked_tuple):
+        transaction = transaction_manager.transaction_map[transaction_id]
+        variable = blocked_tuple[2]
+
+        if blocked_tuple[1] == InstructionType.READ:
+            blocks["reads"] += 1
+        else:
+            blocks["writes"] += 1
+
+        for (held_variable, site_id), locks in \
+                transaction.get_held_locks().items():
+
+            if held_variable == variable and site_id is not None:
+                blocks["held"] += len(locks)
+
+        add_blocked(transaction_id, blocked_tuple)
+
+    transaction_manager.add_blocked = count_blocked
+
+    start = time.perf_counter()
+    io.run()
+    elapsed = time.perf_counter() - start
+
+    statuses = [transaction.get_status() for transaction in
+                transaction_manager.transaction_map.values()]
+
+    return (statuses.count(TransactionStatus.COMMITTED),
+            statuses.count(TransactionStatus.ABORTED), blocks, elapsed)
+
+
+@plac.annotations(
+    trace=("Input trace, generated if not passed", "positional", None, str),
+    num_transactions=("Number of generated transactions", "option", "t", int),
+    num_hot_variables=("Number of variables generated transactions access",
+                       "option", "x", int),
+    ops=("Number of reads and writes per generated transaction", "option",
+         "k", int),
+    seed=("Seed for generating the trace", "option", "r", int),
+    deadlock_policy=("Deadlock handling policy", "option", "d", str,
+                     [policy.value for policy in DeadlockPolicy]))
+def main(trace=None, num_transactions=200, num_hot_variables=4, ops=4,
+         seed=0, deadlock_policy=config['DEADLOCK_POLICY']):
+    # Logging would dominate running time
+    logging.disable(logging.CRITICAL)
+
+    generated = trace is None
+
+    if generated:
+        lines = generate_trace(num_transactions, num_hot_variables, ops,
+                               seed)
+        handle, trace = tempfile.mkstemp(suffix=".in")
+
+        with os.fdopen(handle, 'w') as trace_file:
+            trace_file.write("\n".join(lines) + "\n")
+
+    print("{:<10}{:>10}{:>9}{:>13}{:>14}{:>12}{:>11}".format(
+        "locking", "committed", "aborted", "read blocks", "write blocks",
+        "locks held", "time (ms)"))
+
+    for atomic_locks in (False, True):
+        committed, aborted, blocks, elapsed = run_locking(
+            trace, atomic_locks, DeadlockPolicy(deadlock_policy))
+
+        print("{:<10}{:>10}{:>9}{:>13}{:>14}{:>12}{:>11.2f}".format(
+            "atomic" if atomic_locks else "partial", committed, aborted,
+            blocks["reads"], blocks["writes"], blocks["held"],
+            elapsed * 1000))
+
+    if generated:
+        os.remove(trace)
+
+
+if __name__ == '__main__':
+    plac.call(main)
@@ -0,0 +1,153 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+
+Runs the same input trace under every deadlock policy and compares
+abort rate and throughput. If no trace is passed, a random high
+contention trace is generated.
+
+Usage: python benchmarks/deadlock_policies.py [-t 200] [-x 4] [trace]
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import plac
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RepCRec.config import config  # noqa: E402
+from RepCRec.SiteManager import SiteManager  # noqa: E402
+from RepCRec.TransactionManager import TransactionManager  # noqa: E402
+from RepCRec.IO import IO  # noqa: E402
+from RepCRec.LockTable import LockTable  # noqa: E402
+from RepCRec.enums.DeadlockPolicy import DeadlockPolicy  # noqa: E402
+from RepCRec.enums.TransactionStatus import TransactionStatus  # noqa: E402
+
+
+def generate_trace(num_transactions, num_hot_variables, ops_per_transaction,
+                   seed, read_ratio=0.5):
+    """
+    Generates a trace where transactions are interleaved randomly and
+    read or write a few hot variables, so that they block each other often
+
+    Args:
+        num_transactions: Number of transactions in the trace
+        num_hot_variables: Number of variables accessed by transactions
+        ops_per_transaction: Number of reads and writes in a transaction
+        seed: Seed of the random generator
+        read_ratio: Fraction of operations which are reads
+    Returns:
+        List of instruction lines
+    """
+    rand = random.Random(seed)
+    pending = dict()
+    lines = list()
+    next_transaction = 1
+
+    while next_transaction <= num_transactions or len(pending) != 0:
+
+        if next_transaction <= num_transactions and \
+                (len(pending) < 4 or rand.random() < 0.2):
+            name = "T" + str(next_transaction)
+            pending[name] = ops_per_transaction
+            lines.append("begin(" + name + ")")
+            next_transaction += 1
+            continue
+
+        name = rand.choice(sorted(pending))
+
+        if pending[name] == 0:
+            pending.pop(name)
+            lines.append("end(" + name + ")")
+            continue
+
+        pending[name] -= 1
+        variable = "x" + str(rand.randint(1, num_hot_variables))
+
+        if rand.random() < read_ratio:
+            lines.append("R(" + name + "," + variable + ")")
+        else:
+            lines.append("W(" + name + "," + variable + "," +
+                         str(rand.randint(1, 999)) + ")")
+
+    return lines
+
+
+def run_policy(trace_path, policy):
+    """
+    Runs a trace under a deadlock policy
+
+    Args:
+        trace_path: Path of the trace
+        policy: DeadlockPolicy to be used
+    Returns:
+        Tuple of (committed, aborted, seconds taken)
+    """
+    site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'])
+    lock_table = LockTable()
+    transaction_manager = TransactionManager(
+        config['NUM_VARIABLES'], config['NUM_SITES'], lock_table,
+        site_manager, policy)
+    io = IO(trace_path, site_manager, transaction_manager, lock_table)
+
+    start = time.perf_counter()
+    io.run()
+    elapsed = time.perf_counter() - start
+
+    statuses = [transaction.get_status() for transaction in
+                transaction_manager.transaction_map.values()]
+
+    return (statuses.count(TransactionStatus.COMMITTED),
+            statuses.count(TransactionStatus.ABORTED), elapsed)
+
+
+@plac.annotations(
+    trace=("Input trace, generated if not passed", "positional", None, str),
+    num_transactions=("Number of generated transactions", "option", "t", int),
+    num_hot_variables=("Number of variables generated transactions access",
+                       "option", "x", int),
+    ops=("Number of reads and writes per generated transaction", "option",
+         "k", int),
+    seed=("Seed for generating the trace", "option", "r", int),
+    repeat=("Number of runs per policy, best time is kept", "option", "p",
+            int))
+def main(trace=None, num_transactions=200, num_hot_variables=4, ops=4,
+         seed=0, repeat=3):
+    # Logging would dominate running time
+    logging.disable(logging.CRITICAL)
+
+    generated = trace is None
+
+    if generated:
+        lines = generate_trace(num_transactions, num_hot_variables, ops,
+                               seed)
+        handle, trace = tempfile.mkstemp(suffix=".in")
+
+        with os.fdopen(handle, 'w') as trace_file:
+            trace_file.write("\n".join(lines) + "\n")
+
+    print("{:<12}{:>10}{:>10}{:>12}{:>12}{:>14}".format(
+        "policy", "committed", "aborted", "abort rate", "time (ms)",
+        "commits/s"))
+
+    for policy in DeadlockPolicy:
+        runs = [run_policy(trace, policy) for i in range(repeat)]
+        committed, aborted, elapsed = min(runs, key=lambda run: run[2])
+        total = max(committed + aborted, 1)
+
+        print("{:<12}{:>10}{:>10}{:>12.3f}{:>12.2f}{:>14.0f}".format(
+            policy.value, committed, aborted, aborted / total,
+            elapsed * 1000, committed / elapsed))
+
+    if generated:
+        os.remove(trace)
+
+
+if __name__ == '__main__':
+    plac.call(main)
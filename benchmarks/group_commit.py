@@ -0,0 +1,129 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+
+Runs the same input trace with write ahead logs of sites under several
+group commit batch sizes and windows and compares commit throughput and
+number of fsyncs. A run without logging is shown first for reference,
+batch size 1 is run once as its window does not matter. If no trace is
+passed, a random low contention trace is generated, the default one runs
+in a few seconds.
+
+Usage: python benchmarks/group_commit.py [-t 200] [-s 1,8,64] [-w 1,5]
+       [trace]
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import plac
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RepCRec.config import config  # noqa: E402
+from RepCRec.SiteManager import SiteManager  # noqa: E402
+from RepCRec.TransactionManager import TransactionManager  # noqa: E402
+from RepCRec.IO import IO  # noqa: E402
+from RepCRec.LockTable import LockTable  # noqa: E402
+from RepCRec.enums.ReplicationPolicy import ReplicationPolicy  # noqa: E402
+from RepCRec.enums.TransactionStatus import TransactionStatus  # noqa: E402
+from deadlock_policies import generate_trace  # noqa: E402
+
+
+def run_group_commit(trace_path, batch_size, window):
+    """
+    Runs a trace logging commits in a fresh directory
+
+    Args:
+        trace_path: Path of the trace
+        batch_size: Commits written with one fsync, None to not log
+        window: Milliseconds a commit may wait for others
+    Returns:
+        Tuple of (committed, fsyncs, seconds taken)
+    """
+    wal_dir = None if batch_size is None else tempfile.mkdtemp()
+
+    site_manager = SiteManager(
+        config['NUM_SITES'], config['NUM_VARIABLES'],
+        ReplicationPolicy.EVEN_ODD, config['REPLICATION_FACTOR'], wal_dir,
+        batch_size or 1, window)
+    lock_table = LockTable()
+    transaction_manager = TransactionManager(
+        config['NUM_VARIABLES'], config['NUM_SITES'], lock_table,
+        site_manager)
+    io = IO(trace_path, site_manager, transaction_manager, lock_table)
+
+    start = time.perf_counter()
+    io.run()
+    elapsed = time.perf_counter() - start
+
+    statuses = [transaction.get_status() for transaction in
+                transaction_manager.transaction_map.values()]
+
+    if wal_dir is not None:
+        shutil.rmtree(wal_dir)
+
+    return (statuses.count(TransactionStatus.COMMITTED),
+            site_manager.get_log_counts()["syncs"], elapsed)
+
+
+@plac.annotations(
+    trace=("Input trace, generated if not passed", "positional", None, str),
+    num_transactions=("Number of generated transactions", "option", "t", int),
+    num_hot_variables=("Number of variables generated transactions access",
+                       "option", "x", int),
+    ops=("Number of reads and writes per generated transaction", "option",
+         "k", int),
+    seed=("Seed for generating the trace", "option", "r", int),
+    sizes=("Comma separated group commit batch sizes", "option", "s", str),
+    windows=("Comma separated group commit windows in milliseconds",
+             "option", "w", str))
+def main(trace=None, num_transactions=200, num_hot_variables=20, ops=4,
+         seed=0, sizes="1,8,64", windows="1,5"):
+    # Logging would dominate running time
+    logging.disable(logging.CRITICAL)
+
+    generated = trace is None
+
+    if generated:
+        lines = generate_trace(num_transactions, num_hot_variables, ops,
+                               seed)
+        handle, trace = tempfile.mkstemp(suffix=".in")
+
+        with os.fdopen(handle, 'w') as trace_file:
+            trace_file.write("\n".join(lines) + "\n")
+
+    print("{:<12}{:>12}{:>11}{:>9}{:>12}{:>12}".format(
+        "batch size", "window (ms)", "committed", "fsyncs", "time (ms)",
+        "commits/s"))
+
+    runs = [(None, 0)]
+
+    for size in sizes.split(","):
+
+        if int(size) == 1:
+            runs.append((1, 0))
+            continue
+
+        runs += [(int(size), float(window))
+                 for window in windows.split(",")]
+
+    for batch_size, window in runs:
+        committed, syncs, elapsed = run_group_commit(trace, batch_size,
+                                                     window)
+
+        print("{:<12}{:>12}{:>11}{:>9}{:>12.2f}{:>12.0f}".format(
+            "no log" if batch_size is None else batch_size, window,
+            committed, syncs, elapsed * 1000, committed / elapsed))
+
+    if generated:
+        os.remove(trace)
+
+
+if __name__ == '__main__':
+    plac.call(main)
@@ -0,0 +1,150 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+
+Runs the same input trace under every replica control for increasing
+numbers of sites and compares time taken by write requests and commits,
+and commit throughput. Available copies locks and writes every available
+replica, quorum only a write quorum of them and primary copy locks only
+the primary replica. If no trace is passed, a random low contention trace
+is generated.
+
+Usage: python benchmarks/quorum.py [-t 500] [-n 5,10,20,40] [-R 0] [-W 0]
+       [trace]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import plac
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RepCRec.config import config  # noqa: E402
+from RepCRec.SiteManager import SiteManager  # noqa: E402
+from RepCRec.TransactionManager import TransactionManager  # noqa: E402
+from RepCRec.IO import IO  # noqa: E402
+from RepCRec.LockTable import LockTable  # noqa: E402
+from RepCRec.enums.ReplicationPolicy import ReplicationPolicy  # noqa: E402
+from RepCRec.enums.ReplicaControl import ReplicaControl  # noqa: E402
+from RepCRec.enums.TransactionStatus import TransactionStatus  # noqa: E402
+from deadlock_policies import generate_trace  # noqa: E402
+
+
+def timed(method, timings):
+    """
+    Wraps a method so that time taken by every call is recorded
+
+    Args:
+        method: Bound method to be wrapped
+        timings: List to which seconds taken by calls are appended
+    Returns:
+        Wrapped method
+    """
+    def call(*args):
+        start = time.perf_counter()
+        result = method(*args)
+        timings.append(time.perf_counter() - start)
+
+        return result
+
+    return call
+
+
+def run_replica_control(trace_path, num_sites, replica_control, read_quorum,
+                        write_quorum):
+    """
+    Runs a trace with a number of sites under a replica control
+
+    Args:
+        trace_path: Path of the trace
+        num_sites: Number of sites
+        replica_control: ReplicaControl to be used
+        read_quorum: Read quorum, 0 for default
+        write_quorum: Write quorum, 0 for default
+    Returns:
+        Tuple of (committed, seconds per write request, seconds per
+        commit, seconds taken)
+    """
+    site_manager = SiteManager(
+        num_sites, config['NUM_VARIABLES'], ReplicationPolicy.EVEN_ODD,
+        config['REPLICATION_FACTOR'], replica_control=replica_control,
+        read_quorum=read_quorum, write_quorum=write_quorum)
+    lock_table = LockTable()
+    transaction_manager = TransactionManager(
+        config['NUM_VARIABLES'], num_sites, lock_table, site_manager)
+    io = IO(trace_path, site_manager, transaction_manager, lock_table)
+
+    writes = list()
+    commits = list()
+    transaction_manager.write_request = timed(
+        transaction_manager.write_request, writes)
+    transaction_manager.commit_transaction = timed(
+        transaction_manager.commit_transaction, commits)
+
+    start = time.perf_counter()
+    io.run()
+    elapsed = time.perf_counter() - start
+
+    statuses = [transaction.get_status() for transaction in
+                transaction_manager.transaction_map.values()]
+
+    return (statuses.count(TransactionStatus.COMMITTED),
+            sum(writes) / max(len(writes), 1),
+            sum(commits) / max(len(commits), 1), elapsed)
+
+
+@plac.annotations(
+    trace=("Input trace, generated if not passed", "positional", None, str),
+    num_transactions=("Number of generated transactions", "option", "t", int),
+    num_hot_variables=("Number of variables generated transactions access",
+                       "option", "x", int),
+    ops=("Number of reads and writes per generated transaction", "option",
+         "k", int),
+    seed=("Seed for generating the trace", "option", "r", int),
+    sites=("Comma separated numbers of sites", "option", "n", str),
+    read_quorum=("Read quorum, 0 for the smallest valid one", "option", "R",
+                 int),
+    write_quorum=("Write quorum, 0 for a majority", "option", "W", int))
+def main(trace=None, num_transactions=500,
+         num_hot_variables=config['NUM_VARIABLES'], ops=4, seed=0,
+         sites="5,10,20,40", read_quorum=0, write_quorum=0):
+    # Logging would dominate running time
+    logging.disable(logging.CRITICAL)
+
+    generated = trace is None
+
+    if generated:
+        lines = generate_trace(num_transactions, num_hot_variables, ops,
+                               seed)
+        handle, trace = tempfile.mkstemp(suffix=".in")
+
+        with os.fdopen(handle, 'w') as trace_file:
+            trace_file.write("\n".join(lines) + "\n")
+
+    print("{:<8}{:<18}{:>11}{:>12}{:>13}{:>12}{:>12}".format(
+        "sites", "replica control", "committed", "write (us)",
+        "commit (us)", "time (ms)", "commits/s"))
+
+    for num_sites in [int(count) for count in sites.split(",")]:
+
+        for replica_control in ReplicaControl:
+            committed, write, commit, elapsed = run_replica_control(
+                trace, num_sites, replica_control, read_quorum,
+                write_quorum)
+
+            print("{:<8}{:<18}{:>11}{:>12.1f}{:>13.1f}{:>12.2f}{:>12.0f}"
+                  .format(num_sites, replica_control.value, committed,
+                          write * 1e6, commit * 1e6, elapsed * 1000,
+                          committed / elapsed))
+
+    if generated:
+        os.remove(trace)
+
+
+if __name__ == '__main__':
+    plac.call(main)
@@ -0,0 +1,108 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+
+Runs the same input trace under every read routing policy and compares
+how read locks are spread over sites, as the number of read locks
+granted by the busiest and the least busy site and the ratio of the
+busiest to the mean. If no trace is passed, a random read heavy trace is
+generated.
+
+Usage: python benchmarks/read_routing.py [-t 300] [-x 20] [-f 0.9] [trace]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import plac
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RepCRec.config import config  # noqa: E402
+from RepCRec.SiteManager import SiteManager  # noqa: E402
+from RepCRec.TransactionManager import TransactionManager  # noqa: E402
+from RepCRec.IO import IO  # noqa: E402
+from RepCRec.LockTable import LockTable  # noqa: E402
+from RepCRec.enums.ReadRouting import ReadRouting  # noqa: E402
+from RepCRec.enums.TransactionStatus import TransactionStatus  # noqa: E402
+from deadlock_policies import generate_trace  # noqa: E402
+
+
+def run_routing(trace_path, routing):
+    """
+    Runs a trace under a read routing policy
+
+    Args:
+        trace_path: Path of the trace
+        routing: ReadRouting to be used
+    Returns:
+        Tuple of (committed, read locks granted by every site, seconds
+        taken)
+    """
+    site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'],
+                               read_routing=routing)
+    lock_table = LockTable()
+    transaction_manager = TransactionManager(
+        config['NUM_VARIABLES'], config['NUM_SITES'], lock_table,
+        site_manager)
+    io = IO(trace_path, site_manager, transaction_manager, lock_table)
+
+    start = time.perf_counter()
+    io.run()
+    elapsed = time.perf_counter() - start
+
+    statuses = [transaction.get_status() for transaction in
+                transaction_manager.transaction_map.values()]
+
+    return (statuses.count(TransactionStatus.COMMITTED),
+            list(site_manager.get_read_loads().values()), elapsed)
+
+
+@plac.annotations(
+    trace=("Input trace, generated if not passed", "positional", None, str),
+    num_transactions=("Number of generated transactions", "option", "t", int),
+    num_hot_variables=("Number of variables generated transactions access",
+                       "option", "x", int),
+    ops=("Number of reads and writes per generated transaction", "option",
+         "k", int),
+    read_ratio=("Fraction of generated operations which are reads",
+                "option", "f", float),
+    seed=("Seed for generating the trace", "option", "r", int))
+def main(trace=None, num_transactions=300,
+         num_hot_variables=config['NUM_VARIABLES'], ops=4, read_ratio=0.9,
+         seed=0):
+    # Logging would dominate running time
+    logging.disable(logging.CRITICAL)
+
+    generated = trace is None
+
+    if generated:
+        lines = generate_trace(num_transactions, num_hot_variables, ops,
+                               seed, read_ratio)
+        handle, trace = tempfile.mkstemp(suffix=".in")
+
+        with os.fdopen(handle, 'w') as trace_file:
+            trace_file.write("\n".join(lines) + "\n")
+
+    print("{:<14}{:>10}{:>10}{:>10}{:>11}{:>11}".format(
+        "routing", "committed", "busiest", "idlest", "max/mean",
+        "time (ms)"))
+
+    for routing in ReadRouting:
+        committed, loads, elapsed = run_routing(trace, routing)
+        mean = max(sum(loads) / len(loads), 1)
+
+        print("{:<14}{:>10}{:>10}{:>10}{:>11.2f}{:>11.2f}".format(
+            routing.value, committed, max(loads), min(loads),
+            max(loads) / mean, elapsed * 1000))
+
+    if generated:
+        os.remove(trace)
+
+
+if __name__ == '__main__':
+    plac.call(main)
@@ -0,0 +1,106 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+
+Compares time taken by sites to restart from their write ahead logs alone
+against restarting from a checkpoint and the log after it, for logs of
+increasing length. Logs are filled with random single write commits.
+
+Usage: python benchmarks/restart.py [-v 20] [-c 1000,10000,100000] [-t 100]
+"""
+import logging
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import plac
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RepCRec.config import config  # noqa: E402
+from RepCRec.SiteManager import SiteManager  # noqa: E402
+from RepCRec.enums.ReplicationPolicy import ReplicationPolicy  # noqa: E402
+
+
+def fill_logs(site_manager, num_commits, rand):
+    """
+    Appends random single write commits to write ahead logs of all of the
+    sites, to the variables each site holds
+
+    Args:
+        site_manager: SiteManager whose logs are filled
+        num_commits: Number of commits appended to every log
+        rand: Random generator
+    """
+    for site in site_manager.sites[1:]:
+        wal = site.data_manager.get_wal()
+        indices = site.data_manager.get_indices()
+
+        for commit in range(num_commits):
+            wal.append(commit, rand.choice(indices), rand.randint(1, 999))
+            wal.commit()
+
+        wal.flush()
+
+
+def restart(wal_dir, num_variables):
+    """
+    Starts sites from a directory of write ahead logs and checkpoints
+
+    Args:
+        wal_dir: Directory of logs and checkpoints
+        num_variables: Number of variables
+    Returns:
+        Tuple of (SiteManager, seconds taken)
+    """
+    start = time.perf_counter()
+    site_manager = SiteManager(config['NUM_SITES'], num_variables,
+                               ReplicationPolicy.EVEN_ODD,
+                               config['REPLICATION_FACTOR'], wal_dir,
+                               1000000, 1000000)
+    elapsed = time.perf_counter() - start
+
+    return site_manager, elapsed
+
+
+@plac.annotations(
+    num_variables=("Number of variables", "option", "v", int),
+    commits=("Comma separated numbers of commits logged per site", "option",
+             "c", str),
+    tail=("Number of commits logged per site after the checkpoint",
+          "option", "t", int),
+    seed=("Seed for generating the logs", "option", "r", int))
+def main(num_variables=config['NUM_VARIABLES'], commits="1000,10000,100000",
+         tail=100, seed=0):
+    # Logging would dominate running time
+    logging.disable(logging.CRITICAL)
+
+    rand = random.Random(seed)
+
+    print("{:<12}{:>16}{:>20}".format(
+        "commits", "full log (ms)", "checkpoint (ms)"))
+
+    for num_commits in [int(count) for count in commits.split(",")]:
+        wal_dir = tempfile.mkdtemp()
+
+        site_manager, elapsed = restart(wal_dir, num_variables)
+        fill_logs(site_manager, num_commits, rand)
+
+        site_manager, full_log = restart(wal_dir, num_variables)
+        site_manager.take_checkpoints()
+        fill_logs(site_manager, tail, rand)
+
+        site_manager, from_checkpoint = restart(wal_dir, num_variables)
+
+        print("{:<12}{:>16.2f}{:>20.2f}".format(
+            num_commits, full_log * 1000, from_checkpoint * 1000))
+
+        shutil.rmtree(wal_dir)
+
+
+if __name__ == '__main__':
+    plac.call(main)
@@ -0,0 +1,138 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+
+Runs the same input trace with all of the sites in one process and with
+every site in its own process, and compares commit throughput and the
+number of round trips to site processes per committed transaction. Runs
+can log commits to write ahead logs, so that fsyncs of sites overlap
+across processes. If no trace is passed, a random low contention trace is
+generated.
+
+Usage: python benchmarks/site_processes.py [-t 300] [-b 1] [-w 0] [-l]
+       [trace]
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import plac
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RepCRec.config import config  # noqa: E402
+from RepCRec.SiteManager import SiteManager  # noqa: E402
+from RepCRec.SiteClient import SiteClient  # noqa: E402
+from RepCRec.TransactionManager import TransactionManager  # noqa: E402
+from RepCRec.IO import IO  # noqa: E402
+from RepCRec.LockTable import LockTable  # noqa: E402
+from RepCRec.enums.ReplicationPolicy import ReplicationPolicy  # noqa: E402
+from RepCRec.enums.TransactionStatus import TransactionStatus  # noqa: E402
+from deadlock_policies import generate_trace  # noqa: E402
+
+
+def run_sites(trace_path, site_processes, logged, batch_size, window):
+    """
+    Runs a trace with sites in one process or in their own processes
+
+    Args:
+        trace_path: Path of the trace
+        site_processes: Whether every site runs in its own process
+        logged: Whether commits are logged in a fresh directory
+        batch_size: Commits written with one fsync
+        window: Milliseconds a commit may wait for others
+    Returns:
+        Tuple of (committed, round trips, seconds taken)
+    """
+    wal_dir = tempfile.mkdtemp() if logged else None
+    round_trips = [0]
+    send = SiteClient.send
+
+    def count_send(client, ops):
+        round_trips[0] += 1
+        send(client, ops)
+
+    SiteClient.send = count_send
+
+    start = time.perf_counter()
+    site_manager = SiteManager(
+        config['NUM_SITES'], config['NUM_VARIABLES'],
+        ReplicationPolicy.EVEN_ODD, config['REPLICATION_FACTOR'], wal_dir,
+        batch_size, window, site_processes=site_processes)
+    lock_table = LockTable()
+    transaction_manager = TransactionManager(
+        config['NUM_VARIABLES'], config['NUM_SITES'], lock_table,
+        site_manager)
+    io = IO(trace_path, site_manager, transaction_manager, lock_table)
+
+    try:
+        io.run()
+    finally:
+        site_manager.stop()
+        SiteClient.send = send
+
+    elapsed = time.perf_counter() - start
+
+    statuses = [transaction.get_status() for transaction in
+                transaction_manager.transaction_map.values()]
+
+    if wal_dir is not None:
+        shutil.rmtree(wal_dir)
+
+    return statuses.count(TransactionStatus.COMMITTED), round_trips[0], \
+        elapsed
+
+
+@plac.annotations(
+    trace=("Input trace, generated if not passed", "positional", None, str),
+    num_transactions=("Number of generated transactions", "option", "t", int),
+    num_hot_variables=("Number of variables generated transactions access",
+                       "option", "x", int),
+    ops=("Number of reads and writes per generated transaction", "option",
+         "k", int),
+    seed=("Seed for generating the trace", "option", "r", int),
+    batch_size=("Commits written to a log with one fsync", "option", "b",
+                int),
+    window=("Milliseconds a commit may wait for others, needed with -b " +
+            "above 1", "option", "w", float),
+    logged=("Log commits to write ahead logs of sites", "flag", "l"))
+def main(trace=None, num_transactions=300,
+         num_hot_variables=config['NUM_VARIABLES'], ops=4, seed=0,
+         batch_size=1, window=0, logged=False):
+    # Logging would dominate running time
+    logging.disable(logging.CRITICAL)
+
+    generated = trace is None
+
+    if generated:
+        lines = generate_trace(num_transactions, num_hot_variables, ops,
+                               seed)
+        handle, trace = tempfile.mkstemp(suffix=".in")
+
+        with os.fdopen(handle, 'w') as trace_file:
+            trace_file.write("\n".join(lines) + "\n")
+
+    print("{:<11}{:>10}{:>13}{:>16}{:>11}{:>12}".format(
+        "sites", "committed", "round trips", "trips/commit", "time (ms)",
+        "commits/s"))
+
+    for site_processes in (False, True):
+        committed, round_trips, elapsed = run_sites(
+            trace, site_processes, logged, batch_size, window)
+
+        print("{:<11}{:>10}{:>13}{:>16.1f}{:>11.2f}{:>12.0f}".format(
+            "processes" if site_processes else "in-process", committed,
+            round_trips, round_trips / max(committed, 1), elapsed * 1000,
+            committed / elapsed))
+
+    if generated:
+        os.remove(trace)
+
+
+if __name__ == '__main__':
+    plac.call(main)
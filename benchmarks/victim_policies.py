@@ -0,0 +1,129 @@
+"""
+Authors:
+Amanpreet Singh
+Sharan Agrawal
+
+Runs the same input trace with deadlock detection under every victim
+policy and compares the work discarded by aborts. If no trace is passed,
+random high contention traces are generated from several seeds and the
+counts are summed over them, since a single trace has too few aborts for
+the policies to differ by more than chance.
+
+Usage: python benchmarks/victim_policies.py [-t 200] [-x 4] [-n 10] [trace]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import plac
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RepCRec.config import config  # noqa: E402
+from RepCRec.SiteManager import SiteManager  # noqa: E402
+from RepCRec.TransactionManager import TransactionManager  # noqa: E402
+from RepCRec.IO import IO  # noqa: E402
+from RepCRec.LockTable import LockTable  # noqa: E402
+from RepCRec.enums.DeadlockPolicy import DeadlockPolicy  # noqa: E402
+from RepCRec.enums.VictimPolicy import VictimPolicy  # noqa: E402
+from RepCRec.enums.TransactionStatus import TransactionStatus  # noqa: E402
+from deadlock_policies import generate_trace  # noqa: E402
+
+
+def run_policy(trace_path, policy):
+    """
+    Runs a trace under a victim policy
+
+    Args:
+        trace_path: Path of the trace
+        policy: VictimPolicy to be used
+    Returns:
+        Tuple of (committed, aborted, discarded work dict, seconds taken)
+    """
+    site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'])
+    lock_table = LockTable()
+    transaction_manager = TransactionManager(
+        config['NUM_VARIABLES'], config['NUM_SITES'], lock_table,
+        site_manager, DeadlockPolicy.DETECTION, policy)
+    io = IO(trace_path, site_manager, transaction_manager, lock_table)
+
+    start = time.perf_counter()
+    io.run()
+    elapsed = time.perf_counter() - start
+
+    statuses = [transaction.get_status() for transaction in
+                transaction_manager.transaction_map.values()]
+
+    discarded = {"ticks": 0, "locks": 0, "reads": 0, "writes": 0}
+
+    for work in transaction_manager.discarded_work.values():
+        for key in discarded:
+            discarded[key] += work[key]
+
+    return (statuses.count(TransactionStatus.COMMITTED),
+            statuses.count(TransactionStatus.ABORTED), discarded, elapsed)
+
+
+@plac.annotations(
+    trace=("Input trace, generated if not passed", "positional", None, str),
+    num_transactions=("Number of generated transactions", "option", "t", int),
+    num_hot_variables=("Number of variables generated transactions access",
+                       "option", "x", int),
+    ops=("Number of reads and writes per generated transaction", "option",
+         "k", int),
+    seed=("Seed of the first generated trace", "option", "r", int),
+    num_seeds=("Number of generated traces, counts are summed over them",
+               "option", "n", int))
+def main(trace=None, num_transactions=200, num_hot_variables=4, ops=4,
+         seed=0, num_seeds=10):
+    # Logging would dominate running time
+    logging.disable(logging.CRITICAL)
+
+    generated = trace is None
+    traces = list()
+
+    if generated:
+        for trace_seed in range(seed, seed + num_seeds):
+            lines = generate_trace(num_transactions, num_hot_variables, ops,
+                                   trace_seed)
+            handle, path = tempfile.mkstemp(suffix=".in")
+
+            with os.fdopen(handle, 'w') as trace_file:
+                trace_file.write("\n".join(lines) + "\n")
+
+            traces.append(path)
+    else:
+        traces.append(trace)
+
+    print("{:<20}{:>10}{:>9}{:>9}{:>8}{:>8}{:>8}{:>11}".format(
+        "policy", "committed", "aborted", "ticks", "locks", "reads",
+        "writes", "time (ms)"))
+
+    for policy in VictimPolicy:
+        committed, aborted, elapsed = 0, 0, 0
+        discarded = {"ticks": 0, "locks": 0, "reads": 0, "writes": 0}
+
+        for path in traces:
+            result = run_policy(path, policy)
+            committed += result[0]
+            aborted += result[1]
+            elapsed += result[3]
+
+            for key in discarded:
+                discarded[key] += result[2][key]
+
+        print("{:<20}{:>10}{:>9}{:>9}{:>8}{:>8}{:>8}{:>11.2f}".format(
+            policy.value, committed, aborted, discarded["ticks"],
+            discarded["locks"], discarded["reads"], discarded["writes"],
+            elapsed * 1000))
+
+    if generated:
+        for path in traces:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    plac.call(main)
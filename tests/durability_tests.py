@@ -0,0 +1,169 @@
+"""
+Runs inputs logging commits to write ahead logs in a fresh directory,
+restarts the sites from that directory and checks that they rebuild the
+values they had, also after a checkpoint dropped the start of the logs
+and after the last record of a log was torn by a crash.
+
+Usage: python tests/durability_tests.py
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from termcolor import colored
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RepCRec.start import Main  # noqa: E402
+from RepCRec.SiteManager import SiteManager  # noqa: E402
+from RepCRec.config import config  # noqa: E402
+
+FIRST_COMMITS = """begin(T1)
+W(T1,x1,101)
+W(T1,x2,102)
+end(T1)
+begin(T2)
+W(T2,x2,202)
+W(T2,x3,203)
+end(T2)
+fail(4)
+begin(T3)
+W(T3,x4,304)
+R(T3,x2)
+end(T3)
+recover(4)
+"""
+
+LAST_COMMIT = """begin(T4)
+W(T4,x2,402)
+W(T4,x12,412)
+end(T4)
+"""
+
+
+def run(instructions, wal_dir, **kwargs):
+    """
+    Runs instructions logging commits in a directory
+
+    Args:
+        instructions: Text of the input
+        wal_dir: Directory of write ahead logs
+        kwargs: Other args of Main
+    Returns:
+        SiteManager the input ran with
+    """
+    handle, path = tempfile.mkstemp(suffix=".in")
+
+    with os.fdopen(handle, 'w') as input_file:
+        input_file.write(instructions)
+
+    main = Main(path, wal_dir=wal_dir, **kwargs)
+    main.run()
+    os.remove(path)
+
+    for site in main.site_manager.sites[1:]:
+        checkpoint = site.data_manager.get_checkpoint()
+
+        if checkpoint is not None:
+            checkpoint.wait()
+
+    return main.site_manager
+
+
+def get_state(site_manager):
+    """
+    Returns values and commit times of the variables of all of the sites
+
+    Args:
+        site_manager: SiteManager of the sites
+    Returns:
+        dict mapping site index to list of (index, value, commit time)
+    """
+    state = dict()
+
+    for site in site_manager.sites[1:]:
+        data_manager = site.data_manager
+        state[site.id] = [(index, data_manager.get_value(index),
+                           data_manager.get_commit_time(index))
+                          for index in data_manager.get_indices()]
+
+    return state
+
+
+def restart(wal_dir):
+    """
+    Starts sites again from a directory of write ahead logs
+
+    Args:
+        wal_dir: Directory of write ahead logs
+    Returns:
+        SiteManager of the restarted sites
+    """
+    return SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'],
+                       wal_dir=wal_dir)
+
+
+def test_replay(wal_dir):
+    site_manager = run(FIRST_COMMITS + LAST_COMMIT, wal_dir)
+
+    return get_state(restart(wal_dir)) == get_state(site_manager)
+
+
+def test_group_commit(wal_dir):
+    site_manager = run(FIRST_COMMITS + LAST_COMMIT, wal_dir,
+                       group_commit_size=4, group_commit_latency=100000)
+    restarted = restart(wal_dir)
+
+    return get_state(restarted) == get_state(site_manager) and \
+        site_manager.get_log_counts()["syncs"] < \
+        site_manager.get_log_counts()["commits"]
+
+
+def test_checkpoint(wal_dir):
+    site_manager = run(FIRST_COMMITS + LAST_COMMIT, wal_dir,
+                       checkpoint_interval=2)
+    restarted = restart(wal_dir)
+
+    # Site 1 took a checkpoint, so the start of its log was dropped
+    return get_state(restarted) == get_state(site_manager) and \
+        restarted.sites[1].data_manager.get_wal().get_base() > 0
+
+
+def test_torn_record(wal_dir):
+    expected = get_state(run(FIRST_COMMITS, tempfile.mkdtemp(
+        dir=wal_dir)))
+    site_manager = run(FIRST_COMMITS + LAST_COMMIT, wal_dir)
+    state = get_state(site_manager)
+
+    # Site 1 crashed while writing the record of T4
+    path = os.path.join(wal_dir, "site1.log")
+    os.truncate(path, os.path.getsize(path) - 3)
+    restarted = get_state(restart(wal_dir))
+
+    return restarted[1] == expected[1] and restarted[2] == state[2] and \
+        restarted[1] != state[1]
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+
+    for test in (test_replay, test_group_commit, test_checkpoint,
+                 test_torn_record):
+        wal_dir = tempfile.mkdtemp()
+
+        try:
+            passed = test(wal_dir)
+        finally:
+            shutil.rmtree(wal_dir)
+
+        if passed:
+            print(colored(test.__name__ + ": Success", "green"))
+        else:
+            print(colored(test.__name__ + ": Failed", "red"))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@ import difflib
 INPUT_FOLDER = 'tests/inputs/'
 OUTPUT_FOLDER = 'tests/outputs/'
 INT_FILE = 'output'
+OPTIONS_PREFIX = '// Options:'
 
 
 def color_diff(diff):
@@ -31,7 +32,16 @@ def main():
     d = difflib.Differ()
 
     for inp_file, out_file in zip(input_files, output_files):
-        os.system('python -m RepCRec.start -o ' + INT_FILE + ' ' +
+        options = str()
+
+        # First line of a test can pass extra options to RepCRec.start
+        with open(INPUT_FOLDER + str(inp_file), 'r') as test_input:
+            first_line = test_input.readline()
+
+            if first_line.startswith(OPTIONS_PREFIX):
+                options = first_line[len(OPTIONS_PREFIX):].strip() + ' '
+
+        os.system('python -m RepCRec.start -o ' + INT_FILE + ' ' + options +
                   INPUT_FOLDER + str(inp_file))
 
         actual_output = []